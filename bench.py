@@ -0,0 +1,538 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file is the entry point for running benchmarks.
+Here are some examples of how you can use it:
+
+python3 ./bench.py verif # per-class latency of the verification examples
+python3 ./bench.py verif 8 # same, with the 8-bit bit-vector fast path
+python3 ./bench.py batch # one query per formula vs one batch session
+python3 ./bench.py decompose # monolithic vs decomposed queries on max3
+python3 ./bench.py pcfg pcfg.json # method 1 with and without learned weights
+python3 ./bench.py divide # whole-term enumeration vs divide-and-conquer
+python3 ./bench.py constants # method 1 with a pool of constants vs solved constants
+python3 ./bench.py canonical # expressions discarded as non-canonical per grammar
+python3 ./bench.py abstract # best-first search with and without abstract pruning
+python3 ./bench.py conflicts # best-first search with and without lemmas from failed candidates
+python3 ./bench.py smt # enumeration (method 3) vs the SMT encoding of the grammars
+python3 ./bench.py counting # derivation counts, and random access vs building the banks
+python3 ./bench.py stochastic # enumeration (method 3) vs stochastic search (method 4)
+python3 ./bench.py streaming # peak memory of the best-first search, with and without streaming
+python3 ./bench.py candidates # one candidate per call vs batches of candidates
+python3 ./bench.py store # method 2 with and without a bank store shared by the examples
+python3 ./bench.py pipeline # the loop of main.py vs the pipelined loop, with method 3
+
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from lang.interp import hole_environment, interpret, run_program
+from lang.symb_eval import Evaluator, EvaluationTypeError
+from synthesis.abstract import AbstractPruner
+from synthesis.banks import BankPool
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.conflicts import ConflictLearner
+from synthesis.counting import GrammarCounts
+from synthesis.grammar import HoleGrammar, is_unknown
+from synthesis.normalize import normalize
+from synthesis.pcfg import PCFG
+from synthesis.pipeline import Pipeline
+from synthesis.smt import SmtEngine
+from synthesis.store import BankStore
+from synthesis.streaming import FALSE_POSITIVE_RATE
+from synthesis.synth import FRONTIER_BUDGET, VERIFY_TIMEOUT, SynthesisException, Synthesizer, seed_examples
+from verification.translate import VerificationError
+from verification.verifier import Verifier, is_valid, verify_completions
+from z3 import Z3Exception
+
+EXAMPLES = Path(__file__).parent.absolute() / "examples"
+
+# The number of calls to the synthesizer before a problem is given up.
+ITERATIONS_LIMIT = 1000
+# The errors of the problems that are reported as unsolved: a method with
+# no more candidates, and the ill-typed problems (e.g. simplify3.paddle
+# compares an integer with a boolean, which z3 rejects). Other errors are
+# bugs, and stop the benchmark.
+UNSOLVED_ERRORS = (SynthesisException, EvaluationTypeError, ASTException, VerificationError, Z3Exception)
+
+
+def paddle_files(directory: Path):
+    """Returns the sorted paths of the paddle files in a directory."""
+    return sorted(directory / f for f in os.listdir(directory)
+                  if f.endswith(".paddle"))
+
+
+def bench_verif(width: str = None, repeat: int = 5) -> None:
+    """
+    Verify each example in examples/verification, with and without
+    routing queries by formula class, and report the latency per class.
+    If a width is given, the bit-vector fast path of that width is used.
+    """
+    width = None if width is None else int(width)
+    for route in (False, True):
+        verifier = Verifier(route=route, bitvector_width=width)
+        for filename in paddle_files(EXAMPLES / "verification"):
+            formula = Evaluator({}).evaluate(parse(str(filename)))
+            for _ in range(repeat):
+                verifier.is_valid(formula)
+        print(f"== Routing {'on' if route else 'off'}")
+        print(verifier.stats.report())
+        if width is not None:
+            print(f"Rejected by the bit-vector fast path: "
+                  f"{verifier.bitvector_rejections}")
+
+
+def bench_batch(repeat: int = 5) -> None:
+    """
+    Verify the examples in examples/verification one query at a time, then
+    all of them in a single batch session, and report the total times.
+    """
+    formulas = [Evaluator({}).evaluate(parse(str(filename)))
+                for filename in paddle_files(EXAMPLES / "verification")]
+    formulas = formulas * repeat
+    start = time.perf_counter()
+    verifier = Verifier()
+    sequential = [verifier.is_valid(formula) for formula in formulas]
+    middle = time.perf_counter()
+    batch = [verdict.valid for verdict in Verifier().check_batch(formulas)]
+    end = time.perf_counter()
+    assert sequential == batch
+    print(f"{len(formulas)} formulas: sequential {middle - start:.3f}s, "
+          f"batch {end - middle:.3f}s")
+
+
+def bench_decompose(repeat: int = 20) -> None:
+    """
+    Verify some wrong and one correct completion of examples/max3.paddle,
+    with monolithic and with decomposed queries, and report the average
+    time per candidate.
+    """
+    ast = parse(str(EXAMPLES / "max3.paddle"))
+    x, y, z = (VarExpr(v) for v in ast.inputs)
+
+    def greater(a, b):
+        return Ite(BinaryExpr(BinaryOperator.GREATER, a, b), a, b)
+    candidates = [x, y, z, BinaryExpr(BinaryOperator.PLUS, x, y),
+                  greater(x, y), greater(y, z), greater(greater(x, y), z)]
+    formulas = [Evaluator({"hmax": c}).evaluate(ast) for c in candidates]
+    for decompose in (False, True):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            # A new verifier each time: only the cache across candidates
+            # of one run is measured.
+            verifier = Verifier(decompose=decompose)
+            verdicts = [verifier.is_valid(formula) for formula in formulas]
+        elapsed = time.perf_counter() - start
+        assert verdicts == [False] * 6 + [True]
+        print(f"decompose={decompose}: "
+              f"{1000 * elapsed / (repeat * len(formulas)):.2f} ms per candidate")
+
+
+def solve(synt: Synthesizer, method: int, limit: int = ITERATIONS_LIMIT):
+    """
+    Runs the synthesis loop of main.py with a method of synt, and returns
+    the solution, or None if there is none within limit calls.
+    """
+    synth_method = getattr(synt, f"synth_method_{method}")
+    for _ in range(limit):
+        try:
+            completion = synth_method()
+            if is_valid(Evaluator(completion).evaluate(synt.ast)):
+                return completion
+        except UNSOLVED_ERRORS:
+            return None
+    return None
+
+
+def bench_pcfg(path: str, method: int = 1) -> None:
+    """
+    Solve each example in examples/ with a method using the best-first
+    enumerator, with its default costs and with the weights learned by
+    train.py (saved in path), and report the solve times.
+    """
+    pcfg = PCFG.load(path)
+    totals = [0.0, 0.0]
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        results = []
+        for learned in (False, True):
+            synt = Synthesizer(ast, checkpoint_variable=False)
+            if learned:
+                synt.cost = pcfg.cost(synt.grammars.values())
+            start = time.perf_counter()
+            solved = solve(synt, int(method)) is not None
+            elapsed = time.perf_counter() - start
+            totals[learned] += elapsed
+            results.append(f"{elapsed:8.3f}s" + ("" if solved else " (unsolved)"))
+        print(f"{filename.name:24} default {results[0]:20} learned {results[1]}")
+    print(f"{'total':24} default {totals[0]:8.3f}s learned {totals[1]:8.3f}s")
+
+
+def bench_divide() -> None:
+    """
+    Solve the conditional examples with whole-term enumeration (method 2)
+    and with divide-and-conquer (method 3), and report the solve times.
+    """
+    for name in ("abs_tern", "max2", "min2", "not_really_max", "max3"):
+        ast = parse(str(EXAMPLES / f"{name}.paddle"))
+        times = []
+        for method in (2, 3):
+            start = time.perf_counter()
+            solution = solve(Synthesizer(ast, checkpoint_variable=False), method)
+            times.append(f"{time.perf_counter() - start:8.3f}s"
+                         + ("" if solution else " (unsolved)"))
+        print(f"{name:16} enumeration {times[0]:20} divide-and-conquer {times[1]}")
+
+
+def bench_constants() -> None:
+    """
+    Solve the examples whose grammars have `Integer` with method 1, with
+    the pool of constants and with symbolic constants solved by z3, and
+    report the solve times.
+    """
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        if not any(is_unknown(p.template) for hole in ast.holes
+                   for ps in HoleGrammar(ast, hole, symbolic=True).productions.values()
+                   for p in ps):
+            continue
+        times = []
+        for symbolic in (False, True):
+            synt = Synthesizer(ast, checkpoint_variable=False)
+            synt.symbolic_constants = symbolic
+            start = time.perf_counter()
+            solution = solve(synt, 1)
+            times.append(f"{time.perf_counter() - start:8.3f}s"
+                         + ("" if solution else " (unsolved)"))
+        print(f"{filename.stem:16} pool {times[0]:20} symbolic {times[1]}")
+
+
+def bench_canonical(max_size: int = 6) -> None:
+    """
+    Enumerate the expressions of each hole grammar of the examples up to
+    max_size bottom-up, on the seed examples, with and without discarding
+    non-canonical expressions, and report the number of expressions
+    evaluated and the share of the candidates discarded.
+    """
+    max_size = int(max_size)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        environments = [hole_environment(ast, example) for example in seed_examples(ast)]
+        for hole in ast.holes:
+            grammar = HoleGrammar(ast, hole)
+            built = []
+            for canonical in (False, True):
+                enumerator = BottomUpEnumerator(grammar, environments, max_size=max_size,
+                                                pool=BankPool(environments, canonical=canonical))
+                for _ in enumerator.enumerate():
+                    pass
+                built.append(enumerator.built)
+            discarded = enumerator.noncanonical
+            rate = 100 * discarded / (built[1] + discarded) if discarded else 0.0
+            print(f"{filename.stem + ' ' + hole.var.name:20} evaluated {built[0]:8} -> {built[1]:8}"
+                  f"   discarded {rate:5.1f}%")
+
+
+def bench_abstract(max_size: int = 6) -> None:
+    """
+    Enumerate the completions of each single-hole example up to max_size
+    with the best-first search, with and without abstract pruning on the
+    seed examples, and report the partial derivations pushed, the
+    completions consistent with the examples, and the times.
+    """
+    max_size = int(max_size)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        if len(ast.holes) != 1:
+            continue
+        grammars = {hole.var.name: normalize(HoleGrammar(ast, hole)) for hole in ast.holes}
+        examples = seed_examples(ast)
+        environments = [hole_environment(ast, example) for example in examples]
+        results = []
+        for pruning in (False, True):
+            pruner = AbstractPruner(ast, grammars, examples) if pruning else None
+            enumerator = BestFirstEnumerator(grammars, max_size=max_size, pruner=pruner)
+            start = time.perf_counter()
+            consistent = 0
+            for completion in enumerator.enumerate():
+                consistent += all(
+                    run_program(ast, example, {h: interpret(e, env) for h, e in completion.items()})
+                    is not False for example, env in zip(examples, environments))
+            results.append(f"pushed {enumerator.pushed:7} consistent {consistent:6} "
+                           f"{time.perf_counter() - start:7.3f}s")
+        print(f"{filename.stem:16} {results[0]}   pruned: {results[1]}")
+
+
+def bench_conflicts(max_size: int = 7) -> None:
+    """
+    Enumerate the completions of each single-hole example up to max_size
+    with the best-first search, with and without the lemmas learned from
+    the completions that fail on the seed examples, and report the partial
+    derivations pushed, the completions consistent with the examples, the
+    lemmas and the times.
+    """
+    max_size = int(max_size)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        if len(ast.holes) != 1:
+            continue
+        grammars = {hole.var.name: normalize(HoleGrammar(ast, hole)) for hole in ast.holes}
+        examples = seed_examples(ast)
+        environments = [hole_environment(ast, example) for example in examples]
+        results = []
+        for learning in (False, True):
+            learner = ConflictLearner(ast, grammars, examples) if learning else None
+            enumerator = BestFirstEnumerator(grammars, max_size=max_size, pruner=learner)
+            start = time.perf_counter()
+            consistent = 0
+            for completion in enumerator.enumerate():
+                failing = next((i for i, (example, env) in enumerate(zip(examples, environments))
+                                if run_program(ast, example, {h: interpret(e, env)
+                                                              for h, e in completion.items()}) is False),
+                               None)
+                consistent += failing is None
+                if learner is not None and failing is not None:
+                    learner.learn(enumerator.derivation, failing)
+            lemmas = f" lemmas {len(learner.lemmas):5}" if learner is not None else ""
+            results.append(f"pushed {enumerator.pushed:7} consistent {consistent:6}{lemmas} "
+                           f"{time.perf_counter() - start:7.3f}s")
+        print(f"{filename.stem:16} {results[0]}   learned: {results[1]}")
+
+
+def bench_smt(max_depth: int = 6) -> None:
+    """
+    Solve each example with enumeration (method 3) and with the SMT engine
+    on the symbolic grammars unrolled up to max_depth, and report the solve
+    times, and the depth and number of queries of the SMT engine. The
+    examples in examples/smt have solutions too large to enumerate, which
+    only the SMT engine finds.
+    """
+    for filename in paddle_files(EXAMPLES) + paddle_files(EXAMPLES / "smt"):
+        ast = parse(str(filename))
+        start = time.perf_counter()
+        solution = solve(Synthesizer(ast, checkpoint_variable=False), 3)
+        enumeration = (f"{time.perf_counter() - start:8.3f}s"
+                       + ("" if solution else " (unsolved)"))
+        grammars = {hole.var.name: normalize(HoleGrammar(ast, hole, symbolic=True))
+                    for hole in ast.holes}
+        engine = SmtEngine(ast, grammars, Verifier(timeout=VERIFY_TIMEOUT),
+                           max_depth=int(max_depth), timeout=VERIFY_TIMEOUT)
+        start = time.perf_counter()
+        solution = engine.synthesize(seed_examples(ast))
+        smt = (f"{time.perf_counter() - start:8.3f}s depth {engine.depth} "
+               f"queries {engine.queries:3}" + ("" if solution else " (unsolved)"))
+        print(f"{filename.stem:18} enumeration {enumeration:20} smt {smt}")
+
+
+def bench_counting(max_size: int = 30, samples: int = 100) -> None:
+    """
+    Count the derivations of the grammar of each hole up to max_size, and
+    report the count, the time to count, and the mean time to draw an
+    expression of the largest nonempty size uniformly. For comparison,
+    report the time to build the levels of the unpruned bank up to size 6.
+    """
+    max_size, samples = int(max_size), int(samples)
+    rand = random.Random(410)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        for hole in ast.holes:
+            grammar = normalize(HoleGrammar(ast, hole))
+            start = time.perf_counter()
+            counts = GrammarCounts(grammar)
+            total = counts.total(max_size)
+            counting = time.perf_counter() - start
+            size = max((s for s in range(1, max_size + 1) if counts.count(s)), default=None)
+            start = time.perf_counter()
+            for _ in range(samples if size else 0):
+                counts.sample(size, rand)
+            sampling = (time.perf_counter() - start) / samples
+            environments = [hole_environment(ast, example) for example in seed_examples(ast)]
+            enumerator = BottomUpEnumerator(grammar, environments, prune=False)
+            start = time.perf_counter()
+            built = sum(len(enumerator.level(s)) for s in range(1, 7))
+            print(f"{filename.stem:18} {hole.var.name:4} {total:12.4g} derivations "
+                  f"({counting:6.3f}s), sample of size {size}: {sampling * 1000:7.3f}ms; "
+                  f"bank to size 6: {built:8} in {time.perf_counter() - start:7.3f}s")
+
+
+# The examples where enumeration struggles, for the stochastic search.
+HARD_EXAMPLES = ("max3", "min2", "not_really_max", "simplify1", "obfuscated_1", "sum5")
+
+
+def bench_stochastic(seeds: int = 3) -> None:
+    """
+    Solve the hard examples with enumeration (method 3), and with the
+    stochastic search (method 4) with several seeds, and report the solve
+    times (and the size of the solution of each seed).
+    """
+    for name in HARD_EXAMPLES:
+        ast = parse(str(EXAMPLES / f"{name}.paddle"))
+        start = time.perf_counter()
+        solution = solve(Synthesizer(ast, checkpoint_variable=False), 3)
+        results = [f"{time.perf_counter() - start:8.3f}s" + ("" if solution else " (unsolved)")]
+        for seed in range(int(seeds)):
+            synt = Synthesizer(ast, checkpoint_variable=False)
+            synt.stochastic_seed = seed
+            start = time.perf_counter()
+            solution = solve(synt, 4)
+            size = sum(len(str(expr)) for expr in solution.values()) if solution else None
+            results.append(f"{time.perf_counter() - start:8.3f}s "
+                           + (f"{size:4} chars" if solution else "  unsolved"))
+        print(f"{name:18} enumeration {results[0]:20} stochastic " + " | ".join(results[1:]))
+
+
+def bench_streaming(max_pushes: int = 400000, name: str = "max3") -> None:
+    """
+    Run the best-first search of the grammars of an example for an
+    increasing number of partial derivations pushed, with the heap and the
+    completions in memory and in streaming mode, and report the peak of
+    the memory allocated (with tracemalloc, which slows the search down),
+    the partial derivations spilled to disk, and the times.
+    """
+    ast = parse(str(EXAMPLES / f"{name}.paddle"))
+    grammars = {hole.var.name: normalize(HoleGrammar(ast, hole)) for hole in ast.holes}
+    max_pushes = int(max_pushes)
+    for pushes in (max_pushes // 4, max_pushes // 2, max_pushes):
+        results = []
+        for streaming in (False, True):
+            enumerator = BestFirstEnumerator(grammars, budget=pushes,
+                                             frontier_budget=FRONTIER_BUDGET if streaming else None,
+                                             false_positive_rate=FALSE_POSITIVE_RATE if streaming else None)
+            tracemalloc.start()
+            start = time.perf_counter()
+            completions = sum(1 for _ in enumerator.enumerate())
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append(f"{completions:7} completions peak {peak / 2 ** 20:7.1f} MiB "
+                           f"spilled {enumerator.spilled:7} {elapsed:7.2f}s")
+        print(f"pushed {pushes:8}  {results[0]}   streaming: {results[1]}")
+
+
+def bench_candidates(batch_size: int = 16, method: int = 2) -> None:
+    """
+    Solve the examples with a method, one candidate per call verified on
+    its own (as main.py does), and by batches of candidates verified in
+    one solver session, and report the solve times and the candidates
+    verified.
+    """
+    batch_size, method = int(batch_size), int(method)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        results = []
+        for batched in (False, True):
+            synt = Synthesizer(ast, checkpoint_variable=False)
+            start = time.perf_counter()
+            verified = 0
+            solution = None
+            try:
+                if not batched:
+                    synth_method = getattr(synt, f"synth_method_{method}")
+                    while solution is None and verified < ITERATIONS_LIMIT:
+                        completion = synth_method()
+                        verified += 1
+                        if is_valid(Evaluator(completion).evaluate(ast)):
+                            solution = completion
+                else:
+                    batches = synt.candidates(method, batch_size)
+                    batch = next(batches, [])
+                    while batch and verified < ITERATIONS_LIMIT:
+                        verified += len(batch)
+                        verdicts = verify_completions(ast, batch)
+                        solution = next((c for c, v in zip(batch, verdicts) if v.valid), None)
+                        if solution is not None:
+                            break
+                        batch = batches.send(verdicts)
+            except UNSOLVED_ERRORS:
+                pass
+            results.append(f"{time.perf_counter() - start:8.3f}s {verified:5} candidates"
+                           + ("" if solution else " (unsolved)"))
+        print(f"{filename.stem:20} single {results[0]:34} batches {results[1]}")
+
+
+def bench_store(method: int = 2) -> None:
+    """
+    Solve the examples with a method, with banks enumerated from scratch
+    and with banks warm-started from a bank store shared by all the
+    examples, and report the solve times. The examples are solved twice
+    with the store: cold (the store only has the terms of the examples
+    solved before) and warm (it has the terms of all of them).
+    """
+    method = int(method)
+    store = BankStore()
+    files = paddle_files(EXAMPLES)
+    times = {}
+    for rerun in (False, True):
+        for filename in files:
+            ast = parse(str(filename))
+            for stored in ((True,) if rerun else (False, True)):
+                synt = Synthesizer(ast, checkpoint_variable=False)
+                synt.bank_store = store if stored else None
+                start = time.perf_counter()
+                solution = solve(synt, method)
+                times[(filename, stored, rerun)] = (f"{time.perf_counter() - start:8.3f}s"
+                                                    + ("" if solution else " (unsolved)"))
+    for filename in files:
+        print(f"{filename.stem:20} scratch {times[(filename, False, False)]:20} "
+              f"cold {times[(filename, True, False)]:20} warm {times[(filename, True, True)]}")
+
+
+def bench_pipeline(method: int = 3, verbose: str = None) -> None:
+    """
+    Solve the examples with a method, with the loop of main.py and with a
+    pipeline (see synthesis/pipeline.py), and report the solve times and
+    the throughput of the stages of the pipeline (their counters, with
+    verbose set).
+    """
+    method = int(method)
+    for filename in paddle_files(EXAMPLES):
+        ast = parse(str(filename))
+        start = time.perf_counter()
+        solution = solve(Synthesizer(ast, checkpoint_variable=False), method)
+        sequential = f"{time.perf_counter() - start:8.3f}s" + ("" if solution else " (unsolved)")
+        pipeline = Pipeline(Synthesizer(ast, checkpoint_variable=False), method, limit=ITERATIONS_LIMIT)
+        try:
+            solution = pipeline.run()
+        except UNSOLVED_ERRORS:
+            solution = None
+        pipelined = f"{pipeline.elapsed:8.3f}s" + ("" if solution else " (unsolved)")
+        rates = " ".join(f"{stage} {counters.throughput(pipeline.elapsed):7.1f}/s"
+                         for stage, counters in pipeline.counters.items())
+        print(f"{filename.stem:20} loop {sequential:20} pipeline {pipelined:20} {rates}")
+        if verbose:
+            print(pipeline.report())
+
+
+BENCHMARKS = {
+    "verif": bench_verif,
+    "batch": bench_batch,
+    "decompose": bench_decompose,
+    "pcfg": bench_pcfg,
+    "divide": bench_divide,
+    "constants": bench_constants,
+    "canonical": bench_canonical,
+    "abstract": bench_abstract,
+    "conflicts": bench_conflicts,
+    "smt": bench_smt,
+    "counting": bench_counting,
+    "stochastic": bench_stochastic,
+    "streaming": bench_streaming,
+    "candidates": bench_candidates,
+    "store": bench_store,
+    "pipeline": bench_pipeline,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 1 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python3 bench.py ({' | '.join(BENCHMARKS)})")
+        sys.exit(-1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
@@ -5,7 +5,7 @@ by Victor Nicolet and Danya Lette
 This file contains classes that are used to construct the Paddle AST.
 """
 import sys
-from typing import Set, List, Optional, Tuple
+from typing import Set, List, Mapping, Optional, Tuple
 from enum import Enum, unique
 from lark import ast_utils
 
@@ -618,3 +618,48 @@ def pythonize(string: str) -> str:
     """
     return (string.replace(' = ', ' == ').replace('&&', 'and')
             .replace('||', 'or').replace('!', 'not'))
+
+
+def expression_key(expr: Expression) -> tuple:
+    """
+    Returns a hashable key for the structure of an expression: two
+    expressions have the same key if and only if they are structurally
+    equal. Unlike `str(expr)`, the key is not ambiguous for nested
+    if-then-else expressions.
+    """
+    if isinstance(expr, BinaryExpr):
+        return (expr.operator.value, expression_key(expr.left_operand),
+                expression_key(expr.right_operand))
+    if isinstance(expr, UnaryExpr):
+        return (-expr.operator.value, expression_key(expr.operand))
+    if isinstance(expr, Ite):
+        return ("ite", expression_key(expr.cond), expression_key(expr.true_br),
+                expression_key(expr.false_br))
+    if isinstance(expr, VarExpr):
+        return (expr.name,)
+    if isinstance(expr, BoolConst):
+        return ("bool", expr.value)
+    if isinstance(expr, IntConst):
+        return ("int", expr.value)
+    return (str(expr),)
+
+
+def expression_from_key(key: tuple, variables: Mapping[str, Variable]) -> Expression:
+    """
+    Rebuilds the expression of a key returned by `expression_key`. The
+    variables of the expression are looked up by name in variables, so
+    that the expression uses the Variables of the program.
+    """
+    head = key[0]
+    if head == "ite":
+        return Ite(*(expression_from_key(k, variables) for k in key[1:]))
+    if head == "bool":
+        return BoolConst(key[1])
+    if head == "int":
+        return IntConst(key[1])
+    if isinstance(head, int) and head > 0:
+        return BinaryExpr(BinaryOperator(head), expression_from_key(key[1], variables),
+                          expression_from_key(key[2], variables))
+    if isinstance(head, int):
+        return UnaryExpr(UnaryOperator(-head), expression_from_key(key[1], variables))
+    return VarExpr(variables[head])
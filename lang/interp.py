@@ -0,0 +1,126 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the concrete interpreter of Paddle expressions.
+Unlike the Evaluator, which builds expressions, the interpreter computes
+the value of an expression for given values of its variables. The
+synthesizer uses it to run candidates on counterexample inputs.
+
+Values are python ints and bools. An undefined value (division by
+zero, unknown variable) is None: the verifier leaves division by zero
+unspecified, so nothing can be concluded from it.
+"""
+from typing import Mapping, Optional, Union
+from lang.ast import *
+
+Value = Optional[Union[int, bool]]
+
+
+def euclidean_div(lhs: int, rhs: int) -> int:
+    """Division with a non-negative remainder, as in SMT-LIB."""
+    quotient = lhs // rhs
+    if lhs - rhs * quotient < 0:
+        quotient += 1
+    return quotient
+
+
+def euclidean_mod(lhs: int, rhs: int) -> int:
+    """The non-negative remainder of the division of lhs by rhs."""
+    return lhs - rhs * euclidean_div(lhs, rhs)
+
+
+def interpret_binary(operator: BinaryOperator, lhs: Value, rhs: Value) -> Value:
+    """Returns the value of `lhs operator rhs`."""
+    if operator == BinaryOperator.AND:
+        if lhs is False or rhs is False:
+            return False
+        return None if lhs is None or rhs is None else True
+    if operator == BinaryOperator.OR:
+        if lhs is True or rhs is True:
+            return True
+        return None if lhs is None or rhs is None else False
+    if lhs is None or rhs is None:
+        return None
+    if operator == BinaryOperator.PLUS:
+        return lhs + rhs
+    if operator == BinaryOperator.MINUS:
+        return lhs - rhs
+    if operator == BinaryOperator.TIMES:
+        return lhs * rhs
+    if operator == BinaryOperator.DIV:
+        return None if rhs == 0 else euclidean_div(lhs, rhs)
+    if operator == BinaryOperator.MODULO:
+        return None if rhs == 0 else euclidean_mod(lhs, rhs)
+    if operator == BinaryOperator.EQUALS:
+        return lhs == rhs
+    if operator == BinaryOperator.NOTEQUALS:
+        return lhs != rhs
+    if operator == BinaryOperator.GREATER:
+        return lhs > rhs
+    if operator == BinaryOperator.GREATER_EQ:
+        return lhs >= rhs
+    if operator == BinaryOperator.LESSTHAN:
+        return lhs < rhs
+    if operator == BinaryOperator.LESSTHAN_EQ:
+        return lhs <= rhs
+    return None
+
+
+def interpret_unary(operator: UnaryOperator, operand: Value) -> Value:
+    """Returns the value of `operator operand`."""
+    if operand is None:
+        return None
+    if operator == UnaryOperator.NOT:
+        return not operand
+    if operator == UnaryOperator.NEG:
+        return -operand
+    return abs(operand)
+
+
+def interpret(expr: Expression, env: Mapping[str, Value]) -> Value:
+    """
+    Returns the value of the expression expr when its variables have the
+    values in env (a map from variable names to values).
+    """
+    if isinstance(expr, BinaryExpr):
+        return interpret_binary(expr.operator, interpret(expr.left_operand, env),
+                                interpret(expr.right_operand, env))
+    if isinstance(expr, UnaryExpr):
+        return interpret_unary(expr.operator, interpret(expr.operand, env))
+    if isinstance(expr, Ite):
+        cond = interpret(expr.cond, env)
+        if cond is None:
+            true_value = interpret(expr.true_br, env)
+            return true_value if true_value == interpret(expr.false_br, env) else None
+        return interpret(expr.true_br if cond else expr.false_br, env)
+    if isinstance(expr, VarExpr):
+        return env.get(expr.name)
+    if isinstance(expr, (IntConst, BoolConst)):
+        return expr.value
+    return None
+
+
+def hole_environment(prog: Program, inputs: Mapping[str, Value]) -> dict:
+    """
+    Returns the values of the variables that holes can use, for the given
+    input values: the inputs, and the assigned variables computed from
+    them. Assigned variables that depend on a hole are undefined (None).
+    """
+    env = dict(inputs)
+    for assignment in prog.assignments:
+        env[assignment.var.name] = interpret(assignment.expr, env)
+    return env
+
+
+def run_program(prog: Program, inputs: Mapping[str, Value],
+                hole_values: Mapping[str, Value]) -> Value:
+    """
+    Returns the value of the constraint of prog for the given input values,
+    when each hole (by name) has the value in hole_values.
+    """
+    env = dict(inputs)
+    env.update(hole_values)
+    for assignment in prog.assignments:
+        env[assignment.var.name] = interpret(assignment.expr, env)
+    return interpret(prog.constraint, env)
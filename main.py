@@ -134,3 +134,4 @@ if __name__ == '__main__':
             print_solution(hole_completions)
             sys.exit(0)
         # Otherwise the loop continues.
+    print(f"No solution found in {ITERATIONS_LIMIT} iterations.")
@@ -0,0 +1,449 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the abstract interpretation of partial programs. An
+abstract value over-approximates the values an expression may have on
+one input, with an interval and a set of signs for integers, a set of
+booleans, and whether the expression may be undefined.
+The unexpanded symbols of a partial derivation of the best-first search
+stand for every expression they derive: their abstract value on an input
+is the least fixpoint of the abstract values of their productions (with
+intervals widened to infinity when they keep growing). When the
+constraint of the program is false for every completion of a partial
+derivation on some example, the partial derivation is dropped, with all
+its completions.
+"""
+
+import math
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+from lang.ast import *
+from lang.interp import Value, hole_environment, interpret, interpret_binary, interpret_unary
+from synthesis.grammar import HoleGrammar, Production
+
+INF = math.inf
+# The number of rounds of the fixpoint of the abstract values of symbols
+# before the intervals that still grow are widened to infinity.
+WIDENING_ROUNDS = 3
+
+
+class Abstract():
+    """
+    An abstract value: a set of values.
+    - lo, hi: the interval of the integer values (-INF and INF when
+    unbounded, lo > hi when there is no integer value),
+    - signs: the signs (-1, 0 or 1) of the integer values,
+    - bools: the boolean values,
+    - undefined: whether it contains the undefined value.
+    The interval and the signs are reduced against each other: the
+    integers in the set are the ones in the interval with one of the signs.
+    """
+
+    __slots__ = ("lo", "hi", "signs", "bools", "undefined")
+
+    def __init__(self, lo: float = INF, hi: float = -INF, signs: Iterable[int] = (),
+                 bools: Iterable[bool] = (), undefined: bool = False) -> None:
+        signs = frozenset(signs)
+        if len(signs) < 3:
+            if -1 not in signs:
+                lo = max(lo, 0 if 0 in signs else 1)
+            if 1 not in signs:
+                hi = min(hi, 0 if 0 in signs else -1)
+            if 0 not in signs:
+                lo = 1 if lo == 0 else lo
+                hi = -1 if hi == 0 else hi
+        if not lo < 0 < hi:
+            signs = frozenset(s for s in signs
+                              if (lo < 0 if s < 0 else hi > 0 if s > 0 else lo <= 0 <= hi))
+        self.lo = lo
+        self.hi = hi
+        self.signs = signs
+        self.bools = frozenset(bools)
+        self.undefined = undefined
+
+    @staticmethod
+    def of(value: Value) -> "Abstract":
+        """The abstract value of a single concrete value."""
+        if value is None:
+            return UNDEFINED
+        if isinstance(value, bool):
+            return Abstract(bools=(value,))
+        return Abstract(value, value, (_sign(value),))
+
+    @staticmethod
+    def top(ptype: PaddleType) -> "Abstract":
+        """The abstract value of all the (defined) values of a type."""
+        if ptype == PaddleType.BOOL:
+            return Abstract(bools=(False, True))
+        return Abstract(-INF, INF, (-1, 0, 1))
+
+    def is_int(self) -> bool:
+        """Returns true if the set has an integer value."""
+        return self.lo <= self.hi
+
+    def values(self) -> List[Value]:
+        """The boolean values of the set, and None if it may be undefined."""
+        return sorted(self.bools) + ([None] if self.undefined else [])
+
+    def join(self, other: "Abstract") -> "Abstract":
+        """The smallest abstract value that contains both sets."""
+        return Abstract(min(self.lo, other.lo), max(self.hi, other.hi),
+                        self.signs | other.signs, self.bools | other.bools,
+                        self.undefined or other.undefined)
+
+    def widen(self, other: "Abstract") -> "Abstract":
+        """
+        Joins a larger abstract value, with the bounds of the interval that
+        have moved widened to infinity.
+        """
+        joined = self.join(other)
+        return Abstract(joined.lo if joined.lo >= self.lo else -INF,
+                        joined.hi if joined.hi <= self.hi else INF,
+                        joined.signs, joined.bools, joined.undefined)
+
+    def key(self) -> tuple:
+        return (self.lo, self.hi, self.signs, self.bools, self.undefined)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Abstract) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __str__(self) -> str:
+        parts = []
+        if self.is_int():
+            parts.append(f"[{self.lo}, {self.hi}]")
+        if self.bools:
+            parts.append("{" + ", ".join(str(b).lower() for b in sorted(self.bools)) + "}")
+        if self.undefined:
+            parts.append("undefined")
+        return " | ".join(parts) if parts else "empty"
+
+
+UNDEFINED = Abstract(undefined=True)
+BOTTOM = Abstract()
+
+
+def _sign(value: float) -> int:
+    return (value > 0) - (value < 0)
+
+
+def _integer(lo: float, hi: float, signs: Iterable[int], undefined: bool) -> Abstract:
+    return Abstract(lo, hi, signs, undefined=undefined)
+
+
+def _mul(a: float, b: float) -> float:
+    # The product of two bounds, where zero times infinity is zero.
+    return 0 if a == 0 or b == 0 else a * b
+
+
+def _div(a: float, b: float) -> float:
+    # The euclidean quotient of two bounds (b nonzero), or its limit.
+    if b < 0:
+        return -_div(a, -b)
+    if a in (INF, -INF):
+        return a
+    if b == INF:
+        return 0 if a >= 0 else -1
+    return a // b
+
+
+def _corners(f, lhs: Abstract, rhs: Abstract) -> Tuple[float, float]:
+    # The bounds of f on a product of intervals, where f is monotone in
+    # each argument on the intervals.
+    results = [f(a, b) for a in (lhs.lo, lhs.hi) for b in (rhs.lo, rhs.hi)]
+    return min(results), max(results)
+
+
+def _nonzero(value: Abstract) -> List[Abstract]:
+    # The negative and positive parts of an abstract integer.
+    parts = [Abstract(value.lo, value.hi, (sign,)) for sign in (-1, 1) if sign in value.signs]
+    return [part for part in parts if part.is_int()]
+
+
+def _add_signs(a: int, b: int) -> Iterable[int]:
+    if a == 0 or a == b:
+        return (b,)
+    if b == 0:
+        return (a,)
+    return (-1, 0, 1)
+
+
+def _div_signs(a: int, b: int) -> Iterable[int]:
+    # The signs of the euclidean quotient of values of signs a and b.
+    if a == 0:
+        return (0,)
+    if b > 0:
+        return (0, 1) if a > 0 else (-1,)
+    return (-1, 0) if a > 0 else (1,)
+
+
+def _comparison(operator: BinaryOperator, lhs: Abstract, rhs: Abstract) -> Tuple[bool, bool]:
+    # Whether the comparison may be true, and whether it may be false.
+    if operator == BinaryOperator.GREATER:
+        return lhs.hi > rhs.lo, lhs.lo <= rhs.hi
+    if operator == BinaryOperator.GREATER_EQ:
+        return lhs.hi >= rhs.lo, lhs.lo < rhs.hi
+    if operator == BinaryOperator.LESSTHAN:
+        return _comparison(BinaryOperator.GREATER, rhs, lhs)
+    if operator == BinaryOperator.LESSTHAN_EQ:
+        return _comparison(BinaryOperator.GREATER_EQ, rhs, lhs)
+    equal = (max(lhs.lo, rhs.lo) <= min(lhs.hi, rhs.hi) and bool(lhs.signs & rhs.signs),
+             not lhs.lo == lhs.hi == rhs.lo == rhs.hi)
+    return equal if operator == BinaryOperator.EQUALS else (equal[1], equal[0])
+
+
+def abstract_binary(operator: BinaryOperator, lhs: Abstract, rhs: Abstract) -> Abstract:
+    """Returns the abstract value of `lhs operator rhs`."""
+    if operator in (BinaryOperator.AND, BinaryOperator.OR) or (
+            operator in (BinaryOperator.EQUALS, BinaryOperator.NOTEQUALS)
+            and (lhs.bools or rhs.bools)):
+        # Finitely many values: apply the operator to each pair.
+        result = BOTTOM
+        for a in lhs.values():
+            for b in rhs.values():
+                result = result.join(Abstract.of(interpret_binary(operator, a, b)))
+        return result
+    undefined = lhs.undefined or rhs.undefined
+    if not lhs.is_int() or not rhs.is_int():
+        return UNDEFINED if undefined else BOTTOM
+    if operator == BinaryOperator.PLUS:
+        return _integer(lhs.lo + rhs.lo, lhs.hi + rhs.hi,
+                        {s for a in lhs.signs for b in rhs.signs for s in _add_signs(a, b)},
+                        undefined)
+    if operator == BinaryOperator.MINUS:
+        return abstract_binary(BinaryOperator.PLUS, lhs, abstract_unary(UnaryOperator.NEG, rhs))
+    if operator == BinaryOperator.TIMES:
+        lo, hi = _corners(_mul, lhs, rhs)
+        return _integer(lo, hi, {a * b for a in lhs.signs for b in rhs.signs}, undefined)
+    if operator == BinaryOperator.DIV:
+        # Division by zero is undefined.
+        undefined = undefined or 0 in rhs.signs
+        result = UNDEFINED if undefined else BOTTOM
+        for part in _nonzero(rhs):
+            lo, hi = _corners(_div, lhs, part)
+            signs = {s for a in lhs.signs for b in part.signs for s in _div_signs(a, b)}
+            result = result.join(_integer(lo, hi, signs, undefined))
+        return result
+    if operator == BinaryOperator.MODULO:
+        undefined = undefined or 0 in rhs.signs
+        parts = _nonzero(rhs)
+        if not parts:
+            return UNDEFINED if undefined else BOTTOM
+        smallest = min(part.lo if part.lo > 0 else -part.hi for part in parts)
+        if lhs.lo >= 0 and lhs.hi < smallest:
+            # The remainder is the dividend itself.
+            return _integer(lhs.lo, lhs.hi, lhs.signs, undefined)
+        hi = max(-rhs.lo, rhs.hi) - 1
+        if lhs.lo >= 0:
+            hi = min(hi, lhs.hi)
+        return _integer(0, hi, (0, 1), undefined)
+    may_be_true, may_be_false = _comparison(operator, lhs, rhs)
+    bools = [b for b, possible in ((True, may_be_true), (False, may_be_false)) if possible]
+    return Abstract(bools=bools, undefined=undefined)
+
+
+def abstract_unary(operator: UnaryOperator, operand: Abstract) -> Abstract:
+    """Returns the abstract value of `operator operand`."""
+    if operator == UnaryOperator.NOT:
+        return Abstract(bools={not b for b in operand.bools}, undefined=operand.undefined)
+    if not operand.is_int():
+        return UNDEFINED if operand.undefined else BOTTOM
+    if operator == UnaryOperator.NEG:
+        return _integer(-operand.hi, -operand.lo, {-s for s in operand.signs}, operand.undefined)
+    if operand.lo >= 0:
+        return operand
+    if operand.hi <= 0:
+        return abstract_unary(UnaryOperator.NEG, operand)
+    return _integer(0, max(-operand.lo, operand.hi), {abs(s) for s in operand.signs},
+                    operand.undefined)
+
+
+def abstract_ite(cond: Abstract, true_br: Abstract, false_br: Abstract) -> Abstract:
+    """Returns the abstract value of `cond ? true_br : false_br`."""
+    result = BOTTOM
+    if True in cond.bools:
+        result = result.join(true_br)
+    if False in cond.bools:
+        result = result.join(false_br)
+    if cond.undefined:
+        # The value of both branches when they agree, otherwise undefined.
+        result = result.join(true_br).join(false_br).join(UNDEFINED)
+    return result
+
+
+def abstract_eval(expr: Expression, env: Mapping[str, Abstract],
+                  args: Sequence[Abstract] = ()) -> Abstract:
+    """
+    Returns the abstract value of an expression when its variables have the
+    abstract values in env, and the slots of a production pattern (`#i`)
+    have the values in args. Variables that are not in env (the unknown
+    constants of symbolic grammars) may have any value of their type.
+    """
+    if isinstance(expr, BinaryExpr):
+        return abstract_binary(expr.operator, abstract_eval(expr.left_operand, env, args),
+                               abstract_eval(expr.right_operand, env, args))
+    if isinstance(expr, UnaryExpr):
+        return abstract_unary(expr.operator, abstract_eval(expr.operand, env, args))
+    if isinstance(expr, Ite):
+        return abstract_ite(abstract_eval(expr.cond, env, args),
+                            abstract_eval(expr.true_br, env, args),
+                            abstract_eval(expr.false_br, env, args))
+    if isinstance(expr, VarExpr):
+        if expr.var is None:
+            return args[int(expr.name[1:])]
+        value = env.get(expr.name)
+        return Abstract.top(expr.var.type) if value is None else value
+    if isinstance(expr, (IntConst, BoolConst)):
+        return Abstract.of(expr.value)
+    return UNDEFINED
+
+
+def concrete_eval(pattern: Expression, env: Mapping[str, Value], args: Sequence[Value]) -> Value:
+    """
+    Returns the value of a production pattern when its slots have the
+    values in args, as in lang/interp.py.
+    """
+    if isinstance(pattern, BinaryExpr):
+        return interpret_binary(pattern.operator, concrete_eval(pattern.left_operand, env, args),
+                                concrete_eval(pattern.right_operand, env, args))
+    if isinstance(pattern, UnaryExpr):
+        return interpret_unary(pattern.operator, concrete_eval(pattern.operand, env, args))
+    if isinstance(pattern, VarExpr):
+        return args[int(pattern.name[1:])] if pattern.var is None else env.get(pattern.name)
+    if isinstance(pattern, Ite):
+        cond = concrete_eval(pattern.cond, env, args)
+        true_value = concrete_eval(pattern.true_br, env, args)
+        false_value = concrete_eval(pattern.false_br, env, args)
+        if cond is None:
+            return true_value if true_value == false_value else None
+        return true_value if cond else false_value
+    return interpret(pattern, env)
+
+
+def symbol_values(grammar: HoleGrammar, env: Mapping[str, Abstract]) -> Dict[str, Abstract]:
+    """
+    Returns the abstract value of each symbol of a grammar: a set that
+    contains the values of all the expressions it derives, on the input
+    where the variables have the abstract values in env.
+    """
+    values = {symbol: BOTTOM for symbol in grammar.symbols()}
+    rounds = 0
+    changed = True
+    while changed:
+        changed = False
+        rounds += 1
+        for symbol in grammar.symbols():
+            value = values[symbol]
+            for production in grammar.productions[symbol]:
+                args = [values[slot] for slot in production.slots]
+                value = value.join(abstract_eval(production.pattern, env, args))
+            if rounds > WIDENING_ROUNDS:
+                value = values[symbol].widen(value)
+            if value != values[symbol]:
+                values[symbol] = value
+                changed = True
+    return values
+
+
+class AbstractPruner():
+    """
+    Refutes the partial derivations of the best-first search whose
+    completions all violate the constraint of the program on an example.
+    - prog: the program,
+    - grammars: the grammar of each hole, by hole name, in the order of the
+    enumerator,
+    - examples: the inputs of the examples (maps from input names to
+    values). The list can grow: the new examples are used as they come.
+    The number of partial derivations refuted is `refuted`.
+    """
+
+    def __init__(self, prog: Program, grammars: Mapping[str, HoleGrammar],
+                 examples: List[Mapping[str, Value]]) -> None:
+        self.prog = prog
+        self.holes = list(grammars)
+        self.grammars = [grammars[hole] for hole in self.holes]
+        self.examples = examples
+        # For each example seen so far: the abstract values of the inputs,
+        # of the variables the holes can use (and their concrete values),
+        # and of the symbols of each grammar.
+        self._inputs: List[Dict[str, Abstract]] = []
+        self._environments: List[Dict[str, Abstract]] = []
+        self._concrete: List[Dict[str, Value]] = []
+        self._symbols: List[List[Dict[str, Abstract]]] = []
+        # The verdicts of `violated`, which often sees the same values.
+        self._verdicts: Dict[tuple, bool] = {}
+        self.refuted = 0
+
+    def _update(self) -> None:
+        for example in self.examples[len(self._inputs):]:
+            concrete = hole_environment(self.prog, example)
+            env = {name: Abstract.of(value) for name, value in concrete.items()}
+            self._inputs.append({name: Abstract.of(value) for name, value in example.items()})
+            self._environments.append(env)
+            self._concrete.append(concrete)
+            self._symbols.append([symbol_values(grammar, env) for grammar in self.grammars])
+
+    def hole_values(self, chosen: Sequence[Tuple[int, Production]],
+                    pending: Sequence[tuple]) -> List[List[Abstract]]:
+        """
+        Returns the abstract values of each hole on each example, for a
+        partial derivation: the productions chosen in preorder, and the
+        pending symbols (hole index and symbol name first) in preorder.
+        """
+        self._update()
+        position = 0
+        next_pending = 0
+
+        def value(hole: int) -> Tuple[bool, list]:
+            # Whether the subtree is complete, and its values on each
+            # example: concrete values if it is, abstract values otherwise.
+            nonlocal position, next_pending
+            if position >= len(chosen):
+                symbol = pending[next_pending][1]
+                next_pending += 1
+                return False, [symbols[hole][symbol] for symbols in self._symbols]
+            production = chosen[position][1]
+            position += 1
+            args = [value(hole) for _ in production.slots]
+            if all(complete for complete, _ in args):
+                # Complete subtrees are evaluated concretely, which is faster.
+                return True, [concrete_eval(production.pattern, env, [arg[i] for _, arg in args])
+                              for i, env in enumerate(self._concrete)]
+            args = [arg if not complete else [Abstract.of(v) for v in arg]
+                    for complete, arg in args]
+            return False, [abstract_eval(production.pattern, env, [arg[i] for arg in args])
+                           for i, env in enumerate(self._environments)]
+        values = []
+        for hole in range(len(self.holes)):
+            complete, hole_values = value(hole)
+            values.append([Abstract.of(v) for v in hole_values] if complete else hole_values)
+        return values
+
+    def violated(self, example: int, hole_values: Tuple[Abstract, ...]) -> bool:
+        """
+        Returns true if the constraint is false on an example (by index)
+        whenever the holes have values in hole_values.
+        """
+        key = (example, hole_values)
+        if key not in self._verdicts:
+            env = dict(self._inputs[example])
+            env.update(zip(self.holes, hole_values))
+            for assignment in self.prog.assignments:
+                env[assignment.var.name] = abstract_eval(assignment.expr, env)
+            constraint = abstract_eval(self.prog.constraint, env)
+            self._verdicts[key] = not constraint.undefined and constraint.bools == {False}
+        return self._verdicts[key]
+
+    def refutes(self, chosen: Sequence[Tuple[int, Production]], pending: Sequence[tuple]) -> bool:
+        """
+        Returns true if the constraint is false on some example for every
+        completion of a partial derivation.
+        """
+        values = self.hole_values(chosen, pending)
+        for i in range(len(self._inputs)):
+            if self.violated(i, tuple(value[i] for value in values)):
+                self.refuted += 1
+                return True
+        return False
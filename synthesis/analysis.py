@@ -0,0 +1,96 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the static analysis of hole grammars. For each symbol
+(the nonterminal of each production rule, and the symbols of `Var` and
+`Integer`), it computes:
+- whether it is productive (derives at least one expression) and
+reachable (appears in a derivation from the start symbol),
+- the size and depth of its smallest derivations,
+- its result type, and the variables its expressions can use.
+The enumerators use these tables to skip the productions that cannot
+derive any expression, and the combinations of sizes that cannot be
+completed within their size bound.
+"""
+
+from typing import Dict, List, Set
+from lang.ast import *
+from synthesis.grammar import HoleGrammar, Production
+
+INFINITY = float("inf")
+
+
+class GrammarAnalysis():
+    """
+    The tables of a hole grammar, by symbol name:
+    - productive: the productive symbols,
+    - reachable: the symbols reachable from the start symbol,
+    - min_size: the size of the smallest expression (the number of
+    productions in its derivation), INFINITY for unproductive symbols,
+    - min_depth: the smallest depth of a derivation, INFINITY for
+    unproductive symbols,
+    - types: the result type,
+    - variables: the variables (among the ones the hole can use) that
+    appear in the expressions.
+    A production is useful if all the symbols of its slots are productive.
+    """
+
+    def __init__(self, grammar: HoleGrammar) -> None:
+        self.grammar = grammar
+        symbols = grammar.symbols()
+        self.types: Dict[str, PaddleType] = dict(grammar.types)
+        self.min_size: Dict[str, float] = {symbol: INFINITY for symbol in symbols}
+        self.min_depth: Dict[str, float] = {symbol: INFINITY for symbol in symbols}
+        changed = True
+        while changed:
+            changed = False
+            for symbol in symbols:
+                for production in grammar.productions[symbol]:
+                    size = 1 + sum(self.min_size[slot] for slot in production.slots)
+                    depth = 1 + max((self.min_depth[slot] for slot in production.slots), default=0)
+                    if size < self.min_size[symbol]:
+                        self.min_size[symbol] = size
+                        changed = True
+                    if depth < self.min_depth[symbol]:
+                        self.min_depth[symbol] = depth
+                        changed = True
+        self.productive: Set[str] = {s for s in symbols if self.min_size[s] < INFINITY}
+        self._useful = {symbol: [p for p in grammar.productions[symbol] if self.is_useful(p)]
+                        for symbol in symbols}
+        self.reachable: Set[str] = set()
+        todo = [grammar.start]
+        while todo:
+            symbol = todo.pop()
+            if symbol in self.reachable:
+                continue
+            self.reachable.add(symbol)
+            for production in self._useful[symbol]:
+                todo += production.slots
+        usable = set(grammar.variables)
+        self.variables: Dict[str, Set[Variable]] = {symbol: set() for symbol in symbols}
+        changed = True
+        while changed:
+            changed = False
+            for symbol in symbols:
+                variables = set(self.variables[symbol])
+                for production in self._useful[symbol]:
+                    if not production.slots:
+                        variables |= production.template.uses() & usable
+                    for slot in production.slots:
+                        variables |= self.variables[slot]
+                if variables != self.variables[symbol]:
+                    self.variables[symbol] = variables
+                    changed = True
+
+    def is_useful(self, production: Production) -> bool:
+        """Returns true if all the slots of the production are productive."""
+        return all(self.min_size[slot] < INFINITY for slot in production.slots)
+
+    def useful(self, symbol: str) -> List[Production]:
+        """Returns the useful productions of a symbol."""
+        return self._useful[symbol]
+
+    def slot_sizes(self, production: Production) -> List[int]:
+        """Returns the smallest size of the expression in each slot of a production."""
+        return [self.min_size[slot] for slot in production.slots]
@@ -0,0 +1,435 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the expression banks of the bottom-up enumerator.
+A bank holds, for each (symbol, size) of a hole grammar, the expressions
+of that symbol and size with their values on the examples. A level is
+built the first time it is needed, by combining the levels of smaller
+sizes of the symbols in the slots of each production.
+Expressions that are not canonical (see synthesis/canonical.py) are
+discarded before being evaluated.
+Holes whose grammars are structurally identical (the same productions up
+to the names of the nonterminals, over the same variables and constants)
+share one bank of a BankPool.
+A pool can warm-start its banks from a bank store (see synthesis/store.py):
+the levels of a bank are then the stored terms of its grammar, evaluated
+on the examples and pruned, instead of the combinations of its levels.
+The pool accounts for the memory used by the levels of its banks, and by
+the values the banks have seen (which pruning needs, so they are never
+evicted). When they use more than the budget of the pool, the largest
+levels are evicted: dropped and rebuilt when they are needed again, or
+spilled to a file and read back.
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+from enum import Enum
+from itertools import product
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from lang.ast import *
+from lang.interp import Value, interpret, interpret_binary, interpret_unary
+from synthesis.analysis import GrammarAnalysis
+from synthesis.canonical import CanonicalRules
+from synthesis.grammar import HoleGrammar
+
+# The default memory budget of a pool, in bytes.
+DEFAULT_BUDGET = 512 * 2 ** 20
+
+# An estimate of the size of the expression node built for each entry: the
+# children of the node are shared with the entries of smaller levels.
+EXPRESSION_BYTES = 120
+# An estimate of the size of an entry of the map of seen values of a bank,
+# without its values (the key and the size in the hash table).
+SEEN_ENTRY_BYTES = 100
+
+Entry = Tuple[Expression, tuple]
+
+
+def compositions(total: int, parts: int,
+                 minimums: Optional[Sequence[int]] = None) -> Iterator[Tuple[int, ...]]:
+    """
+    All the ways of writing total as an ordered sum of parts positive
+    integers, where the i-th integer is at least minimums[i] if given.
+    """
+    if minimums is None:
+        minimums = [1] * parts
+    if parts == 0:
+        if total == 0:
+            yield ()
+        return
+    for first in range(minimums[0], total - sum(minimums[1:]) + 1):
+        for rest in compositions(total - first, parts - 1, minimums[1:]):
+            yield (first,) + rest
+
+
+def compile_pattern(pattern: Expression,
+                    environments: List[Mapping[str, Value]]) -> Callable[[List[tuple]], tuple]:
+    """
+    Compiles the pattern of a production into a function that computes the
+    values of the expression on every example, from the values of the
+    expressions in its slots (one tuple of values per slot).
+    """
+    if isinstance(pattern, VarExpr) and pattern.var is None:
+        index = int(pattern.name[1:])
+        return lambda args: args[index]
+    if isinstance(pattern, BinaryExpr):
+        operator = pattern.operator
+        lhs = compile_pattern(pattern.left_operand, environments)
+        rhs = compile_pattern(pattern.right_operand, environments)
+        return lambda args: tuple(interpret_binary(operator, left, right)
+                                  for left, right in zip(lhs(args), rhs(args)))
+    if isinstance(pattern, UnaryExpr):
+        operator = pattern.operator
+        operand = compile_pattern(pattern.operand, environments)
+        return lambda args: tuple(interpret_unary(operator, value)
+                                  for value in operand(args))
+    if isinstance(pattern, Ite):
+        cond = compile_pattern(pattern.cond, environments)
+        true_br = compile_pattern(pattern.true_br, environments)
+        false_br = compile_pattern(pattern.false_br, environments)
+
+        def ite(args):
+            return tuple(t if c else (f if c is not None else (t if t == f else None))
+                         for c, t, f in zip(cond(args), true_br(args), false_br(args)))
+        return ite
+    # Leaves without slots have the same values for all expressions.
+    values = tuple(interpret(pattern, env) for env in environments)
+    return lambda args: values
+
+
+class Eviction(Enum):
+    """What happens to the levels evicted from a pool."""
+    # The level is dropped, and rebuilt from smaller levels when needed.
+    DROP = 1
+    # The level is written to a file, and read back when needed.
+    SPILL = 2
+
+
+def level_bytes(level: List[Entry]) -> int:
+    """Returns an estimate of the memory used by a level of a bank."""
+    return sys.getsizeof(level) + sum(sys.getsizeof(entry) + sys.getsizeof(entry[1])
+                                      + EXPRESSION_BYTES for entry in level)
+
+
+def grammar_key(grammar: HoleGrammar) -> tuple:
+    """
+    Returns a hashable key for the structure of a hole grammar: the
+    productions of its symbols, where symbols are numbered in the order
+    of `HoleGrammar.symbols`.
+    """
+    number = {symbol: i for i, symbol in enumerate(grammar.symbols())}
+    return tuple((grammar.types[symbol].value,
+                  tuple((expression_key(production.pattern),
+                         tuple(number[slot] for slot in production.slots))
+                        for production in grammar.productions[symbol]))
+                 for symbol in grammar.symbols())
+
+
+class ExpressionBank():
+    """
+    The levels of the symbols of a hole grammar.
+    - levels: maps (symbol, size) to the list of pairs (expression, values)
+    of that level, for the levels in memory,
+    - sizes: the largest size built so far of each symbol,
+    - seen: with pruning, maps the values of the kept expressions of each
+    symbol to the size of the level they were kept in,
+    - seen_bytes: an estimate of the memory used by seen, whose values
+    are also counted with the levels they are in (so the estimate of a
+    pool is an upper bound),
+    - rules: with canonical pruning, the checks that discard non-canonical
+    expressions before they are evaluated (see synthesis/canonical.py),
+    - analysis: the static analysis of the grammar (see
+    synthesis/analysis.py),
+    - stored: with a store, the stored bank of the signature of the
+    grammar, and the map from the symbols of the grammar to its symbols.
+    Levels of a symbol are built by increasing size, so that pruning keeps
+    the smallest expression of each vector of values. An evicted level is
+    rebuilt with the same entries: an expression is kept again if its
+    values were first kept at the size of the level.
+    """
+
+    def __init__(self, grammar: HoleGrammar, pool: "BankPool") -> None:
+        self.grammar = grammar
+        self.pool = pool
+        self.levels: Dict[Tuple[str, int], List[Entry]] = {}
+        self.sizes: Dict[str, int] = {symbol: 0 for symbol in grammar.symbols()}
+        self.seen: Dict[str, Dict[tuple, int]] = {symbol: {} for symbol in grammar.symbols()}
+        self.seen_bytes = 0
+        self.functions = {id(production): compile_pattern(production.pattern, pool.environments)
+                          for symbol in grammar.symbols()
+                          for production in grammar.productions[symbol]}
+        self.variables = {v.name: v for v in grammar.variables}
+        self.rules = CanonicalRules(grammar) if pool.prune and pool.canonical else None
+        self.analysis = GrammarAnalysis(grammar)
+        self.stored = pool.store.bank(grammar) if pool.store is not None and self.rules is not None else None
+        # With a store: the stored terms of each level, with their values
+        # on the examples (see `_stored_terms`).
+        self._terms: Dict[Tuple[str, int], List[Entry]] = {}
+        # The number of expressions built, pruned, and discarded before
+        # being built because they are not canonical (rebuilds excluded).
+        self.built = 0
+        self.pruned = 0
+        self.noncanonical = 0
+
+    def level(self, symbol: str, size: int) -> List[Entry]:
+        """Returns the expressions of a symbol and size, with their values."""
+        key = (symbol, size)
+        if key in self.levels:
+            return self.levels[key]
+        if size <= self.sizes[symbol]:
+            level = self.pool.restore(self, key)
+        else:
+            for smaller in range(self.sizes[symbol] + 1, size):
+                self.level(symbol, smaller)
+            level = self._build(symbol, size, first=True)
+            self.sizes[symbol] = size
+        self.levels[key] = level
+        self.pool.add(self, key, level)
+        return level
+
+    def rebuild(self, symbol: str, size: int) -> List[Entry]:
+        """Builds again a level that was dropped."""
+        return self._build(symbol, size, first=False)
+
+    def _build(self, symbol: str, size: int, first: bool) -> List[Entry]:
+        level = []
+        kept = set()
+        seen = self.seen[symbol]
+        if size < self.analysis.min_size[symbol]:
+            return level
+        if self.stored is not None:
+            for expr, values in self._stored_terms(symbol, size):
+                if self._keep(kept, seen, size, first, values):
+                    level.append((expr, values))
+            return level
+        # Productions with an unproductive slot build nothing, and slots
+        # have no expression smaller than their minimum size.
+        for production in self.analysis.useful(symbol):
+            function = self.functions[id(production)]
+            if not production.slots:
+                if size == 1:
+                    values = function([])
+                    if self._keep(kept, seen, size, first, values):
+                        level.append((production.template, values))
+                continue
+            for sizes in compositions(size - 1, len(production.slots),
+                                      self.analysis.slot_sizes(production)):
+                args = [self.level(slot, slot_size)
+                        for slot, slot_size in zip(production.slots, sizes)]
+                for combination in product(*args):
+                    exprs = [arg[0] for arg in combination]
+                    if self.rules is not None and not self.rules.accepts(production, exprs):
+                        if first:
+                            self.noncanonical += 1
+                        continue
+                    values = function([arg[1] for arg in combination])
+                    if self._keep(kept, seen, size, first, values):
+                        level.append((production.build(exprs), values))
+        return level
+
+    def _stored_terms(self, symbol: str, size: int) -> List[Entry]:
+        # The stored terms of a level, evaluated on the examples from the
+        # values of their children. They are computed once: the levels are
+        # built and rebuilt from them.
+        key = (symbol, size)
+        if key not in self._terms:
+            stored, symbols = self.stored
+            productions = self.grammar.productions[symbol]
+            terms = []
+            for index, children in stored.level(symbols[symbol], size):
+                production = productions[index]
+                args = [self._stored_terms(slot, slot_size)[child]
+                        for slot, (slot_size, child) in zip(production.slots, children)]
+                terms.append((production.build([arg[0] for arg in args]),
+                              self.functions[id(production)]([arg[1] for arg in args])))
+            self._terms[key] = terms
+        return self._terms[key]
+
+    def _keep(self, kept: set, seen: Dict[tuple, int], size: int, first: bool,
+              values: tuple) -> bool:
+        # Returns true if an expression with these values is kept in the
+        # level of this size, whose kept values are kept.
+        if first:
+            self.built += 1
+        if not self.pool.prune or None in values:
+            # Undefined values cannot be compared: keep the expression.
+            return True
+        previous = seen.get(values)
+        if previous is None:
+            seen[values] = size
+            self.seen_bytes += SEEN_ENTRY_BYTES + sys.getsizeof(values)
+        elif previous != size or values in kept:
+            if first:
+                self.pruned += 1
+            return False
+        kept.add(values)
+        return True
+
+    def encode(self, level: List[Entry]) -> list:
+        """Returns a representation of a level that can be written to a file."""
+        return [(expression_key(expr), values) for expr, values in level]
+
+    def decode(self, encoded: list) -> List[Entry]:
+        """Returns the level of a representation returned by `encode`."""
+        return [(expression_from_key(key, self.variables), values) for key, values in encoded]
+
+    def state(self) -> dict:
+        """
+        Returns the state of the bank, which can be pickled: the sizes
+        built, the values seen, the levels in memory (encoded), and the
+        counters. The evicted levels are rebuilt when needed.
+        """
+        return {"sizes": self.sizes, "seen": self.seen,
+                "levels": {key: self.encode(level) for key, level in self.levels.items()},
+                "built": self.built, "pruned": self.pruned, "noncanonical": self.noncanonical}
+
+    def load(self, state: dict) -> None:
+        """
+        Restores the state returned by `state`, for a bank of the same
+        grammar on the same examples.
+        """
+        self.sizes = dict(state["sizes"])
+        self.seen = {symbol: dict(seen) for symbol, seen in state["seen"].items()}
+        self.seen_bytes = sum(SEEN_ENTRY_BYTES + sys.getsizeof(values)
+                              for seen in self.seen.values() for values in seen)
+        for key, encoded in state["levels"].items():
+            level = self.decode(encoded)
+            self.levels[key] = level
+            self.pool.add(self, key, level)
+        self.built = state["built"]
+        self.pruned = state["pruned"]
+        self.noncanonical = state["noncanonical"]
+
+
+class BankPool():
+    """
+    The banks of the holes of a program, for the same examples.
+    - environments: the values of the variables the holes can use, one
+    map per example,
+    - prune: whether observationally equivalent expressions are pruned,
+    - budget: the memory the levels of the banks may use, in bytes,
+    - eviction: what happens to the levels evicted to stay in the budget,
+    - canonical: whether non-canonical expressions are also pruned (only
+    when prune is set),
+    - store: if set, the bank store (see synthesis/store.py) the banks
+    warm-start from (only when canonical expressions are pruned).
+    The memory used by the levels in memory and the values seen by the
+    banks is `used` (of which `seen_used` by the values seen), and the
+    largest it has been is `peak`. The values seen are never evicted:
+    when they alone exceed the budget, only the last level built stays in
+    memory.
+    """
+
+    def __init__(self, environments: List[Mapping[str, Value]], prune: bool = True,
+                 budget: int = DEFAULT_BUDGET, eviction: Eviction = Eviction.DROP,
+                 canonical: bool = True, store: Optional["BankStore"] = None) -> None:
+        self.environments = environments
+        self.prune = prune
+        self.budget = budget
+        self.eviction = eviction
+        self.canonical = canonical
+        self.store = store
+        self.banks: Dict[tuple, ExpressionBank] = {}
+        # The estimated memory of each level in memory, by (bank, symbol, size).
+        self.resident: Dict[Tuple[int, str, int], int] = {}
+        self.used = 0
+        self.seen_used = 0
+        self.peak = 0
+        # The number of levels evicted, and restored.
+        self.evictions = 0
+        self.restores = 0
+        self._by_id: Dict[int, ExpressionBank] = {}
+        self._spill_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._spilled: Dict[Tuple[int, str, int], str] = {}
+
+    def bank(self, grammar: HoleGrammar) -> Tuple[ExpressionBank, Dict[str, str]]:
+        """
+        Returns the bank of a hole grammar, and the map from the symbols of
+        the grammar to the symbols of the bank. Grammars that are
+        structurally identical and use the same variables share a bank.
+        """
+        key = (grammar_key(grammar), tuple(v.name for v in grammar.variables))
+        if key not in self.banks:
+            bank = ExpressionBank(grammar, self)
+            self.banks[key] = bank
+            self._by_id[id(bank)] = bank
+        bank = self.banks[key]
+        return bank, dict(zip(grammar.symbols(), bank.grammar.symbols()))
+
+    @property
+    def built(self) -> int:
+        """The number of expressions built by all the banks."""
+        return sum(bank.built for bank in self.banks.values())
+
+    @property
+    def noncanonical(self) -> int:
+        """The number of non-canonical expressions discarded by all the banks."""
+        return sum(bank.noncanonical for bank in self.banks.values())
+
+    def add(self, bank: ExpressionBank, key: Tuple[str, int], level: List[Entry]) -> None:
+        """
+        Accounts for a level put in memory, and for the values seen while it
+        was built, and evicts levels if needed.
+        """
+        resident_key = (id(bank), *key)
+        size = level_bytes(level)
+        self.resident[resident_key] = size
+        self.used += size
+        # The values seen while the level was built.
+        seen = sum(b.seen_bytes for b in self.banks.values())
+        self.used += seen - self.seen_used
+        self.seen_used = seen
+        self.peak = max(self.peak, self.used)
+        while self.used > self.budget and len(self.resident) > 1:
+            largest = max((k for k in self.resident if k != resident_key),
+                          key=lambda k: self.resident[k])
+            self.evict(largest)
+
+    def evict(self, resident_key: Tuple[int, str, int]) -> None:
+        """Evicts a level from memory."""
+        bank_id, symbol, size = resident_key
+        bank = self._by_id[bank_id]
+        level = bank.levels.pop((symbol, size))
+        self.used -= self.resident.pop(resident_key)
+        self.evictions += 1
+        if self.eviction == Eviction.SPILL and resident_key not in self._spilled:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.TemporaryDirectory(prefix="banks-")
+            path = os.path.join(self._spill_dir.name, f"{bank_id}-{symbol}-{size}.pickle")
+            with open(path, "wb") as spill:
+                pickle.dump(bank.encode(level), spill)
+            self._spilled[resident_key] = path
+
+    def state(self) -> dict:
+        """Returns the state of each bank, by the key of its grammar (see `ExpressionBank.state`)."""
+        return {key: bank.state() for key, bank in self.banks.items()}
+
+    def load(self, state: dict) -> None:
+        """
+        Restores the state returned by `state` into the banks of the pool
+        with the same keys (see `bank`), which must exist.
+        """
+        for key, bank_state in state.items():
+            self.banks[key].load(bank_state)
+
+    def restore(self, bank: ExpressionBank, key: Tuple[str, int]) -> List[Entry]:
+        """Returns an evicted level, read back from its file or rebuilt."""
+        self.restores += 1
+        path = self._spilled.get((id(bank), *key))
+        if path is None:
+            return bank.rebuild(*key)
+        with open(path, "rb") as spill:
+            return bank.decode(pickle.load(spill))
+
+    def close(self) -> None:
+        """
+        Removes the files of the spilled levels (they are also removed when
+        the pool is garbage collected).
+        """
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+        self._spilled = {}
@@ -0,0 +1,328 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the best-first enumerator. It searches the partial
+derivations of the hole grammars of a program: a partial derivation is
+the sequence of productions chosen so far in a leftmost derivation of
+every hole, with the symbols that remain to be expanded. The partial
+derivations are kept in a heap ordered by their cost, plus a lower bound
+of the cost of expanding the remaining symbols, so that completions come
+out by increasing cost. The cost function is pluggable: a cost per
+production, such as the size, weights learned from solutions, or a bias
+for variables over constants. Productions that cannot derive any
+expression are never tried, and neither are the expansions that cannot
+be completed within the size bound (see synthesis/analysis.py).
+Completions that are not canonical (see synthesis/canonical.py) are
+discarded: the canonical ones have the same cost. With an abstract pruner
+(see synthesis/abstract.py), the partial derivations whose completions all
+violate the constraint on an example are dropped before they are expanded,
+and so are the ones that contain a lemma learned from the failed candidates
+(see synthesis/conflicts.py).
+In streaming mode, the heap keeps a bounded number of partial derivations
+in memory and spills the others to disk, and the completions returned are
+remembered by their fingerprints (see synthesis/streaming.py).
+"""
+
+from typing import Callable, Dict, Iterator, Mapping, Optional, Tuple
+from lang.ast import *
+from synthesis.abstract import AbstractPruner
+from synthesis.analysis import INFINITY, GrammarAnalysis
+from synthesis.bottom_up import MAX_SIZE
+from synthesis.canonical import CanonicalRules
+from synthesis.grammar import HoleGrammar, Production
+from synthesis.streaming import SeenSet, SpillingHeap
+
+# The cost of using a production once in a derivation. Costs must not be
+# negative.
+Cost = Callable[[Production], float]
+
+
+def size_cost(production: Production) -> float:
+    """Every production costs 1: completions come by increasing size."""
+    return 1.0
+
+
+def variables_first_cost(constant_cost: float = 1.5) -> Cost:
+    """
+    Returns the cost function where constant leaves cost constant_cost
+    and every other production costs 1: variables come before constants.
+    """
+    def cost(production: Production) -> float:
+        if not production.slots and isinstance(production.template, (IntConst, BoolConst)):
+            return constant_cost
+        return 1.0
+    return cost
+
+
+def weighted_cost(weights: Mapping[str, float], default: float = 1.0) -> Cost:
+    """
+    Returns the cost function that gives each production the weight of its
+    string (e.g. "G -> G + G") in weights, or default.
+    """
+    def cost(production: Production) -> float:
+        return weights.get(str(production), default)
+    return cost
+
+
+def minimum_costs(grammar: HoleGrammar, cost: Cost) -> Dict[str, float]:
+    """
+    Returns the smallest cost of a complete derivation of each symbol of
+    a grammar (infinite for the symbols that derive no expression).
+    """
+    best = {symbol: INFINITY for symbol in grammar.symbols()}
+    changed = True
+    while changed:
+        changed = False
+        for symbol in grammar.symbols():
+            for production in grammar.productions[symbol]:
+                total = cost(production) + sum(best[slot] for slot in production.slots)
+                if total < best[symbol]:
+                    best[symbol] = total
+                    changed = True
+    return best
+
+
+def minimum_sizes(grammar: HoleGrammar) -> Dict[str, float]:
+    """Returns the size of the smallest expression of each symbol of a grammar."""
+    return GrammarAnalysis(grammar).min_size
+
+
+# A symbol that remains to be expanded: the index of its hole, its name, and
+# the production that must not expand it (None if there is none), from the
+# canonical rules.
+Pending = Tuple[Tuple[int, str, Optional[Production]], ...]
+
+
+class BestFirstEnumerator():
+    """
+    Enumerates the completions of the holes of a program by increasing cost.
+    - grammars: the grammar of each hole, by hole name,
+    - cost: the cost of each production,
+    - max_size: the largest size of the completion of a hole,
+    - budget: if set, the enumeration stops after pushing that many partial
+    derivations on the heap,
+    - canonical: whether the completions that are not canonical are
+    discarded (their number is `noncanonical`),
+    - pruner: if set, the abstract pruner of the partial derivations, or
+    the conflict learner (see synthesis/conflicts.py), with the holes in the
+    same order as grammars,
+    - frontier_budget: if set, the number of partial derivations the heap
+    keeps in memory (the others are spilled to disk),
+    - false_positive_rate: if set, the completions returned are remembered
+    in a SeenSet of this rate, and a completion is skipped (with this
+    probability) when its fingerprint is taken for one returned before.
+    Without a budget, every (canonical) completion whose holes have
+    expressions of size at most max_size is returned exactly once. The completions are
+    returned by increasing total cost (ties are broken by insertion order).
+    """
+
+    def __init__(self, grammars: Mapping[str, HoleGrammar], cost: Cost = size_cost,
+                 max_size: int = MAX_SIZE, budget: Optional[int] = None,
+                 canonical: bool = True, pruner: Optional[AbstractPruner] = None,
+                 frontier_budget: Optional[int] = None,
+                 false_positive_rate: Optional[float] = None) -> None:
+        self.holes = list(grammars)
+        self.grammars = [grammars[hole] for hole in self.holes]
+        self.cost = cost
+        self.max_size = max_size
+        self.budget = budget
+        self._analyses = [GrammarAnalysis(grammar) for grammar in self.grammars]
+        # The useful productions of each symbol (see synthesis/analysis.py),
+        # with their costs.
+        self._productions = [{symbol: [(p, cost(p)) for p in analysis.useful(symbol)]
+                              for symbol in analysis.grammar.symbols()}
+                             for analysis in self._analyses]
+        self._minimum_costs = [minimum_costs(grammar, cost) for grammar in self.grammars]
+        self._minimum_sizes = [analysis.min_size for analysis in self._analyses]
+        self._rules = ([CanonicalRules(grammar) for grammar in self.grammars]
+                       if canonical else None)
+        self.noncanonical = 0
+        self.pruner = pruner
+        self.frontier_budget = frontier_budget
+        self.false_positive_rate = false_positive_rate
+        # The number of partial derivations spilled to disk.
+        self.spilled = 0
+        # The decoded elements of the derivations read back from disk, which
+        # are shared by the derivations, as the ones in memory are.
+        self._decoded: Dict[tuple, tuple] = {}
+        # The number of partial derivations pushed on the heap, and the
+        # largest size of the heap.
+        self.pushed = 0
+        self.peak = 0
+        # The derivation (the productions chosen in preorder) of the last
+        # completion returned.
+        self.derivation: Tuple[Tuple[int, Production], ...] = ()
+        # The state of the search (see `state`): the heap of partial
+        # derivations, the keys of the completions returned, and the next
+        # tie-breaker, from the start of `enumerate` or from `load` (then
+        # `_loaded` is set, until `enumerate` resumes the search).
+        self._heap: Optional[SpillingHeap] = None
+        self._seen = None
+        self._tie = 0
+        self._loaded = False
+
+    def bound(self, pending: Pending) -> float:
+        """A lower bound of the cost of expanding the pending symbols."""
+        return sum(self._minimum_costs[hole][symbol] for hole, symbol, _ in pending)
+
+    def enumerate(self) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the completions by increasing cost, from the start, or from
+        the state given to `load` just before.
+        """
+        if not self._loaded:
+            self._heap, self._tie = None, 0
+            start: Pending = tuple((i, grammar.start, None) for i, grammar in enumerate(self.grammars))
+            if self.bound(start) == INFINITY:
+                return
+            sizes = tuple(self._minimum_sizes[i][grammar.start]
+                          for i, grammar in enumerate(self.grammars))
+            if any(size > self.max_size for size in sizes):
+                return
+            # Entries: (estimated total cost, tie, cost so far, productions
+            # chosen in preorder, pending symbols, size of each hole with the
+            # smallest expansion of its pending symbols).
+            self._heap = self._new_heap()
+            self._heap.push((self.bound(start), self._next_tie(), 0.0, (), start, sizes))
+            self._seen = set() if self.false_positive_rate is None else SeenSet(self.false_positive_rate)
+        self._loaded = False
+        # The frontier of this enumeration: a later `enumerate` replaces
+        # `self._heap`, and closing this generator must not close its heap.
+        heap, seen = self._heap, self._seen
+        try:
+            yield from self._search(heap, seen)
+        finally:
+            heap.close()
+            if isinstance(seen, SeenSet):
+                seen.close()
+
+    def _new_heap(self) -> SpillingHeap:
+        return SpillingHeap(self.frontier_budget, self._encode, self._decode)
+
+    def _next_tie(self) -> int:
+        self._tie += 1
+        return self._tie - 1
+
+    def state(self) -> dict:
+        """
+        Returns the state of the search, which can be pickled: the partial
+        derivations of the heap (with their productions by number), the
+        keys of the completions returned, and the counters.
+        """
+        return {"heap": list(self._heap.encoded()) if self._heap is not None else None,
+                "seen": self._seen, "tie": self._tie, "pushed": self.pushed, "peak": self.peak,
+                "noncanonical": self.noncanonical}
+
+    def load(self, state: dict) -> None:
+        """
+        Restores the state returned by `state` (by an enumerator of the same
+        grammars, cost and settings): `enumerate` continues the search where
+        it was.
+        """
+        if state["heap"] is not None:
+            self._heap = self._new_heap()
+            for encoded in state["heap"]:
+                self._heap.push(self._decode(encoded))
+        self._seen = state["seen"]
+        self._tie = state["tie"]
+        self.pushed = state["pushed"]
+        self.peak = state["peak"]
+        self.noncanonical = state["noncanonical"]
+        self._loaded = state["heap"] is not None
+
+    def _search(self, heap: SpillingHeap, seen) -> Iterator[Dict[str, Expression]]:
+        # The search from the partial derivations in heap.
+        while heap:
+            if self.budget is not None and self.pushed > self.budget:
+                return
+            self.peak = max(self.peak, len(heap))
+            self.spilled = heap.spilled
+            _, _, so_far, chosen, pending, sizes = heap.pop()
+            if not pending:
+                completion = self.build(chosen)
+                if completion is None:
+                    self.noncanonical += 1
+                    continue
+                key = tuple(expression_key(completion[hole]) for hole in self.holes)
+                # Different derivations may derive the same expressions.
+                if key not in seen:
+                    seen.add(key)
+                    self.derivation = chosen
+                    yield completion
+                continue
+            if self.pruner is not None and self.pruner.refutes(chosen, pending):
+                continue
+            (hole, symbol, excluded), rest = pending[0], pending[1:]
+            minimum_sizes = self._minimum_sizes[hole]
+            for production, cost in self._productions[hole][symbol]:
+                if production is excluded:
+                    continue
+                size = (sizes[hole] - minimum_sizes[symbol] + 1
+                        + sum(minimum_sizes[slot] for slot in production.slots))
+                if size > self.max_size:
+                    continue
+                expanded = tuple((hole, slot, self._excludes(hole, production, i))
+                                 for i, slot in enumerate(production.slots)) + rest
+                estimate = so_far + cost + self.bound(expanded)
+                if estimate == INFINITY:
+                    continue
+                self.pushed += 1
+                heap.push((estimate, self._next_tie(), so_far + cost,
+                           chosen + ((hole, production),), expanded,
+                           sizes[:hole] + (size,) + sizes[hole + 1:]))
+
+    def _number(self, hole: int, production: Optional[Production]) -> Optional[Tuple[str, int]]:
+        # A production by its symbol and position in the grammar of a hole.
+        if production is None:
+            return None
+        return production.symbol, self.grammars[hole].productions[production.symbol].index(production)
+
+    def _production(self, hole: int, number: Optional[Tuple[str, int]]) -> Optional[Production]:
+        if number is None:
+            return None
+        return self.grammars[hole].productions[number[0]][number[1]]
+
+    def _encode(self, entry: tuple) -> tuple:
+        # An entry of the heap, with its productions by their numbers.
+        estimate, tie, so_far, chosen, pending, sizes = entry
+        return (estimate, tie, so_far, tuple((hole, self._number(hole, p)) for hole, p in chosen),
+                tuple((hole, symbol, self._number(hole, p)) for hole, symbol, p in pending), sizes)
+
+    def _decode(self, encoded: tuple) -> tuple:
+        estimate, tie, so_far, chosen, pending, sizes = encoded
+        return (estimate, tie, so_far, tuple(self._shared(hole, n) for hole, n in chosen),
+                tuple(self._shared(hole, n, symbol) for hole, symbol, n in pending), sizes)
+
+    def _shared(self, hole: int, number: Optional[Tuple[str, int]], *symbol: str) -> tuple:
+        # The pair (hole, production) of a chosen production, or the pending
+        # symbol (hole, symbol, excluded production).
+        key = (hole, number, *symbol)
+        if key not in self._decoded:
+            production = self._production(hole, number)
+            self._decoded[key] = (hole, *symbol, production)
+        return self._decoded[key]
+
+    def _excludes(self, hole: int, production: Production, slot: int) -> Optional[Production]:
+        if self._rules is None:
+            return None
+        return self._rules[hole].excludes(production, slot)
+
+    def build(self, chosen: Tuple[Tuple[int, Production], ...]) -> Optional[Dict[str, Expression]]:
+        """
+        Returns the completion of a complete derivation, or None if it is
+        not canonical (when non-canonical completions are discarded).
+        """
+        position = 0
+        canonical = True
+
+        def expression(hole: int) -> Expression:
+            nonlocal position, canonical
+            production = chosen[position][1]
+            position += 1
+            args = [expression(hole) for _ in production.slots]
+            if self._rules is not None and not self._rules[hole].accepts(production, args):
+                canonical = False
+            return production.build(args)
+        completion = {hole: expression(i) for i, hole in enumerate(self.holes)}
+        return completion if canonical else None
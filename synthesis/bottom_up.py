@@ -0,0 +1,75 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the bottom-up enumerator. The expressions of each
+symbol of a hole grammar are built by increasing size, by combining the
+expressions of smaller sizes that are already in the bank (see
+synthesis/banks.py).
+With observational equivalence pruning, every new expression is run on
+the current examples and is kept only if no expression of the same
+symbol has the same values on all of them: two such expressions can be
+exchanged in any candidate without changing whether it satisfies the
+examples. Expressions that are not canonical are not even built.
+"""
+
+from typing import Iterator, List, Mapping, Optional, Tuple
+from lang.ast import *
+from lang.interp import Value
+from synthesis.banks import BankPool, compile_pattern, compositions
+from synthesis.grammar import HoleGrammar
+
+# The default bound on the size of the expressions.
+MAX_SIZE = 12
+
+
+class BottomUpEnumerator():
+    """
+    Enumerates the expressions of a hole grammar by increasing size.
+    - environments: the values of the variables the hole can use, one map
+    per example,
+    - prune: whether observationally equivalent expressions are pruned,
+    - max_size: the largest size of the enumerated expressions,
+    - pool: the pool of banks the expressions are stored in, which can be
+    shared by the enumerators of several holes (with the same environments
+    and pruning). By default, the enumerator has its own pool.
+    The size of an expression is the number of productions used to
+    derive it, `Var` and `Integer` leaves included.
+    """
+
+    def __init__(self, grammar: HoleGrammar,
+                 environments: List[Mapping[str, Value]],
+                 prune: bool = True, max_size: int = MAX_SIZE,
+                 pool: Optional[BankPool] = None) -> None:
+        self.grammar = grammar
+        self.max_size = max_size
+        self.pool = BankPool(environments, prune) if pool is None else pool
+        self.bank, self._symbols = self.pool.bank(grammar)
+
+    @property
+    def built(self) -> int:
+        """The number of expressions built by the bank of the enumerator."""
+        return self.bank.built
+
+    @property
+    def pruned(self) -> int:
+        """The number of expressions pruned by the bank of the enumerator."""
+        return self.bank.pruned
+
+    @property
+    def noncanonical(self) -> int:
+        """The number of non-canonical expressions discarded by the bank of the enumerator."""
+        return self.bank.noncanonical
+
+    def level(self, size: int, symbol: Optional[str] = None) -> List[Tuple[Expression, tuple]]:
+        """Returns the expressions of a given size of symbol (the start symbol by default)."""
+        symbol = self.grammar.start if symbol is None else symbol
+        return self.bank.level(self._symbols[symbol], size)
+
+    def enumerate(self, symbol: Optional[str] = None) -> Iterator[Tuple[Expression, tuple]]:
+        """
+        Yields the expressions of symbol (the start symbol by default), with
+        their values, by increasing size up to `max_size`.
+        """
+        for size in range(1, self.max_size + 1):
+            yield from self.level(size, symbol)
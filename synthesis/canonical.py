@@ -0,0 +1,177 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the canonical forms of expressions. The canonical form
+of an expression flattens the chains of an associative operator, sorts
+the operands of commutative operators, and cancels double negations:
+`y + (x + z)` becomes `(x + y) + z` and `- (- x)` becomes `x`. An
+expression and its canonical form have the same value everywhere.
+The enumerators do not canonicalize the expressions they build, since the
+canonical form of an expression may not be in the language of the
+grammar. Instead, CanonicalRules discards an expression built by a
+production only when an expression of the same size and value, closer to
+the canonical form, is built by the same grammar.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from lang.ast import *
+from synthesis.grammar import HoleGrammar, Production, is_unknown, unit_closure
+
+COMMUTATIVE = (BinaryOperator.PLUS, BinaryOperator.TIMES, BinaryOperator.AND,
+               BinaryOperator.OR, BinaryOperator.EQUALS, BinaryOperator.NOTEQUALS)
+ASSOCIATIVE = (BinaryOperator.PLUS, BinaryOperator.TIMES, BinaryOperator.AND,
+               BinaryOperator.OR)
+# The unary operators that cancel when applied twice.
+INVOLUTIONS = (UnaryOperator.NEG, UnaryOperator.NOT)
+
+
+def rank(expr: Expression) -> tuple:
+    """
+    The order of the operands of commutative operators in canonical forms:
+    variables first, then constants, then larger expressions.
+    """
+    if isinstance(expr, VarExpr) and not is_unknown(expr):
+        return (0, expr.name)
+    if isinstance(expr, (IntConst, BoolConst)):
+        return (1, str(expr))
+    return (2, repr(expression_key(expr)))
+
+
+def _chain(operator: BinaryOperator, expr: Expression) -> List[Expression]:
+    # The operands of a chain of an associative operator, from left to right.
+    if isinstance(expr, BinaryExpr) and expr.operator == operator:
+        return _chain(operator, expr.left_operand) + _chain(operator, expr.right_operand)
+    return [expr]
+
+
+def canonical(expr: Expression) -> Expression:
+    """Returns the canonical form of an expression."""
+    if isinstance(expr, BinaryExpr):
+        operator = expr.operator
+        if operator in ASSOCIATIVE:
+            operands = [canonical(operand) for operand in _chain(operator, expr)]
+            operands.sort(key=rank)
+            result = operands[0]
+            for operand in operands[1:]:
+                result = BinaryExpr(operator, result, operand)
+            return result
+        lhs, rhs = canonical(expr.left_operand), canonical(expr.right_operand)
+        if operator in COMMUTATIVE and rank(rhs) < rank(lhs):
+            lhs, rhs = rhs, lhs
+        return BinaryExpr(operator, lhs, rhs)
+    if isinstance(expr, UnaryExpr):
+        operand = canonical(expr.operand)
+        if (expr.operator in INVOLUTIONS and isinstance(operand, UnaryExpr)
+                and operand.operator == expr.operator):
+            return operand.operand
+        return UnaryExpr(expr.operator, operand)
+    if isinstance(expr, Ite):
+        return Ite(canonical(expr.cond), canonical(expr.true_br), canonical(expr.false_br))
+    return expr
+
+
+def is_canonical(expr: Expression) -> bool:
+    """Returns true if an expression is its own canonical form."""
+    return expression_key(canonical(expr)) == expression_key(expr)
+
+
+def _is_slot(pattern: Expression) -> bool:
+    return isinstance(pattern, VarExpr) and pattern.var is None
+
+
+def _top(pattern: Expression) -> Optional[tuple]:
+    # The operator at the root of a pattern, if any.
+    if isinstance(pattern, BinaryExpr):
+        return ("binary", pattern.operator)
+    if isinstance(pattern, UnaryExpr):
+        return ("unary", pattern.operator)
+    return None
+
+
+class CanonicalRules():
+    """
+    The canonicity checks of the productions of a hole grammar, which
+    discard the expressions built by a production that are not canonical,
+    when the grammar builds a closer one of the same size:
+    - `S -> T op T` with op commutative: the operands must be in order,
+    - `T -> T op T` with op associative, if it is the only production of T
+    (and of the symbols T derives with unit productions) whose root is op:
+    chains must be nested to the left, and with op also commutative, each
+    operand must come after the last operand of the chain on its left,
+    - `T -> op T` with op an involution, if it is the only such production
+    of T: its operand must not be built by it.
+    The condition on T makes sure that every expression of T whose root is
+    op is built by the production, so that its operands are expressions
+    of T. Every expression has at least one canonical derivation.
+    """
+
+    def __init__(self, grammar: HoleGrammar) -> None:
+        self.grammar = grammar
+        self.checks: Dict[int, Callable[[List[Expression]], bool]] = {}
+        # The production that cannot derive the expression in a slot of a
+        # production, by (production id, slot index).
+        self.excluded: Dict[Tuple[int, int], Production] = {}
+        for symbol in grammar.symbols():
+            for production in grammar.productions[symbol]:
+                check = self._check(production)
+                if check is not None:
+                    self.checks[id(production)] = check
+
+    def _owns(self, production: Production) -> bool:
+        # True if the production builds every expression of its symbol
+        # whose root is the operator of the production.
+        top = _top(production.pattern)
+        return all(other is production or _top(other.pattern) != top
+                   for symbol in unit_closure(self.grammar, production.symbol)
+                   for other in self.grammar.productions[symbol])
+
+    def _check(self, production: Production) -> Optional[Callable[[List[Expression]], bool]]:
+        pattern = production.pattern
+        if isinstance(pattern, UnaryExpr) and _is_slot(pattern.operand):
+            operator = pattern.operator
+            if (operator in INVOLUTIONS and production.slots == [production.symbol]
+                    and self._owns(production)):
+                self.excluded[(id(production), 0)] = production
+                return lambda args: not (isinstance(args[0], UnaryExpr)
+                                         and args[0].operator == operator)
+            return None
+        if not (isinstance(pattern, BinaryExpr) and _is_slot(pattern.left_operand)
+                and _is_slot(pattern.right_operand)):
+            return None
+        operator = pattern.operator
+        if operator not in COMMUTATIVE and operator not in ASSOCIATIVE:
+            return None
+        left, right = production.slots
+        if left != right:
+            return None
+        if not (operator in ASSOCIATIVE and left == production.symbol and self._owns(production)):
+            return lambda args: rank(args[0]) <= rank(args[1])
+        self.excluded[(id(production), 1)] = production
+
+        def chained(args: List[Expression]) -> bool:
+            lhs, rhs = args
+            if isinstance(rhs, BinaryExpr) and rhs.operator == operator:
+                return False
+            if operator not in COMMUTATIVE:
+                return True
+            if isinstance(lhs, BinaryExpr) and lhs.operator == operator:
+                lhs = lhs.right_operand
+            return rank(lhs) <= rank(rhs)
+        return chained
+
+    def accepts(self, production: Production, args: List[Expression]) -> bool:
+        """
+        Returns true if the expression built by a production from args is
+        kept, assuming args were built with the same checks.
+        """
+        check = self.checks.get(id(production))
+        return check is None or check(args)
+
+    def excludes(self, production: Production, slot: int) -> Optional[Production]:
+        """
+        Returns the production whose expressions are never kept in a slot of
+        a production (before the other checks), or None. A top-down
+        enumerator can avoid choosing it for that slot.
+        """
+        return self.excluded.get((id(production), slot))
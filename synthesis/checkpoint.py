@@ -0,0 +1,81 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the checkpoint files of the synthesizer, from which a
+long search resumes where it stopped instead of starting over.
+A checkpoint is the state of a synthesizer (see `Synthesizer.checkpoint`),
+pickled and compressed with gzip, along with a key of the program it was
+taken for: it is only restored for the same program. Expressions are
+stored by their keys (see `expression_key`), and rebuilt with the
+variables of the program. A checkpoint is written to a temporary file
+that replaces the previous one, so that a run killed while writing it
+leaves the previous checkpoint intact.
+Since a checkpoint is a pickle, reading a crafted file can run arbitrary
+code: only restore checkpoints written by your own runs.
+"""
+
+import gzip
+import os
+import pickle
+from typing import Any, Dict, Mapping
+from lang.ast import *
+from synthesis.banks import grammar_key
+from synthesis.grammar import HoleGrammar
+
+# The version of the format of the checkpoints: a checkpoint of another
+# version is not restored.
+CHECKPOINT_VERSION = 2
+
+
+def program_key(prog: Program) -> tuple:
+    """
+    Returns a hashable key for a program: its inputs, its assignments, the
+    grammars of its holes and its constraint.
+    """
+    return (tuple((var.name, var.type.value) for var in prog.inputs),
+            tuple((assignment.var.name, expression_key(assignment.expr)) for assignment in prog.assignments),
+            tuple((hole.var.name, grammar_key(HoleGrammar(prog, hole))) for hole in prog.holes),
+            expression_key(prog.constraint))
+
+
+def program_variables(prog: Program) -> Dict[str, Variable]:
+    """Returns the variables that the completions of the holes of a program can use, by name."""
+    return {var.name: var for var in prog.inputs + [assignment.var for assignment in prog.assignments]}
+
+
+def encode_completion(completion: Mapping[str, Expression]) -> Dict[str, tuple]:
+    """Returns the representation of a hole completion in a checkpoint."""
+    return {hole: expression_key(expr) for hole, expr in completion.items()}
+
+
+def decode_completion(encoded: Mapping[str, tuple], variables: Mapping[str, Variable]) -> Dict[str, Expression]:
+    """
+    Returns the hole completion of a representation returned by
+    `encode_completion`, with the variables of the program.
+    """
+    return {hole: expression_from_key(key, variables) for hole, key in encoded.items()}
+
+
+def write_checkpoint(path: str, prog: Program, state: Any) -> None:
+    """Writes the state of a synthesizer of a program to a checkpoint file."""
+    temporary = f"{path}.tmp"
+    with gzip.open(temporary, "wb") as checkpoint:
+        pickle.dump({"version": CHECKPOINT_VERSION, "program": program_key(prog), "state": state},
+                    checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path: str, prog: Program) -> Any:
+    """
+    Returns the state of a synthesizer read from a checkpoint file. Raises a
+    ValueError if the checkpoint is of another version or another program.
+    The file is unpickled: it must only be a trusted file.
+    """
+    with gzip.open(path, "rb") as checkpoint:
+        contents = pickle.load(checkpoint)
+    if contents.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"The checkpoint {path} is of another version.")
+    if contents["program"] != program_key(prog):
+        raise ValueError(f"The checkpoint {path} is of another program.")
+    return contents["state"]
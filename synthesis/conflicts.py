@@ -0,0 +1,170 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the conflict-driven pruning of the best-first search.
+When a candidate fails on an example (an example it is checked on, or
+the counterexample of the verifier), the conflict analysis finds the part
+of its derivation that is enough for the failure: the subtrees of the
+derivation are replaced, from the roots down, by the abstract value of
+their symbol on the example (see synthesis/abstract.py), as long as the
+constraint stays false. The productions that remain, at their positions
+in the derivation, are a lemma: every derivation that has them fails on
+the example, whatever the rest of its subtrees. For instance, when the
+output of `G - G` is too small for any operands, the lemma is the root
+production alone.
+The partial derivations that contain a lemma are dropped before they are
+expanded, with all their completions.
+"""
+
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+from lang.ast import *
+from lang.interp import Value
+from synthesis.abstract import Abstract, AbstractPruner, abstract_eval, concrete_eval
+from synthesis.grammar import HoleGrammar, Production
+
+# A node of the derivations of the holes: the index of its hole, and its
+# path from the root of the hole (the index of the slot at each step).
+Node = Tuple[int, Tuple[int, ...]]
+# A lemma: the productions at some nodes.
+Lemma = FrozenSet[Tuple[Node, Production]]
+
+
+def derivation_nodes(chosen: Sequence[Tuple[int, Production]]) -> Dict[Node, Production]:
+    """
+    Returns the production of each node of a partial derivation of the
+    best-first search (the productions chosen in preorder, in the leftmost
+    derivation of every hole).
+    """
+    nodes: Dict[Node, Production] = {}
+    position = 0
+
+    def walk(node: Node) -> None:
+        nonlocal position
+        if position >= len(chosen):
+            return
+        hole, path = node
+        production = chosen[position][1]
+        position += 1
+        nodes[node] = production
+        for i in range(len(production.slots)):
+            walk((hole, path + (i,)))
+    while position < len(chosen):
+        walk((chosen[position][0], ()))
+    return nodes
+
+
+class ConflictLearner(AbstractPruner):
+    """
+    Learns lemmas from the derivations of failed candidates, and refutes
+    the partial derivations of the best-first search that contain one.
+    - prog, grammars, examples: as for the abstract pruner,
+    - abstract: whether the partial derivations that the abstract pruner
+    refutes are dropped too.
+    The lemmas are `lemmas`; the number of partial derivations they refute
+    is `blocked`. A lemma without productions means that the constraint is
+    false on an example whatever the holes: there is no solution.
+    """
+
+    def __init__(self, prog: Program, grammars: Mapping[str, HoleGrammar],
+                 examples: List[Mapping[str, Value]], abstract: bool = False) -> None:
+        super().__init__(prog, grammars, examples)
+        self.abstract = abstract
+        self.lemmas: List[Lemma] = []
+        self.blocked = 0
+        # The lemmas in a trie, by their (node, production) pairs in the
+        # order of the nodes: a derivation contains a lemma when it has the
+        # pairs on a path from the root of the trie to a lemma's end (None).
+        self._trie: dict = {}
+        self._unsatisfiable = False
+
+    def analyze(self, chosen: Sequence[Tuple[int, Production]], example: int) -> Optional[Lemma]:
+        """
+        Returns the lemma of a complete derivation that fails on an example
+        (by index), or None if the derivation does not fail on it.
+        """
+        self._update()
+        nodes = derivation_nodes(chosen)
+        concrete_env = self._concrete[example]
+        env = self._environments[example]
+        # The values of the nodes, children before their parents: concrete
+        # values first, then abstract values on the paths to the nodes
+        # replaced by their symbol.
+        values: Dict[Node, Abstract] = {}
+        concrete: Dict[Node, Value] = {}
+        for node in sorted(nodes, key=lambda node: -len(node[1])):
+            hole, path = node
+            production = nodes[node]
+            concrete[node] = concrete_eval(production.pattern, concrete_env,
+                                           [concrete[(hole, path + (i,))] for i in range(len(production.slots))])
+            values[node] = Abstract.of(concrete[node])
+        roots = [(hole, ()) for hole in range(len(self.holes))]
+
+        def violated() -> bool:
+            return self.violated(example, tuple(values[root] for root in roots))
+        if not violated():
+            return None
+        kept: List[Node] = []
+        queue = list(roots)
+        while queue:
+            node = queue.pop(0)
+            hole, path = node
+            ancestors = [(hole, path[:i]) for i in range(len(path) - 1, -1, -1)]
+            saved = [(n, values[n]) for n in [node] + ancestors]
+            values[node] = self._symbols[example][hole][nodes[node].symbol]
+            for ancestor in ancestors:
+                production = nodes[ancestor]
+                values[ancestor] = abstract_eval(production.pattern, env,
+                                                 [values[(hole, ancestor[1] + (i,))]
+                                                  for i in range(len(production.slots))])
+            if not violated():
+                # The subtree is part of the conflict.
+                values.update(saved)
+                kept.append(node)
+                queue.extend((hole, path + (i,)) for i in range(len(nodes[node].slots)))
+        return frozenset((node, nodes[node]) for node in kept)
+
+    def learn(self, chosen: Sequence[Tuple[int, Production]], example: int) -> Optional[Lemma]:
+        """
+        Analyzes a complete derivation that fails on an example (by index),
+        and adds its lemma, unless a lemma of the learner already refutes
+        it. Returns the lemma, or None if there is no new lemma.
+        """
+        if self._unsatisfiable or self.contains_lemma(derivation_nodes(chosen)):
+            return None
+        lemma = self.analyze(chosen, example)
+        if lemma is None or len(lemma) == len(chosen):
+            # A lemma with the whole derivation refutes it alone.
+            return None
+        if not lemma:
+            self._unsatisfiable = True
+        trie = self._trie
+        for pair in sorted(lemma, key=lambda pair: pair[0]):
+            trie = trie.setdefault(pair, {})
+        trie[None] = lemma
+        self.lemmas.append(lemma)
+        return lemma
+
+    def contains_lemma(self, nodes: Mapping[Node, Production]) -> bool:
+        """Returns true if the derivation with these nodes contains a lemma."""
+        if self._unsatisfiable:
+            return True
+        tries = [self._trie]
+        while tries:
+            trie = tries.pop()
+            for pair, child in trie.items():
+                if pair is None:
+                    return True
+                if nodes.get(pair[0]) is pair[1]:
+                    tries.append(child)
+        return False
+
+    def refutes(self, chosen: Sequence[Tuple[int, Production]], pending: Sequence[tuple]) -> bool:
+        """
+        Returns true if a partial derivation contains a lemma, or, with
+        `abstract` set, if the abstract pruner refutes it.
+        """
+        if self.lemmas and self.contains_lemma(derivation_nodes(chosen)):
+            self.blocked += 1
+            return True
+        return self.abstract and super().refutes(chosen, pending)
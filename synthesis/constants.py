@@ -0,0 +1,149 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the solver of the unknown constants of skeletons.
+A skeleton is a completion derived from symbolic grammars (see
+`HoleGrammar`), where each `Integer` is an unknown constant instead of
+one of a finite pool of constants. The constants are found by
+counterexample-guided inductive synthesis over z3:
+- the exists phase finds values of the constants for which the
+constraint holds on every example,
+- the forall phase verifies the completion with these values, and its
+counterexample becomes a new example,
+until the completion is valid, or no values satisfy the examples.
+"""
+
+from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.grammar import UNKNOWN_NAME, is_unknown
+from verification.translate import Translator, VerificationError
+from verification.verifier import Verifier
+
+# The number of exists/forall rounds before a skeleton is given up.
+CEGIS_ROUNDS = 8
+
+
+def _replace(expr: Expression, leaf) -> Expression:
+    # Rebuilds expr with each unknown replaced by leaf(unknown), in preorder.
+    if is_unknown(expr):
+        return leaf(expr)
+    if isinstance(expr, BinaryExpr):
+        return BinaryExpr(expr.operator, _replace(expr.left_operand, leaf),
+                          _replace(expr.right_operand, leaf))
+    if isinstance(expr, UnaryExpr):
+        return UnaryExpr(expr.operator, _replace(expr.operand, leaf))
+    if isinstance(expr, Ite):
+        return Ite(_replace(expr.cond, leaf), _replace(expr.true_br, leaf),
+                   _replace(expr.false_br, leaf))
+    return expr
+
+
+def number_unknowns(skeleton: Mapping[str, Expression]) -> Tuple[Dict[str, Expression], List[str]]:
+    """
+    Returns the skeleton where each occurrence of an unknown is a distinct
+    variable `?c0`, `?c1`..., and the names of these variables.
+    """
+    names: List[str] = []
+
+    def fresh(_: Expression) -> Expression:
+        names.append(f"{UNKNOWN_NAME}{len(names)}")
+        return VarExpr(Variable(names[-1], PaddleType.INT))
+    numbered = {hole: _replace(expr, fresh) for hole, expr in skeleton.items()}
+    return numbered, names
+
+
+def fill_unknowns(skeleton: Mapping[str, Expression],
+                  values: Mapping[str, int]) -> Dict[str, Expression]:
+    """Returns a numbered skeleton with its unknowns replaced by values."""
+    return {hole: _replace(expr, lambda unknown: IntConst(values[unknown.name]))
+            for hole, expr in skeleton.items()}
+
+
+def has_unknowns(completion: Mapping[str, Expression]) -> bool:
+    """Returns true if a completion has unknown constants."""
+    found = []
+
+    def visit(node):
+        if is_unknown(node):
+            found.append(node)
+    for expr in completion.values():
+        visit(expr)
+        expr.iter(visit)
+    return bool(found)
+
+
+class ConstantSolver():
+    """
+    Solves the unknown constants of skeletons for a program.
+    - verifier: the verifier of the forall phase,
+    - rounds: the number of exists/forall rounds per skeleton,
+    - timeout: if set, how long (in milliseconds) the exists phase may take.
+    The number of skeletons given to `solve`, and of those solved, are
+    `skeletons` and `solved`.
+    """
+
+    def __init__(self, prog: Program, verifier: Optional[Verifier] = None,
+                 rounds: int = CEGIS_ROUNDS, timeout: Optional[int] = None) -> None:
+        self.prog = prog
+        self.verifier = Verifier() if verifier is None else verifier
+        self.rounds = rounds
+        self.timeout = timeout
+        self.skeletons = 0
+        self.solved = 0
+
+    def _constants(self, formula: ExprRef, translator: Translator, unknowns: List[str],
+                   examples: List[Mapping[str, Union[int, bool]]]) -> Optional[Dict[str, int]]:
+        # The exists phase: values of the unknowns for which the formula
+        # holds on every example, or None.
+        solver = Solver()
+        if self.timeout is not None:
+            solver.set("timeout", self.timeout)
+        inputs = [(name, z3var) for name, z3var in translator.variables.items()
+                  if name not in unknowns]
+        for example in examples:
+            values = [(z3var, BoolVal(bool(example.get(name, False))) if is_bool(z3var)
+                       else IntVal(example.get(name, 0))) for name, z3var in inputs]
+            solver.add(substitute(formula, *values) if values else formula)
+        if solver.check() != sat:
+            return None
+        model = solver.model()
+        return {name: model.eval(Int(name), model_completion=True).as_long()
+                for name in unknowns}
+
+    def solve(self, skeleton: Mapping[str, Expression],
+              examples: List[Dict[str, Union[int, bool]]]) -> Optional[Dict[str, Expression]]:
+        """
+        Returns the completion of a skeleton with its unknowns replaced by
+        constants for which the program is valid, or None if none is found.
+        The counterexamples of the forall phase are appended to examples.
+        """
+        self.skeletons += 1
+        numbered, unknowns = number_unknowns(skeleton)
+        translator = Translator()
+        try:
+            formula = translator.translate(Evaluator(numbered).evaluate(self.prog))
+        except VerificationError:
+            return None
+        for _ in range(self.rounds):
+            values = self._constants(formula, translator, unknowns, examples)
+            if values is None:
+                return None
+            completion = fill_unknowns(numbered, values)
+            result, cex = self.verifier.check(Evaluator(completion).evaluate(self.prog))
+            if result == unsat:
+                self.solved += 1
+                return completion
+            if cex is None:
+                return None
+            example = {var.name: cex.get(var.name, False if var.type == PaddleType.BOOL else 0)
+                       for var in self.prog.inputs}
+            if example in examples:
+                # The verifier and the exists phase disagree (undefined
+                # values): the skeleton would loop.
+                return None
+            examples.append(example)
+        return None
@@ -0,0 +1,162 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the counting layer of hole grammars. The number of
+derivations of each symbol and size (the number of productions of the
+derivation) is computed by dynamic programming, with Python's unbounded
+integers. The derivations of a symbol and size are numbered in a fixed
+order: by production (in the order of the grammar), then by the sizes of
+the slots (in the order of `compositions`), then by the numbers of the
+derivations of the slots, the first slot being the most significant.
+With these numbers:
+- `unrank` builds the n-th expression of a size without enumerating the
+ones before it, and `rank` returns the number of an expression,
+- a range of numbers is a shard of the expressions of a size, and a
+(size, number) pair is a resume point of an enumeration,
+- `sample` draws an expression of a size uniformly at random.
+Derivations are counted, not expressions: when the grammar is ambiguous
+(an expression has several derivations), an expression has several
+numbers, and `rank` returns the one of its leftmost derivation.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+from lang.ast import *
+from synthesis.analysis import GrammarAnalysis
+from synthesis.banks import compositions
+from synthesis.grammar import HoleGrammar, Production
+from synthesis.pcfg import derivation
+
+
+class GrammarCounts():
+    """
+    The numbers of derivations of the symbols of a hole grammar.
+    - grammar: the hole grammar,
+    - analysis: its static analysis (see synthesis/analysis.py).
+    The counts are computed on demand, and memoized by (symbol, size).
+    """
+
+    def __init__(self, grammar: HoleGrammar) -> None:
+        self.grammar = grammar
+        self.analysis = GrammarAnalysis(grammar)
+        self._counts: Dict[Tuple[str, int], int] = {}
+
+    def _blocks(self, symbol: str, size: int) -> Iterator[Tuple[Production, Tuple[int, ...], int]]:
+        # The productions and sizes of slots of the derivations of symbol
+        # and size, in order, with the number of derivations of each.
+        for production in self.analysis.useful(symbol):
+            if not production.slots:
+                if size == 1:
+                    yield production, (), 1
+                continue
+            for sizes in compositions(size - 1, len(production.slots),
+                                      self.analysis.slot_sizes(production)):
+                count = 1
+                for slot, slot_size in zip(production.slots, sizes):
+                    count *= self.count(slot_size, slot)
+                    if count == 0:
+                        break
+                if count:
+                    yield production, sizes, count
+
+    def count(self, size: int, symbol: Optional[str] = None) -> int:
+        """Returns the number of derivations of a size from symbol (the start symbol by default)."""
+        symbol = self.grammar.start if symbol is None else symbol
+        key = (symbol, size)
+        if key not in self._counts:
+            if size < self.analysis.min_size[symbol]:
+                self._counts[key] = 0
+            else:
+                self._counts[key] = sum(count for _, _, count in self._blocks(symbol, size))
+        return self._counts[key]
+
+    def total(self, max_size: int, symbol: Optional[str] = None) -> int:
+        """Returns the number of derivations of size at most max_size."""
+        return sum(self.count(size, symbol) for size in range(1, max_size + 1))
+
+    def choose(self, n: int, size: int,
+               symbol: Optional[str] = None) -> Tuple[Production, List[Tuple[str, int, int]]]:
+        """
+        Returns the production of the n-th derivation of a size from symbol
+        (the start symbol by default), numbered from 0, and the symbol,
+        size and number of the derivation of each of its slots. Raises an
+        IndexError if there are not that many derivations.
+        """
+        symbol = self.grammar.start if symbol is None else symbol
+        if not 0 <= n < self.count(size, symbol):
+            raise IndexError(f"{symbol} has {self.count(size, symbol)} derivations of size {size}.")
+        for production, sizes, count in self._blocks(symbol, size):
+            if n >= count:
+                n -= count
+                continue
+            # The number of each slot, in the mixed radix of the counts.
+            slots: List[Tuple[str, int, int]] = []
+            for i, (slot, slot_size) in enumerate(zip(production.slots, sizes)):
+                rest = 1
+                for later, later_size in zip(production.slots[i + 1:], sizes[i + 1:]):
+                    rest *= self.count(later_size, later)
+                slots.append((slot, slot_size, n // rest))
+                n %= rest
+            return production, slots
+
+    def unrank(self, n: int, size: int, symbol: Optional[str] = None) -> Expression:
+        """
+        Returns the expression of the n-th derivation of a size from symbol
+        (the start symbol by default), numbered from 0. Raises an
+        IndexError if there are not that many derivations.
+        """
+        production, slots = self.choose(n, size, symbol)
+        if not production.slots:
+            return production.template
+        return production.build([self.unrank(k, slot_size, slot) for slot, slot_size, k in slots])
+
+    def rank(self, expr: Expression, symbol: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """
+        Returns the size and the number of the leftmost derivation of expr
+        from symbol (the start symbol by default), or None if the grammar
+        does not derive expr.
+        """
+        symbol = self.grammar.start if symbol is None else symbol
+        productions = derivation(self.grammar, expr, symbol)
+        if productions is None:
+            return None
+        productions.reverse()
+
+        def number(symbol: str) -> Tuple[int, int]:
+            # The size and number of the derivation whose productions are
+            # next (in preorder).
+            production = productions.pop()
+            slots = [number(slot) for slot in production.slots]
+            sizes = tuple(size for size, _ in slots)
+            size = 1 + sum(sizes)
+            offset = 0
+            for other, other_sizes, count in self._blocks(symbol, size):
+                if other is production and other_sizes == sizes:
+                    break
+                offset += count
+            index = 0
+            for slot, (slot_size, slot_number) in zip(production.slots, slots):
+                index = index * self.count(slot_size, slot) + slot_number
+            return size, offset + index
+        return number(symbol)
+
+    def sample(self, size: int, rand: random.Random, symbol: Optional[str] = None) -> Optional[Expression]:
+        """
+        Returns an expression of a size drawn uniformly among the
+        derivations of symbol (the start symbol by default), or None if
+        there are none.
+        """
+        count = self.count(size, symbol)
+        return self.unrank(rand.randrange(count), size, symbol) if count else None
+
+    def expressions(self, size: int, start: int = 0, stop: Optional[int] = None,
+                    symbol: Optional[str] = None) -> Iterator[Expression]:
+        """
+        Yields the expressions of the derivations of a size numbered from
+        start to stop (excluded, the last one by default): a shard of the
+        expressions of that size.
+        """
+        count = self.count(size, symbol)
+        for n in range(start, count if stop is None else min(stop, count)):
+            yield self.unrank(n, size, symbol)
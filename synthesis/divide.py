@@ -0,0 +1,144 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the divide-and-conquer engine for grammars with an
+if-then-else production such as `G -> B ? G : G`.
+Instead of enumerating whole programs, it enumerates terms (expressions
+of `G`) and predicates (expressions of `B`) separately. Each term covers
+the examples on which the constraint holds when the hole is that term.
+Once the terms cover all the examples, a decision tree whose internal
+nodes are predicates and whose leaves are terms is learned, so that
+every example reaches a leaf covering it. The tree is the nested
+if-then-else `p1 ? t1 : (p2 ? t2 : t3)`.
+This works because the constraint at an input only depends on the value
+of the hole at that input.
+"""
+
+from typing import List, Mapping, Optional, Tuple
+from lang.ast import *
+from lang.interp import Value, hole_environment, run_program
+from synthesis.banks import BankPool
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.grammar import HoleGrammar, Production, unit_derives
+
+# The default bound on the size of the terms and predicates. The trees
+# built from them can be much larger.
+MAX_PART_SIZE = 8
+
+
+def find_ite(grammar: HoleGrammar) -> Optional[Tuple[Production, str, str]]:
+    """
+    Returns an if-then-else production `X -> B ? T : T` of a grammar whose
+    nested applications are expressions of the start symbol, with its
+    condition symbol B and its term symbol T, or None if there is none.
+    """
+    for symbol in grammar.symbols():
+        for production in grammar.productions[symbol]:
+            pattern = production.pattern
+            if not (isinstance(pattern, Ite) and all(
+                    isinstance(p, VarExpr) and p.var is None
+                    for p in (pattern.cond, pattern.true_br, pattern.false_br))):
+                continue
+            condition, true_symbol, false_symbol = production.slots
+            if (true_symbol == false_symbol
+                    and unit_derives(grammar, true_symbol, symbol)
+                    and unit_derives(grammar, grammar.start, true_symbol)):
+                return production, condition, true_symbol
+    return None
+
+
+def _count(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def learn_tree(examples: int, terms: List[Tuple[Expression, int]],
+               predicates: List[Tuple[Expression, int, int]],
+               ite: Production) -> Optional[Expression]:
+    """
+    Learns a decision tree for a set of examples.
+    Sets of examples are bit masks: bit i stands for the i-th example.
+    - terms: the terms, with the examples each of them covers,
+    - predicates: the predicates, with the examples on which each of them
+    is true, and false (undefined values are in neither),
+    - ite: the production that builds an if-then-else.
+    Returns the tree as an expression, or None if the predicates cannot
+    separate the examples.
+    """
+    for term, cover in terms:
+        if examples & ~cover == 0:
+            return term
+    best = None
+    best_score = -1
+    for predicate, true, false in predicates:
+        if examples & ~(true | false) or not examples & true or not examples & false:
+            continue
+        # Prefer the predicates after which single terms cover the most.
+        score = sum(max(_count(branch & cover) for _, cover in terms)
+                    for branch in (examples & true, examples & false))
+        if score > best_score:
+            best, best_score = (predicate, true, false), score
+    if best is None:
+        return None
+    predicate, true, false = best
+    true_tree = learn_tree(examples & true, terms, predicates, ite)
+    if true_tree is None:
+        return None
+    false_tree = learn_tree(examples & false, terms, predicates, ite)
+    if false_tree is None:
+        return None
+    return ite.build([predicate, true_tree, false_tree])
+
+
+class DivideAndConquer():
+    """
+    The divide-and-conquer engine for a hole whose grammar has an
+    if-then-else production (see `find_ite`).
+    - max_size: the largest size of the terms and predicates.
+    """
+
+    def __init__(self, prog: Program, grammar: HoleGrammar,
+                 max_size: int = MAX_PART_SIZE) -> None:
+        self.prog = prog
+        self.grammar = grammar
+        self.max_size = max_size
+        self.ite, self.condition, self.term = find_ite(grammar)
+
+    def covers(self, examples: List[Mapping[str, Value]], values: tuple) -> int:
+        """Returns the examples covered by a term with these values."""
+        mask = 0
+        for i, (example, value) in enumerate(zip(examples, values)):
+            if run_program(self.prog, example, {self.grammar.hole: value}) is True:
+                mask |= 1 << i
+        return mask
+
+    def solve(self, examples: List[Mapping[str, Value]]) -> Optional[Expression]:
+        """
+        Returns an expression that satisfies the constraint on every
+        example, or None if none is found with terms and predicates up to
+        `max_size`. Terms and predicates are enumerated by increasing size,
+        and a tree is learned whenever the terms cover all the examples.
+        """
+        environments = [hole_environment(self.prog, example) for example in examples]
+        enumerator = BottomUpEnumerator(self.grammar, environments, pool=BankPool(environments))
+        everything = (1 << len(examples)) - 1
+        terms: List[Tuple[Expression, int]] = []
+        predicates: List[Tuple[Expression, int, int]] = []
+        covered = 0
+        for size in range(1, self.max_size + 1):
+            for term, values in enumerator.level(size, self.term):
+                cover = self.covers(examples, values)
+                # Terms covering a subset of the examples of a smaller
+                # term are never needed.
+                if cover and all(cover & ~other for _, other in terms):
+                    terms.append((term, cover))
+                    covered |= cover
+            for predicate, values in enumerator.level(size, self.condition):
+                true = sum(1 << i for i, value in enumerate(values) if value is True)
+                false = sum(1 << i for i, value in enumerate(values) if value is False)
+                predicates.append((predicate, true, false))
+            if covered == everything:
+                tree = learn_tree(everything, terms, predicates, self.ite)
+                if tree is not None:
+                    return tree
+        return None
@@ -0,0 +1,262 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the view of a hole's grammar that the enumerators
+work with. Each production of the grammar becomes a template with slots:
+the slots are the occurrences of nonterminals, and of `Var` and `Integer`
+inside larger productions, and they are filled with expressions of the
+corresponding symbol.
+`Var` and `Integer` are expanded into the variables the hole can use
+(of the right type) and into a finite pool of integer constants, or, in
+a symbolic grammar, into a single unknown constant that is solved for
+later (see synthesis/constants.py).
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+from lang.ast import *
+
+# The symbols standing for `Var` (of each type) and `Integer` when they
+# appear inside a larger production.
+VAR_SYMBOL = {PaddleType.INT: "Var:int", PaddleType.BOOL: "Var:bool"}
+INTEGER_SYMBOL = "Integer"
+
+# The integer constants that `Integer` stands for, in addition to the
+# constants that appear in the program.
+DEFAULT_CONSTANTS = [0, 1, -1, 2]
+
+# The name of the variable that `Integer` stands for in a symbolic grammar.
+# It is not a Paddle identifier, so it cannot clash with a variable.
+UNKNOWN_NAME = "?c"
+
+ARITHMETIC_OPERATORS = (BinaryOperator.PLUS, BinaryOperator.MINUS,
+                        BinaryOperator.TIMES, BinaryOperator.DIV,
+                        BinaryOperator.MODULO)
+
+
+class Production():
+    """
+    A production of a symbol of a HoleGrammar.
+    - template: the expression of the production in the grammar,
+    - slots: the symbols of the expressions that fill the slots of the
+    template, in the order of `Node.children`,
+    - pattern: the template in which the i-th slot is the variable `#i`,
+    used to compute the value of an expression from the values of the
+    expressions in its slots.
+    """
+
+    def __init__(self, symbol: str, template: Expression, slots: List[str],
+                 pattern: Expression) -> None:
+        self.symbol = symbol
+        self.template = template
+        self.slots = slots
+        self.pattern = pattern
+
+    def build(self, args: List[Expression]) -> Expression:
+        """Returns the expression with each slot filled with args, in order."""
+        if not self.slots:
+            return self.template
+        return _fill(self.pattern, args)
+
+    def __str__(self) -> str:
+        return f"{self.symbol} -> {self.template}"
+
+
+def slot_name(i: int) -> str:
+    """The name of the variable of the i-th slot in a production pattern."""
+    return f"#{i}"
+
+
+def is_unknown(expr: Expression) -> bool:
+    """Returns true if expr is an unknown constant of a symbolic grammar."""
+    return isinstance(expr, VarExpr) and expr.name.startswith(UNKNOWN_NAME)
+
+
+def _fill(pattern: Expression, args: List[Expression]) -> Expression:
+    if isinstance(pattern, VarExpr) and pattern.var is None:
+        return args[int(pattern.name[1:])]
+    if isinstance(pattern, BinaryExpr):
+        return BinaryExpr(pattern.operator, _fill(pattern.left_operand, args),
+                          _fill(pattern.right_operand, args))
+    if isinstance(pattern, UnaryExpr):
+        return UnaryExpr(pattern.operator, _fill(pattern.operand, args))
+    if isinstance(pattern, Ite):
+        return Ite(_fill(pattern.cond, args), _fill(pattern.true_br, args),
+                   _fill(pattern.false_br, args))
+    return pattern
+
+
+def program_constants(prog: Program) -> Set[int]:
+    """Returns the integer constants that appear in the program."""
+    constants = set()
+
+    def collect(node):
+        if isinstance(node, IntConst):
+            constants.add(node.value)
+    for assignment in prog.assignments:
+        collect(assignment.expr)
+        assignment.expr.iter(collect)
+    collect(prog.constraint)
+    prog.constraint.iter(collect)
+    return constants
+
+
+class HoleGrammar():
+    """
+    The grammar of a hole, ready for enumeration.
+    - hole: the name of the hole,
+    - start: the name of the start symbol (the first rule of the grammar),
+    - variables: the variables the hole can use, sorted by name,
+    - types: the type of each symbol,
+    - productions: the list of productions of each symbol,
+    - symbolic: whether `Integer` stands for the unknown constant
+    UNKNOWN_NAME rather than for each of the constants.
+    Nonterminals keep their name in the grammar; `Var` and `Integer`
+    inside larger productions become the symbols of VAR_SYMBOL and
+    INTEGER_SYMBOL.
+    """
+
+    def __init__(self, prog: Program, hole: HoleDeclaration,
+                 constants: Optional[Iterable[int]] = None,
+                 symbolic: bool = False) -> None:
+        self.hole = hole.var.name
+        self.symbolic = symbolic
+        self.type = hole.var.type
+        self.grammar = hole.grammar
+        self.start = hole.grammar.rules[0].symbol.name
+        self.variables = sorted(prog.hole_can_use(self.hole),
+                                key=lambda v: v.name)
+        if constants is None:
+            constants = set(DEFAULT_CONSTANTS).union(program_constants(prog))
+        self.constants = sorted(set(constants), key=lambda c: (abs(c), c < 0))
+        self._nonterminals = {rule.symbol for rule in hole.grammar.rules}
+        self.types: Dict[str, PaddleType] = {}
+        self.productions: Dict[str, List[Production]] = {}
+        for rule in hole.grammar.rules:
+            self.types[rule.symbol.name] = rule.symbol.type
+            self.productions[rule.symbol.name] = []
+        for rule in hole.grammar.rules:
+            for production in rule.productions:
+                self._add_production(rule.symbol.name, production)
+
+    def symbols(self) -> List[str]:
+        """Returns the names of all the symbols of the grammar."""
+        return list(self.productions)
+
+    def leaves(self, ptype: PaddleType) -> List[Expression]:
+        """Returns the expressions that `Var` stands for, for a type."""
+        return [VarExpr(v) for v in self.variables if v.type == ptype]
+
+    def _add_production(self, symbol: str, template: Expression) -> None:
+        ptype = self.types[symbol]
+        if isinstance(template, GrammarVar):
+            for leaf in self.leaves(ptype):
+                self.productions[symbol].append(Production(symbol, leaf, [], leaf))
+        elif isinstance(template, GrammarInteger) and self.symbolic:
+            leaf = VarExpr(Variable(UNKNOWN_NAME, PaddleType.INT))
+            self.productions[symbol].append(Production(symbol, leaf, [], leaf))
+        elif isinstance(template, GrammarInteger):
+            for constant in self.constants:
+                leaf = IntConst(constant)
+                self.productions[symbol].append(Production(symbol, leaf, [], leaf))
+        else:
+            slots = []
+            pattern = self._pattern(template, ptype, slots)
+            self.productions[symbol].append(
+                Production(symbol, template, slots, pattern))
+
+    def _pseudo_symbol(self, template: Expression, ptype: PaddleType) -> str:
+        # `Var` and `Integer` inside a production are slots of symbols
+        # whose productions are the leaves they stand for.
+        if isinstance(template, GrammarVar):
+            name = VAR_SYMBOL[ptype]
+        else:
+            name = INTEGER_SYMBOL
+            ptype = PaddleType.INT
+        if name not in self.productions:
+            self.types[name] = ptype
+            self.productions[name] = []
+            self._add_production(name, template)
+        return name
+
+    def _pattern(self, template: Expression, ptype: PaddleType,
+                 slots: List[str]) -> Expression:
+        if isinstance(template, VarExpr) and template.var in self._nonterminals:
+            slots.append(template.name)
+            return VarExpr(name=slot_name(len(slots) - 1))
+        if isinstance(template, (GrammarVar, GrammarInteger)):
+            slots.append(self._pseudo_symbol(template, ptype))
+            return VarExpr(name=slot_name(len(slots) - 1))
+        if isinstance(template, BinaryExpr):
+            op = template.operator
+            if op in (BinaryOperator.AND, BinaryOperator.OR):
+                left_type = right_type = PaddleType.BOOL
+            elif op in (BinaryOperator.EQUALS, BinaryOperator.NOTEQUALS):
+                left_type = (self.type_of(template.left_operand)
+                             or self.type_of(template.right_operand)
+                             or PaddleType.INT)
+                right_type = left_type
+            else:
+                left_type = right_type = PaddleType.INT
+            return BinaryExpr(op, self._pattern(template.left_operand, left_type, slots),
+                              self._pattern(template.right_operand, right_type, slots))
+        if isinstance(template, UnaryExpr):
+            operand_type = (PaddleType.BOOL if template.operator == UnaryOperator.NOT
+                            else PaddleType.INT)
+            return UnaryExpr(template.operator,
+                             self._pattern(template.operand, operand_type, slots))
+        if isinstance(template, Ite):
+            return Ite(self._pattern(template.cond, PaddleType.BOOL, slots),
+                       self._pattern(template.true_br, ptype, slots),
+                       self._pattern(template.false_br, ptype, slots))
+        return template
+
+    def type_of(self, template: Expression) -> Optional[PaddleType]:
+        """Returns the type of a grammar expression, if it can be known."""
+        if isinstance(template, VarExpr) and template.var is not None:
+            return template.var.type
+        if isinstance(template, (IntConst, GrammarInteger)):
+            return PaddleType.INT
+        if isinstance(template, BoolConst):
+            return PaddleType.BOOL
+        if isinstance(template, BinaryExpr):
+            if template.operator in ARITHMETIC_OPERATORS:
+                return PaddleType.INT
+            return PaddleType.BOOL
+        if isinstance(template, UnaryExpr):
+            if template.operator == UnaryOperator.NOT:
+                return PaddleType.BOOL
+            return PaddleType.INT
+        if isinstance(template, Ite):
+            return self.type_of(template.true_br) or self.type_of(template.false_br)
+        return None
+
+
+def is_unit(production: Production) -> bool:
+    """Returns true if the production only derives another symbol."""
+    return (len(production.slots) == 1 and isinstance(production.pattern, VarExpr)
+            and production.pattern.var is None)
+
+
+def unit_closure(grammar: HoleGrammar, symbol: str) -> Set[str]:
+    """
+    Returns the symbols that symbol derives with unit productions only
+    (symbol included): their expressions are expressions of symbol.
+    """
+    reached = {symbol}
+    todo = [symbol]
+    while todo:
+        current = todo.pop()
+        for production in grammar.productions[current]:
+            if is_unit(production) and production.slots[0] not in reached:
+                reached.add(production.slots[0])
+                todo.append(production.slots[0])
+    return reached
+
+
+def unit_derives(grammar: HoleGrammar, symbol: str, other: str) -> bool:
+    """
+    Returns true if symbol derives other with unit productions only, so
+    that every expression of other is an expression of symbol.
+    """
+    return other in unit_closure(grammar, symbol)
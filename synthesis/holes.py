@@ -0,0 +1,207 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the handling of programs with several holes.
+- The completions of several holes are combined diagonally: by
+increasing total size, so that no hole waits for another one to have
+exhausted its expressions.
+- The holes are split into independent groups, using the def-use chains
+of the program: the constraint is a conjunction, and two holes are in
+the same group when a conjunct depends on both (through the assigned
+variables), or when one can use a variable assigned from the other.
+Each group is a smaller program with its holes, whose constraint is the
+conjunction of its conjuncts. A completion of the whole program is valid
+exactly when the completion of each group is valid for its program, so
+the groups can be solved separately: the cost of the search is the sum
+of the costs of the groups, instead of their product.
+- The holes that are interchangeable (the same grammar, the same
+variables, and a constraint that is the same when they are swapped) form
+classes, and only one ordered representative of the permutations of a
+completion over a class is searched: the constraint holds for one of them
+exactly when it holds for all of them.
+"""
+
+from itertools import product
+from math import prod
+from typing import Callable, Dict, Iterator, List, Mapping, Sequence, Set, Tuple
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.banks import compositions, grammar_key
+from synthesis.canonical import canonical
+from synthesis.grammar import HoleGrammar
+
+
+def diagonal(levels: Sequence[Callable[[int], Sequence]], max_sizes: Sequence[int],
+             classes: Sequence[Sequence[int]] = (), start: int = 0) -> Iterator[tuple]:
+    """
+    Yields the combinations of one item of each of several enumerations by
+    increasing total size, where levels[i](size) returns the items of
+    size of the i-th enumeration, up to max_sizes[i]. Each combination
+    has, for each enumeration, the size of its item and the item.
+    The enumerations of each class of indices in classes must be the same:
+    of the combinations that permute the items of a class, only the one
+    whose items are in order (by size, then by position in their level) is
+    yielded.
+    The first start combinations are skipped (to resume an enumeration):
+    the combinations of sizes without ties are skipped by their number.
+    """
+    pairs = [(a, b) for indices in classes for a, b in zip(indices, indices[1:])]
+    for total in range(len(levels), sum(max_sizes) + 1):
+        for sizes in compositions(total, len(levels)):
+            if any(size > max_size for size, max_size in zip(sizes, max_sizes)):
+                continue
+            if any(sizes[a] > sizes[b] for a, b in pairs):
+                continue
+            ties = [(a, b) for a, b in pairs if sizes[a] == sizes[b]]
+            if start and not ties:
+                count = prod(len(level(size)) for level, size in zip(levels, sizes))
+                if start >= count:
+                    start -= count
+                    continue
+            for combination in product(*(enumerate(level(size)) for level, size in zip(levels, sizes))):
+                if any(combination[a][0] > combination[b][0] for a, b in ties):
+                    continue
+                if start:
+                    start -= 1
+                    continue
+                yield tuple((size, item) for size, (_, item) in zip(sizes, combination))
+
+
+def conjuncts(expr: Expression) -> List[Expression]:
+    """Returns the operands of the top-level conjunctions of an expression."""
+    if isinstance(expr, BinaryExpr) and expr.operator == BinaryOperator.AND:
+        return conjuncts(expr.left_operand) + conjuncts(expr.right_operand)
+    return [expr]
+
+
+def _conjunction(exprs: List[Expression]) -> Expression:
+    if not exprs:
+        return BoolConst(True)
+    result = exprs[0]
+    for expr in exprs[1:]:
+        result = BinaryExpr(BinaryOperator.AND, result, expr)
+    return result
+
+
+def hole_dependencies(prog: Program) -> Dict[str, Set[str]]:
+    """
+    Returns the holes (by name) that the value of each assigned variable
+    depends on, by variable name.
+    """
+    holes = {hole.var.name for hole in prog.holes}
+    depends: Dict[str, Set[str]] = {}
+    for assignment in prog.assignments:
+        depends[assignment.var.name] = set().union(
+            *({var.name} if var.name in holes else depends.get(var.name, set())
+              for var in assignment.expr.uses()))
+    return depends
+
+
+class HoleGroup():
+    """
+    An independent group of holes of a program.
+    - holes: the names of the holes, in the order of the program,
+    - prog: the program of the group: the holes of the group, and the
+    conjunction of the conjuncts that depend on them as constraint (the
+    inputs and assignments are the ones of the whole program).
+    """
+
+    def __init__(self, prog: Program, holes: List[str], constraints: List[Expression]) -> None:
+        self.holes = holes
+        self.prog = Program(prog.inputs, [hole for hole in prog.holes if hole.var.name in holes],
+                            prog.assignments, _conjunction(constraints))
+
+
+def independent_groups(prog: Program) -> List[HoleGroup]:
+    """
+    Returns the independent groups of holes of a program, in the order of
+    their first hole. The conjuncts that depend on no hole go to the first
+    group, so that a program whose constraint fails without holes still
+    has no solution.
+    """
+    holes = [hole.var.name for hole in prog.holes]
+    depends = hole_dependencies(prog)
+    # The holes are merged in a union-find structure, whose representative
+    # of a group is its first hole.
+    parent = {hole: hole for hole in holes}
+
+    def find(hole: str) -> str:
+        while parent[hole] != hole:
+            hole = parent[hole]
+        return hole
+
+    def merge(uses: Set[str]) -> None:
+        for hole in uses:
+            parent[find(hole)] = find(min(uses, key=holes.index))
+    # The holes each conjunct depends on.
+    parts: List[Tuple[Expression, Set[str]]] = []
+    for conjunct in conjuncts(prog.constraint):
+        uses = set().union(*({var.name} if var.name in parent else depends.get(var.name, set())
+                             for var in conjunct.uses()))
+        parts.append((conjunct, uses))
+        merge(uses)
+    # A hole whose completion can use a variable assigned from other holes
+    # depends on them.
+    for hole in holes:
+        merge({hole}.union(*(depends.get(var.name, set()) for var in prog.hole_can_use(hole))))
+    representatives: List[str] = []
+    for hole in holes:
+        if find(hole) not in representatives:
+            representatives.append(find(hole))
+    groups = []
+    for i, representative in enumerate(representatives):
+        members = [hole for hole in holes if find(hole) == representative]
+        constraints = [conjunct for conjunct, uses in parts
+                       if (uses and find(next(iter(uses))) == representative) or (not uses and i == 0)]
+        groups.append(HoleGroup(prog, members, constraints))
+    return groups
+
+
+def _placeholders(prog: Program, names: Mapping[str, str]) -> Dict[str, Expression]:
+    # The completion of each hole by the variable `?h:` of a hole name.
+    return {hole.var.name: VarExpr(Variable(f"?h:{names.get(hole.var.name, hole.var.name)}",
+                                            hole.var.type))
+            for hole in prog.holes}
+
+
+def interchangeable(prog: Program, grammars: Mapping[str, HoleGrammar]) -> List[List[str]]:
+    """
+    Returns the classes of interchangeable holes of a program (by name, in
+    the order of the program), with at least two holes each. Two holes are
+    interchangeable when their grammars are structurally identical and use
+    the same variables, they can use the same variables, and the canonical
+    form of the constraint is the same when they are swapped.
+    """
+    def signature(hole: str) -> tuple:
+        grammar = grammars[hole]
+        return (grammar_key(grammar), grammar.symbols().index(grammar.start),
+                tuple(var.name for var in grammar.variables),
+                tuple(sorted(var.name for var in prog.hole_can_use(hole))))
+
+    def constraint(names: Mapping[str, str]) -> tuple:
+        return expression_key(canonical(Evaluator(_placeholders(prog, names)).evaluate(prog)))
+    original = constraint({})
+    classes: List[List[str]] = []
+    for hole in (hole.var.name for hole in prog.holes):
+        for members in classes:
+            # Swaps generate all permutations: being interchangeable with
+            # the first hole of a class is being interchangeable with all.
+            first = members[0]
+            if (signature(first) == signature(hole)
+                    and constraint({first: hole, hole: first}) == original):
+                members.append(hole)
+                break
+        else:
+            classes.append([hole])
+    return [members for members in classes if len(members) > 1]
+
+
+def is_representative(completion: Mapping[str, Expression], classes: List[List[str]]) -> bool:
+    """
+    Returns true if the completions of the holes of each class of
+    interchangeable holes are in order, by their keys: a completion is the
+    representative of its permutations over the classes.
+    """
+    return all(repr(expression_key(completion[a])) <= repr(expression_key(completion[b]))
+               for members in classes for a, b in zip(members, members[1:]))
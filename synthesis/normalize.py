@@ -0,0 +1,197 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the normalization of hole grammars. The normalized
+grammar derives exactly the same expressions, in fewer ways:
+- symbols that derive no expression, and the productions that use them,
+are dropped, as well as the symbols unreachable from the start symbol,
+- symbols that derive each other with unit productions (e.g. `G -> H`
+and `H -> G`) have the same expressions and are merged,
+- duplicate productions of a symbol are merged, and unit productions of a
+symbol to itself are dropped,
+- nonterminals used in a single place are inlined there, when the use is
+a unit production (`G -> ITE`) or when they have a single production.
+A derivation in the normalized grammar never uses more productions than
+the derivation of the same expression in the original grammar, so the
+sizes of expressions can only decrease.
+"""
+
+import copy
+from typing import Dict, List, Mapping, Set, Tuple
+from lang.ast import *
+from synthesis.analysis import GrammarAnalysis
+from synthesis.grammar import HoleGrammar, Production, is_unit, slot_name, unit_closure
+
+
+def _map(pattern: Expression, template: Expression, slot) -> Tuple[Expression, Expression]:
+    # Rebuilds a pattern and its template in parallel, where slot(i,
+    # template) returns the new pattern and template of the i-th slot.
+    if isinstance(pattern, VarExpr) and pattern.var is None:
+        return slot(int(pattern.name[1:]), template)
+    if isinstance(pattern, BinaryExpr):
+        left = _map(pattern.left_operand, template.left_operand, slot)
+        right = _map(pattern.right_operand, template.right_operand, slot)
+        return (BinaryExpr(pattern.operator, left[0], right[0]),
+                BinaryExpr(template.operator, left[1], right[1]))
+    if isinstance(pattern, UnaryExpr):
+        operand = _map(pattern.operand, template.operand, slot)
+        return UnaryExpr(pattern.operator, operand[0]), UnaryExpr(template.operator, operand[1])
+    if isinstance(pattern, Ite):
+        cond = _map(pattern.cond, template.cond, slot)
+        true_br = _map(pattern.true_br, template.true_br, slot)
+        false_br = _map(pattern.false_br, template.false_br, slot)
+        return (Ite(cond[0], true_br[0], false_br[0]),
+                Ite(cond[1], true_br[1], false_br[1]))
+    return pattern, template
+
+
+def inline(production: Production, index: int, inlined: Production) -> Production:
+    """
+    Returns the production where the expression in the slot index is
+    derived by the production inlined.
+    """
+    width = len(inlined.slots)
+
+    def shifted(offset: int):
+        return lambda i, template: (VarExpr(name=slot_name(i + offset)), template)
+
+    def slot(i: int, template: Expression) -> Tuple[Expression, Expression]:
+        if i == index:
+            return _map(inlined.pattern, inlined.template, shifted(index))
+        return VarExpr(name=slot_name(i + width - 1 if i > index else i)), template
+    pattern, template = _map(production.pattern, production.template, slot)
+    slots = production.slots[:index] + inlined.slots + production.slots[index + 1:]
+    if not slots:
+        # Without slots, the template is the expression itself.
+        return Production(production.symbol, template, [], template)
+    return Production(production.symbol, template, slots, pattern)
+
+
+class Normalizer():
+    """
+    Rewrites a copy of a hole grammar into its normal form. Each rewriting
+    returns true if it changed the grammar.
+    """
+
+    def __init__(self, grammar: HoleGrammar) -> None:
+        self.grammar = copy.copy(grammar)
+        self.grammar.types = dict(grammar.types)
+        self.grammar.productions = {symbol: list(productions)
+                                    for symbol, productions in grammar.productions.items()}
+        # The variables of the nonterminals, to rename them in templates.
+        self._nonterminals = {rule.symbol.name: rule.symbol for rule in grammar.grammar.rules}
+
+    def _rename(self, renaming: Mapping[str, str]) -> None:
+        # Replaces the symbols in the slots of every production, and moves
+        # the productions of each renamed symbol to its new name.
+        def rename(i: int, template: Expression) -> Tuple[Expression, Expression]:
+            if isinstance(template, VarExpr) and template.name in renaming:
+                template = VarExpr(self._nonterminals[renaming[template.name]])
+            return VarExpr(name=slot_name(i)), template
+        for old, new in renaming.items():
+            self.grammar.productions[new] += self.grammar.productions.pop(old)
+            del self.grammar.types[old]
+        for symbol in self.grammar.symbols():
+            productions = []
+            for production in self.grammar.productions[symbol]:
+                if production.symbol != symbol or any(s in renaming for s in production.slots):
+                    pattern, template = _map(production.pattern, production.template, rename)
+                    if not production.slots:
+                        pattern = template = production.template
+                    production = Production(symbol, template,
+                                            [renaming.get(s, s) for s in production.slots],
+                                            pattern)
+                productions.append(production)
+            self.grammar.productions[symbol] = productions
+
+    def drop_useless(self) -> bool:
+        """Drops the unproductive and unreachable symbols, and the useless productions."""
+        analysis = GrammarAnalysis(self.grammar)
+        changed = False
+        for symbol in self.grammar.symbols():
+            if symbol not in analysis.productive or symbol not in analysis.reachable:
+                del self.grammar.productions[symbol]
+                del self.grammar.types[symbol]
+                changed = True
+            elif len(analysis.useful(symbol)) != len(self.grammar.productions[symbol]):
+                self.grammar.productions[symbol] = list(analysis.useful(symbol))
+                changed = True
+        return changed
+
+    def merge_unit_cycles(self) -> bool:
+        """Merges the symbols that derive each other with unit productions."""
+        closures = {symbol: unit_closure(self.grammar, symbol) for symbol in self.grammar.symbols()}
+        renaming: Dict[str, str] = {}
+        for symbol in self.grammar.symbols():
+            if symbol in renaming:
+                continue
+            for other in closures[symbol]:
+                # The first symbol of a cycle stays: the start symbol stays.
+                if other != symbol and symbol in closures[other]:
+                    renaming[other] = symbol
+        if renaming:
+            self._rename(renaming)
+        return bool(renaming)
+
+    def merge_duplicates(self) -> bool:
+        """
+        Merges the duplicate productions of each symbol, and drops the unit
+        productions of a symbol to itself.
+        """
+        changed = False
+        for symbol in self.grammar.symbols():
+            kept = []
+            seen: Set[Tuple[tuple, tuple]] = set()
+            for production in self.grammar.productions[symbol]:
+                key = (expression_key(production.pattern), tuple(production.slots))
+                if key in seen or (is_unit(production) and production.slots[0] == symbol):
+                    changed = True
+                    continue
+                seen.add(key)
+                kept.append(production)
+            self.grammar.productions[symbol] = kept
+        return changed
+
+    def inline_single_uses(self) -> bool:
+        """
+        Inlines a nonterminal used in a single slot of the grammar, if the
+        use is a unit production or the nonterminal has a single production.
+        """
+        uses: Dict[str, List[Tuple[str, int, int]]] = {s: [] for s in self.grammar.symbols()}
+        for symbol in self.grammar.symbols():
+            for i, production in enumerate(self.grammar.productions[symbol]):
+                for slot, name in enumerate(production.slots):
+                    uses[name].append((symbol, i, slot))
+        for name, places in uses.items():
+            if name == self.grammar.start or len(places) != 1:
+                continue
+            symbol, i, slot = places[0]
+            production = self.grammar.productions[symbol][i]
+            productions = self.grammar.productions[name]
+            if is_unit(production):
+                inlined = [Production(symbol, p.template, p.slots, p.pattern) for p in productions]
+            elif len(productions) == 1:
+                inlined = [inline(production, slot, productions[0])]
+            else:
+                continue
+            self.grammar.productions[symbol][i:i + 1] = inlined
+            del self.grammar.productions[name]
+            del self.grammar.types[name]
+            return True
+        return False
+
+    def normalize(self) -> HoleGrammar:
+        """Applies the rewritings until none applies, and returns the grammar."""
+        while (self.drop_useless() or self.merge_unit_cycles()
+               or self.merge_duplicates() or self.inline_single_uses()):
+            pass
+        return self.grammar
+
+
+def normalize(grammar: HoleGrammar) -> HoleGrammar:
+    """
+    Returns the normal form of a hole grammar: a copy that derives the same
+    expressions in fewer ways (see the description of this file).
+    """
+    return Normalizer(grammar).normalize()
@@ -0,0 +1,184 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the probabilistic grammar (PCFG) learned from solutions.
+The productions of different grammars are compared through their
+feature: the production where nonterminals are replaced by their type
+and variables by `Var`, e.g. `int -> int + int` or `bool -> int > int`.
+Training counts how many times each feature is used in the derivations
+of solutions. The cost of a production of a grammar is then the negative
+log of its probability among the productions of its symbol, so that the
+best-first enumerator tries the likely productions first.
+"""
+
+import json
+import math
+from typing import Dict, Iterable, List, Mapping, Optional
+from lang.ast import *
+from synthesis.best_first import Cost
+from synthesis.grammar import HoleGrammar, Production
+
+
+def _render(template: Expression, pattern: Expression, slots: List[str],
+            types: Mapping[str, PaddleType]) -> str:
+    # Renders the template, with the slots of the pattern replaced by the
+    # type of their symbol.
+    if isinstance(pattern, VarExpr) and pattern.var is None:
+        return str(types[slots[int(pattern.name[1:])]])
+    if isinstance(pattern, BinaryExpr):
+        return (f"({_render(template.left_operand, pattern.left_operand, slots, types)} "
+                f"{pattern.operator} "
+                f"{_render(template.right_operand, pattern.right_operand, slots, types)})")
+    if isinstance(pattern, UnaryExpr):
+        return f"({pattern.operator} {_render(template.operand, pattern.operand, slots, types)})"
+    if isinstance(pattern, Ite):
+        return (f"({_render(template.cond, pattern.cond, slots, types)} ? "
+                f"{_render(template.true_br, pattern.true_br, slots, types)} : "
+                f"{_render(template.false_br, pattern.false_br, slots, types)})")
+    return str(template)
+
+
+def feature(grammar: HoleGrammar, production: Production) -> str:
+    """Returns the feature of a production of a grammar."""
+    lhs = grammar.types[production.symbol]
+    if not production.slots and isinstance(production.template, VarExpr):
+        return f"{lhs} -> Var"
+    return f"{lhs} -> {_render(production.template, production.pattern, production.slots, grammar.types)}"
+
+
+def production_key(production: Production) -> tuple:
+    """
+    Returns the key of a production: its symbol, the key of its template
+    and the symbols of its slots, which are the same in every grammar
+    built from the same hole.
+    """
+    return (production.symbol, expression_key(production.template), tuple(production.slots))
+
+
+def _match(pattern: Expression, expr: Expression, args: List[Expression]) -> bool:
+    # Matches expr against the pattern of a production, and collects the
+    # subexpressions in its slots.
+    if isinstance(pattern, VarExpr) and pattern.var is None:
+        args.append(expr)
+        return True
+    if isinstance(pattern, BinaryExpr):
+        return (isinstance(expr, BinaryExpr) and expr.operator == pattern.operator
+                and _match(pattern.left_operand, expr.left_operand, args)
+                and _match(pattern.right_operand, expr.right_operand, args))
+    if isinstance(pattern, UnaryExpr):
+        return (isinstance(expr, UnaryExpr) and expr.operator == pattern.operator
+                and _match(pattern.operand, expr.operand, args))
+    if isinstance(pattern, Ite):
+        return (isinstance(expr, Ite) and _match(pattern.cond, expr.cond, args)
+                and _match(pattern.true_br, expr.true_br, args)
+                and _match(pattern.false_br, expr.false_br, args))
+    return expression_key(pattern) == expression_key(expr)
+
+
+def derivation(grammar: HoleGrammar, expr: Expression,
+               symbol: Optional[str] = None) -> Optional[List[Production]]:
+    """
+    Returns the productions of a leftmost derivation of expr from symbol
+    (the start symbol by default), or None if the grammar does not derive
+    expr. Unit productions (a symbol deriving another) are followed at
+    most once per symbol, to avoid cycles.
+    """
+    def derive(expr: Expression, symbol: str, units: frozenset) -> Optional[List[Production]]:
+        for production in grammar.productions[symbol]:
+            args: List[Expression] = []
+            if not _match(production.pattern, expr, args):
+                continue
+            if len(production.slots) == 1 and args[0] is expr:
+                # A unit production: expr is derived by the slot symbol.
+                slot = production.slots[0]
+                if slot in units:
+                    continue
+                rest = derive(expr, slot, units | {slot})
+            else:
+                rest = []
+                for slot, arg in zip(production.slots, args):
+                    sub = derive(arg, slot, frozenset([slot]))
+                    if sub is None:
+                        rest = None
+                        break
+                    rest += sub
+            if rest is not None:
+                return [production] + rest
+        return None
+    start = grammar.start if symbol is None else symbol
+    return derive(expr, start, frozenset([start]))
+
+
+class PCFG():
+    """
+    The counts of the features of the productions used in solutions.
+    - counts: the number of uses of each feature,
+    - smoothing: the count added to every production, so that productions
+    never seen in solutions keep a nonzero probability.
+    """
+
+    def __init__(self, counts: Optional[Mapping[str, int]] = None,
+                 smoothing: float = 1.0) -> None:
+        self.counts: Dict[str, int] = dict(counts or {})
+        self.smoothing = smoothing
+
+    def add(self, grammar: HoleGrammar, expr: Expression) -> bool:
+        """
+        Counts the productions of the derivation of expr, a solution for
+        a hole of this grammar. Returns false if the grammar does not
+        derive expr.
+        """
+        productions = derivation(grammar, expr)
+        if productions is None:
+            return False
+        for production in productions:
+            key = feature(grammar, production)
+            self.counts[key] = self.counts.get(key, 0) + 1
+        return True
+
+    def probabilities(self, grammar: HoleGrammar) -> Dict[int, float]:
+        """
+        Returns the probability of each production of a grammar (by id)
+        among the productions of its symbol.
+        """
+        probabilities = {}
+        for symbol in grammar.symbols():
+            productions = grammar.productions[symbol]
+            weights = [self.counts.get(feature(grammar, p), 0) + self.smoothing
+                       for p in productions]
+            total = sum(weights)
+            for production, weight in zip(productions, weights):
+                probabilities[id(production)] = weight / total
+        return probabilities
+
+    def cost(self, grammars: Iterable[HoleGrammar]) -> Cost:
+        """
+        Returns the cost function of the best-first enumerator for the
+        productions of these grammars: the negative log of their
+        probability. The costs are keyed by `production_key`, so that the
+        productions of other grammars with the same symbols and templates
+        (e.g. the grammars of a group of holes) get the same cost; other
+        productions (e.g. of symbolic grammars) get the largest cost.
+        """
+        costs: Dict[tuple, float] = {}
+        for grammar in grammars:
+            probabilities = self.probabilities(grammar)
+            for symbol in grammar.symbols():
+                for production in grammar.productions[symbol]:
+                    costs.setdefault(production_key(production), -math.log(probabilities[id(production)]))
+        default = max(costs.values(), default=1.0)
+        return lambda production: costs.get(production_key(production), default)
+
+    def save(self, path: str) -> None:
+        """Writes the counts to a JSON file."""
+        with open(path, "w") as out:
+            json.dump({"smoothing": self.smoothing, "counts": self.counts},
+                      out, indent=2, sort_keys=True)
+
+    @staticmethod
+    def load(path: str) -> "PCFG":
+        """Reads the counts written by `save`."""
+        with open(path) as weights:
+            data = json.load(weights)
+        return PCFG(data["counts"], data["smoothing"])
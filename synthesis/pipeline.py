@@ -0,0 +1,295 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the pipelined synthesis loop. The loop of main.py runs
+its stages one after the other: the synthesizer enumerates a completion,
+the completion is evaluated into a formula (`Evaluator.evaluate`), and the
+formula is verified, so that the solver waits while Python enumerates,
+and the other way around. A Pipeline runs the three stages at the same
+time, coordinated by an asyncio event loop:
+- enumerate: the synthesizer returns batches of completions (see
+`Synthesizer.candidates`) in a thread of its own, the only one that uses
+the synthesizer,
+- evaluate: threads evaluate the completions into formulas, and drop the
+completions that fail a counterexample found after they were enumerated,
+- verify: worker processes verify batches of formulas, each with its own
+verifier (z3 cannot be used by several threads at once).
+The stages are connected by bounded queues: a stage waits while the queue
+of the next stage is full (backpressure), so that the enumeration does
+not run ahead of the verification. The counterexamples of the invalid
+formulas go back to the synthesizer before its next batch. When a formula
+is valid, the pipeline stops: the queued completions are dropped, and the
+enumeration stops after its current batch.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+from lang.ast import *
+from lang.interp import Value, hole_environment, interpret, run_program
+from lang.symb_eval import Evaluator
+from synthesis.synth import VERIFY_TIMEOUT, SynthesisException, Synthesizer
+from verification.verifier import Verdict, Verifier
+
+# The number of completions the synthesizer enumerates at a time.
+PIPELINE_BATCH = 8
+# The number of items each queue between two stages holds.
+QUEUE_SIZE = 32
+# The number of threads of the evaluation stage.
+EVALUATE_WORKERS = 1
+# The number of processes of the verification stage: one core is left to
+# the enumeration.
+VERIFY_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+# The largest number of formulas a verification worker checks in one
+# solver session (see `Verifier.check_batch`).
+VERIFY_BATCH = 8
+
+# The verifier of a verification process (see `_start_worker`).
+_verifier: Optional[Verifier] = None
+
+
+def _start_worker(timeout: Optional[int]) -> None:
+    # Runs in each verification process, before its first batch.
+    global _verifier
+    _verifier = Verifier(timeout=timeout)
+
+
+def _verify(formulas: List[Expression]) -> List[Verdict]:
+    # Runs in a verification process.
+    return _verifier.check_batch(formulas)
+
+
+class StageCounters():
+    """
+    The counters of a stage of a pipeline.
+    - items: the number of items the stage processed,
+    - busy: the time the stage spent processing them, in seconds,
+    - starved: the time the stage spent waiting for items,
+    - stalled: the time the stage spent waiting for room in the queue of
+    the next stage (backpressure).
+    With several workers, the times are the sums of the times of the
+    workers.
+    """
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.stalled = 0.0
+
+    def throughput(self, elapsed: float) -> float:
+        """Returns the number of items processed per second during elapsed seconds."""
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+
+class Pipeline():
+    """
+    A pipelined synthesis loop over a synthesizer.
+    - synt: the synthesizer, which must not be used while the pipeline runs,
+    - method: the method whose completions are verified (see `Synthesizer.batch`),
+    - batch_size: the number of completions enumerated at a time,
+    - queue_size: the number of items each queue between stages holds,
+    - evaluate_workers: the number of threads of the evaluation stage,
+    - verify_workers: the number of processes of the verification stage,
+    - limit: if set, the largest number of completions enumerated.
+    After a run, `counters` maps each stage ("enumerate", "evaluate",
+    "verify") to its counters, `pruned` is the number of completions
+    dropped by the evaluation stage, and `elapsed` is the duration of the
+    run in seconds.
+    """
+
+    def __init__(self, synt: Synthesizer, method: int = 3, batch_size: int = PIPELINE_BATCH,
+                 queue_size: int = QUEUE_SIZE, evaluate_workers: int = EVALUATE_WORKERS,
+                 verify_workers: int = VERIFY_WORKERS, limit: Optional[int] = None) -> None:
+        self.synt = synt
+        self.method = method
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.evaluate_workers = evaluate_workers
+        self.verify_workers = verify_workers
+        self.limit = limit
+        self.counters: Dict[str, StageCounters] = {}
+        self.pruned = 0
+        self.elapsed = 0.0
+
+    def run(self) -> Optional[Dict[str, Expression]]:
+        """
+        Runs the pipeline until a completion is valid, and returns it, or
+        returns None if the method has no more completions (or the limit
+        is reached). The exception of a stage is raised again.
+        """
+        self.counters = {stage: StageCounters() for stage in ("enumerate", "evaluate", "verify")}
+        self.pruned = 0
+        start = time.perf_counter()
+        try:
+            return asyncio.run(self._run())
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def report(self) -> str:
+        """Returns a table of the counters of the stages of the last run."""
+        lines = [f"{'stage':<12}{'items':>8}{'items/s':>10}{'busy (s)':>10}"
+                 f"{'starved (s)':>13}{'stalled (s)':>13}"]
+        for stage, counters in self.counters.items():
+            lines.append(f"{stage:<12}{counters.items:>8}{counters.throughput(self.elapsed):>10.1f}"
+                         f"{counters.busy:>10.3f}{counters.starved:>13.3f}{counters.stalled:>13.3f}")
+        return "\n".join(lines)
+
+    async def _run(self) -> Optional[Dict[str, Expression]]:
+        # The completions to evaluate and the formulas to verify, with the
+        # number of counterexamples known when they were enumerated.
+        completions: asyncio.Queue = asyncio.Queue(self.queue_size)
+        formulas: asyncio.Queue = asyncio.Queue(self.queue_size)
+        # The counterexamples found so far, and the verdicts not yet sent
+        # back to the synthesizer (read by the enumeration thread).
+        self._counterexamples: List[Mapping[str, Value]] = []
+        self._feedback: queue.SimpleQueue = queue.SimpleQueue()
+        self._solution: Optional[Dict[str, Expression]] = None
+        self._stopped = False
+        enumerator = ThreadPoolExecutor(1, thread_name_prefix="enumerate")
+        evaluators = ThreadPoolExecutor(self.evaluate_workers, thread_name_prefix="evaluate")
+        # Processes are spawned rather than forked, since the enumeration
+        # thread can hold locks when a process starts.
+        verifiers = ProcessPoolExecutor(self.verify_workers, multiprocessing.get_context("spawn"),
+                                        initializer=_start_worker, initargs=(VERIFY_TIMEOUT,))
+        workers = ([asyncio.create_task(self._evaluate(evaluators, completions, formulas))
+                    for _ in range(self.evaluate_workers)]
+                   + [asyncio.create_task(self._verify(verifiers, formulas))
+                      for _ in range(self.verify_workers)])
+        producer = asyncio.create_task(self._enumerate(enumerator, completions, formulas))
+        try:
+            # The pipeline is drained when the enumeration is over and every
+            # item was processed; a worker stops it earlier when it finds a
+            # solution or fails.
+            drained = asyncio.create_task(self._drain(producer, completions, formulas))
+            stopped = asyncio.create_task(asyncio.wait(workers, return_when=asyncio.FIRST_COMPLETED))
+            await asyncio.wait([drained, stopped], return_when=asyncio.FIRST_COMPLETED)
+            self._stopped = True
+            for task in workers + [producer, drained, stopped]:
+                task.cancel()
+            results = await asyncio.gather(producer, drained, *workers, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                    raise result
+            return self._solution
+        finally:
+            self._stopped = True
+            # The enumeration thread finishes its current batch; the
+            # running verifications finish (they have a timeout), the
+            # others are cancelled.
+            enumerator.shutdown(wait=True)
+            evaluators.shutdown(wait=True, cancel_futures=True)
+            verifiers.shutdown(wait=True, cancel_futures=True)
+
+    async def _drain(self, producer: asyncio.Task, completions: asyncio.Queue, formulas: asyncio.Queue) -> None:
+        await producer
+        await completions.join()
+        await formulas.join()
+
+    def _next_batch(self) -> List[Dict[str, Expression]]:
+        # Runs in the enumeration thread: sends the verdicts found since the
+        # last batch back to the synthesizer, and returns its next batch
+        # (empty if the method has no completion consistent with the
+        # examples it has).
+        verdicts = []
+        while not self._feedback.empty():
+            verdicts.append(self._feedback.get())
+        self.synt.verified(self.method, verdicts)
+        if self._stopped:
+            return []
+        try:
+            return self.synt.batch(self.method, self.batch_size)
+        except SynthesisException:
+            return []
+
+    async def _enumerate(self, enumerator: Executor, completions: asyncio.Queue,
+                         formulas: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        counters = self.counters["enumerate"]
+        while self.limit is None or counters.items < self.limit:
+            start = time.perf_counter()
+            batch = await loop.run_in_executor(enumerator, self._next_batch)
+            counters.busy += time.perf_counter() - start
+            if not batch:
+                # The enumeration ran ahead of the verification: the method
+                # has more completions if the completions being verified
+                # have counterexamples.
+                start = time.perf_counter()
+                await completions.join()
+                await formulas.join()
+                counters.starved += time.perf_counter() - start
+                if self._feedback.empty():
+                    return
+                continue
+            known = len(self._counterexamples)
+            for completion in batch[:None if self.limit is None else self.limit - counters.items]:
+                counters.items += 1
+                start = time.perf_counter()
+                await completions.put((completion, known))
+                counters.stalled += time.perf_counter() - start
+
+    def _evaluate_one(self, completion: Dict[str, Expression],
+                      counterexamples: List[Mapping[str, Value]]) -> Optional[Expression]:
+        # Runs in an evaluation thread: returns the formula of a completion,
+        # or None if it fails one of the counterexamples.
+        for example in counterexamples:
+            env = hole_environment(self.synt.ast, example)
+            values = {hole: interpret(expr, env) for hole, expr in completion.items()}
+            if run_program(self.synt.ast, example, values) is False:
+                return None
+        return Evaluator(completion).evaluate(self.synt.ast)
+
+    async def _evaluate(self, evaluators: Executor, completions: asyncio.Queue, formulas: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        counters = self.counters["evaluate"]
+        while True:
+            start = time.perf_counter()
+            completion, known = await completions.get()
+            counters.starved += time.perf_counter() - start
+            try:
+                start = time.perf_counter()
+                # Only the counterexamples found since the completion was
+                # enumerated can make it fail.
+                formula = await loop.run_in_executor(evaluators, self._evaluate_one, completion,
+                                                     self._counterexamples[known:])
+                counters.busy += time.perf_counter() - start
+                counters.items += 1
+                if formula is None:
+                    self.pruned += 1
+                    continue
+                start = time.perf_counter()
+                await formulas.put((completion, formula))
+                counters.stalled += time.perf_counter() - start
+            finally:
+                completions.task_done()
+
+    async def _verify(self, verifiers: Executor, formulas: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        counters = self.counters["verify"]
+        while True:
+            start = time.perf_counter()
+            batch: List[Tuple[Dict[str, Expression], Expression]] = [await formulas.get()]
+            counters.starved += time.perf_counter() - start
+            # The formulas already waiting are verified in the same session.
+            while len(batch) < VERIFY_BATCH and not formulas.empty():
+                batch.append(formulas.get_nowait())
+            try:
+                start = time.perf_counter()
+                verdicts = await loop.run_in_executor(verifiers, _verify, [formula for _, formula in batch])
+                counters.busy += time.perf_counter() - start
+                counters.items += len(batch)
+                for (completion, _), verdict in zip(batch, verdicts):
+                    if verdict.valid:
+                        self._solution = completion
+                        return
+                    if verdict.counterexample is not None:
+                        self._counterexamples.append(verdict.counterexample)
+                        self._feedback.put(verdict)
+            finally:
+                for _ in batch:
+                    formulas.task_done()
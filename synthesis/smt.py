@@ -0,0 +1,238 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the SMT engine, which synthesizes hole completions
+without enumerating them. The grammar of each hole is unrolled into a
+tree of nodes up to a depth k:
+- each node has a selector, a z3 integer that picks one of the
+productions of its symbol (only the productions that can be completed
+within the remaining depth),
+- each node has one child per slot of these productions, where the
+productions that have the same symbol in the same slot share the child,
+- each node has a z3 integer for the value of an unknown constant, when
+it selects the `Integer` leaf of a symbolic grammar.
+The value of a node on an example is the value of the production it
+selects, so the constraint of the program on an example is a z3 formula
+over the selectors and constants. A model of the constraint on every
+example is decoded into a completion, which the verifier checks: its
+counterexample becomes a new example (CEGIS). The depth grows from 1
+until a valid completion is found.
+"""
+
+from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+from lang.ast import *
+from lang.interp import hole_environment
+from lang.symb_eval import Evaluator
+from synthesis.analysis import GrammarAnalysis
+from synthesis.grammar import HoleGrammar, Production, is_unknown
+from verification.translate import Translator
+from verification.verifier import Verifier
+
+# The default largest depth of the unrolled grammars.
+MAX_DEPTH = 6
+# The number of exists/forall rounds at each depth before the next one.
+SMT_ROUNDS = 32
+
+
+class Node():
+    """
+    A node of an unrolled hole grammar.
+    - symbol: the symbol the node derives,
+    - choices: the productions it can select,
+    - selector: the z3 integer of the index of the selected production,
+    - constant: the z3 integer of the value of an unknown constant,
+    - children: the child node of each (slot index, symbol) of the choices.
+    """
+
+    def __init__(self, name: str, symbol: str, choices: List[Production]) -> None:
+        self.symbol = symbol
+        self.choices = choices
+        self.selector = Int(f"{name}:sel")
+        self.constant = Int(f"{name}:c")
+        self.children: Dict[Tuple[int, str], "Node"] = {}
+
+
+class _PatternTranslator(Translator):
+    # Translates a production pattern, where the slots are the values of
+    # the children, and the variables have their values on an example.
+
+    def __init__(self, env: Mapping[str, ExprRef], args: List[ExprRef],
+                 constant: ExprRef) -> None:
+        super().__init__()
+        self.env = env
+        self.args = args
+        self.constant = constant
+
+    def translate(self, expr: Expression) -> ExprRef:
+        if isinstance(expr, VarExpr):
+            if expr.var is None:
+                return self.args[int(expr.name[1:])]
+            if is_unknown(expr):
+                return self.constant
+            return self.env[expr.name]
+        return super().translate(expr)
+
+
+class Unrolling():
+    """
+    The hole grammars of a program, unrolled to a depth.
+    - roots: the root node of each hole, by hole name,
+    - nodes: all the nodes.
+    """
+
+    def __init__(self, grammars: Mapping[str, HoleGrammar], depth: int) -> None:
+        self.grammars = grammars
+        self.depth = depth
+        self.nodes: List[Node] = []
+        self._analyses = {hole: GrammarAnalysis(grammar) for hole, grammar in grammars.items()}
+        self.roots = {hole: self._node(hole, grammar.start, depth)
+                      for hole, grammar in grammars.items()}
+
+    def _node(self, hole: str, symbol: str, depth: int) -> Node:
+        # A node of symbol with depth levels left (itself included).
+        analysis = self._analyses[hole]
+        choices = [p for p in analysis.useful(symbol)
+                   if 1 + max((analysis.min_depth[slot] for slot in p.slots), default=0) <= depth]
+        node = Node(f"{hole}:{len(self.nodes)}", symbol, choices)
+        self.nodes.append(node)
+        for production in choices:
+            for i, slot in enumerate(production.slots):
+                if (i, slot) not in node.children:
+                    node.children[(i, slot)] = self._node(hole, slot, depth - 1)
+        return node
+
+    def domains(self) -> List[BoolRef]:
+        """The constraints of the selectors: each one picks a choice."""
+        return [And(node.selector >= 0, node.selector < len(node.choices)) for node in self.nodes]
+
+    def value(self, node: Node, env: Mapping[str, ExprRef],
+              values: Dict[int, ExprRef]) -> ExprRef:
+        """
+        Returns the z3 term of the value of a node, when the variables have
+        the values in env. The values of the nodes are memoized in values.
+        """
+        if id(node) not in values:
+            terms = []
+            for production in node.choices:
+                args = [self.value(node.children[(i, slot)], env, values)
+                        for i, slot in enumerate(production.slots)]
+                terms.append(_PatternTranslator(env, args, node.constant).translate(production.pattern))
+            term = terms[-1]
+            for i in range(len(terms) - 2, -1, -1):
+                term = If(node.selector == i, terms[i], term)
+            values[id(node)] = term
+        return values[id(node)]
+
+    def decode(self, model: ModelRef) -> Tuple[Dict[str, Expression], List[BoolRef]]:
+        """
+        Returns the completion of a model, and the equalities of the
+        selectors and constants it uses to their values in the model.
+        """
+        used: List[BoolRef] = []
+
+        def expression(node: Node) -> Expression:
+            index = model.eval(node.selector, model_completion=True).as_long()
+            used.append(node.selector == index)
+            production = node.choices[index]
+            if is_unknown(production.template):
+                value = model.eval(node.constant, model_completion=True).as_long()
+                used.append(node.constant == value)
+                return IntConst(value)
+            return production.build([expression(node.children[(i, slot)])
+                                     for i, slot in enumerate(production.slots)])
+        return {hole: expression(root) for hole, root in self.roots.items()}, used
+
+
+class SmtEngine():
+    """
+    Synthesizes completions of the holes of a program by solving for the
+    selectors of their unrolled grammars.
+    - grammars: the grammar of each hole, by hole name (symbolic grammars
+    let the solver pick the constants),
+    - verifier: the verifier of the completions,
+    - max_depth: the largest depth of the unrolled grammars,
+    - rounds: the number of exists/forall rounds at each depth,
+    - timeout: if set, how long (in milliseconds) each exists query may take.
+    The number of exists queries is `queries`, and `depth` is the depth of
+    the last unrolling.
+    """
+
+    def __init__(self, prog: Program, grammars: Mapping[str, HoleGrammar],
+                 verifier: Optional[Verifier] = None, max_depth: int = MAX_DEPTH,
+                 rounds: int = SMT_ROUNDS, timeout: Optional[int] = None) -> None:
+        self.prog = prog
+        self.grammars = grammars
+        self.verifier = Verifier() if verifier is None else verifier
+        self.max_depth = max_depth
+        self.rounds = rounds
+        self.timeout = timeout
+        self.queries = 0
+        self.depth = 0
+        # The constraint of the program where each hole is a variable.
+        placeholders = {hole.var.name: VarExpr(Variable(f"?h:{hole.var.name}", hole.var.type))
+                        for hole in prog.holes}
+        translator = Translator()
+        constraint = translator.translate(Evaluator(placeholders).evaluate(prog))
+        # An ill-typed constraint has no valid completion.
+        self._constraint = constraint if is_bool(constraint) else None
+        self._variables = translator.variables
+        self._placeholders = {hole: translator.variables.get(expr.name)
+                              for hole, expr in placeholders.items()}
+
+    def _example(self, unrolling: Unrolling, example: Mapping[str, Union[int, bool]]) -> BoolRef:
+        # The constraint of the program on an example.
+        env: Dict[str, ExprRef] = {}
+        for name, value in hole_environment(self.prog, example).items():
+            if value is None:
+                # Assigned from a hole: the value is not known here.
+                var = self.prog.get_var_of_name(name)
+                env[name] = FreshConst(BoolSort() if var.type == PaddleType.BOOL else IntSort())
+            else:
+                env[name] = BoolVal(value) if isinstance(value, bool) else IntVal(value)
+        values: Dict[int, ExprRef] = {}
+        substitution = [(z3var, env[name]) for name, z3var in self._variables.items()
+                        if name in env]
+        substitution += [(z3var, unrolling.value(unrolling.roots[hole], env, values))
+                         for hole, z3var in self._placeholders.items() if z3var is not None]
+        return substitute(self._constraint, *substitution) if substitution else self._constraint
+
+    def synthesize(self, examples: List[Dict[str, Union[int, bool]]]) -> Optional[Dict[str, Expression]]:
+        """
+        Returns a valid completion of the holes, or None if none is found
+        up to the largest depth. The counterexamples of the invalid
+        completions are appended to examples.
+        """
+        if self._constraint is None:
+            return None
+        for depth in range(1, self.max_depth + 1):
+            self.depth = depth
+            unrolling = Unrolling(self.grammars, depth)
+            solver = Solver()
+            if self.timeout is not None:
+                solver.set("timeout", self.timeout)
+            solver.add(unrolling.domains())
+            added = 0
+            for _ in range(self.rounds):
+                for example in examples[added:]:
+                    solver.add(self._example(unrolling, example))
+                    added += 1
+                self.queries += 1
+                if solver.check() != sat:
+                    break
+                completion, used = unrolling.decode(solver.model())
+                result, cex = self.verifier.check(Evaluator(completion).evaluate(self.prog))
+                if result == unsat:
+                    return completion
+                example = None if cex is None else {
+                    var.name: cex.get(var.name, False if var.type == PaddleType.BOOL else 0)
+                    for var in self.prog.inputs}
+                if example is None or example in examples:
+                    # The verifier gave up, or disagrees with the exists
+                    # phase (undefined values): rule the completion out.
+                    solver.add(Not(And(used)))
+                else:
+                    examples.append(example)
+        return None
@@ -0,0 +1,262 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the stochastic search engine, for grammars too large
+to enumerate. A Markov chain walks over the derivations of the holes.
+At each step, it proposes a move on the current derivations:
+- the replacement of a subtree by a derivation of the same symbol, drawn
+uniformly among the derivations of a random size (see
+synthesis/counting.py), smaller sizes being more likely,
+- the swap of two operands of the same symbol (of a production that is
+not commutative),
+- the replacement of an integer constant by another constant of the same
+symbol.
+The cost of derivations is the number of examples on which the
+constraint is false, weighted by FAILURE_COST, plus their size weighted
+by SIZE_COST. The values of a derivation on all the examples are
+computed at once, from the values of its subtrees (with the compiled
+patterns of the banks), and a move only computes the values of the nodes
+on the path to the replaced node. A move is accepted with the
+Metropolis-Hastings probability: min(1, exp(cost - new cost) times the
+ratio of the probabilities of the reverse and forward moves). The
+completions that no example refutes are yielded, to be verified.
+"""
+
+import math
+import random
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from lang.ast import *
+from lang.interp import hole_environment, run_program
+from synthesis.banks import compile_pattern
+from synthesis.canonical import COMMUTATIVE
+from synthesis.counting import GrammarCounts
+from synthesis.grammar import HoleGrammar, Production
+
+# The cost of each example on which the constraint is false.
+FAILURE_COST = 5.0
+# The cost of each production of the derivations. The number of
+# derivations grows exponentially with their size: with a smaller cost, the
+# chain drifts to the largest derivations.
+SIZE_COST = 1.5
+# The largest size of the derivation of a hole.
+MAX_SIZE = 40
+# The probability of each kind of move; a kind that has no place to apply
+# to falls back to a subtree replacement.
+MOVES = (("replace", 0.6), ("swap", 0.2), ("constant", 0.2))
+# The number of steps after which the chain gives up.
+STEPS = 100000
+# The default seed of the random number generator of a chain.
+SEED = 410
+
+
+class Derivation():
+    """
+    A derivation tree of a hole grammar. Derivations are not modified: a
+    move builds new nodes on the path to the nodes it changes.
+    - production: the production at the root,
+    - children: the derivation of each slot of the production,
+    - size: the number of productions of the derivation.
+    """
+    __slots__ = ("production", "children", "size", "_expression", "_values", "_epoch")
+
+    def __init__(self, production: Production, children: Tuple["Derivation", ...] = ()) -> None:
+        self.production = production
+        self.children = children
+        self.size = 1 + sum(child.size for child in children)
+        self._expression: Optional[Expression] = None
+        # The values on the examples, and the number of examples then.
+        self._values: Optional[tuple] = None
+        self._epoch = -1
+
+    def expression(self) -> Expression:
+        """Returns the expression of the derivation."""
+        if self._expression is None:
+            if self.children:
+                self._expression = self.production.build([c.expression() for c in self.children])
+            else:
+                self._expression = self.production.template
+        return self._expression
+
+    def nodes(self, path: Tuple[int, ...] = ()) -> Iterator[Tuple[Tuple[int, ...], "Derivation"]]:
+        """Yields the nodes of the derivation, with their path from the root."""
+        yield path, self
+        for i, child in enumerate(self.children):
+            yield from child.nodes(path + (i,))
+
+    def replace(self, path: Tuple[int, ...], node: "Derivation") -> "Derivation":
+        """Returns the derivation where the node at path is replaced by node."""
+        if not path:
+            return node
+        children = list(self.children)
+        children[path[0]] = children[path[0]].replace(path[1:], node)
+        return Derivation(self.production, tuple(children))
+
+
+class StochasticSearch():
+    """
+    A Markov chain over the derivations of the holes of a program.
+    - examples: the inputs the completions are checked on, which can grow
+    while the chain runs (with the counterexamples of the verifier),
+    - rand: the random number generator, seeded for reproducibility,
+    - steps: the number of steps after which the chain gives up,
+    - max_size: the largest size of the derivation of a hole.
+    The number of moves proposed and accepted are `proposed` and
+    `accepted`.
+    """
+
+    def __init__(self, prog: Program, grammars: Mapping[str, HoleGrammar],
+                 examples: List[Dict[str, Union[int, bool]]], seed: int = SEED,
+                 steps: int = STEPS, max_size: int = MAX_SIZE) -> None:
+        self.prog = prog
+        self.grammars = grammars
+        self.examples = examples
+        self.rand = random.Random(seed)
+        self.steps = steps
+        self.max_size = max_size
+        self.proposed = 0
+        self.accepted = 0
+        self.counts = {hole: GrammarCounts(grammar) for hole, grammar in grammars.items()}
+        # The sizes of the subtrees drawn for each (hole, symbol), and their
+        # probabilities: each size is half as likely as the previous one.
+        self._sizes: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+        # The constants of each (hole, symbol).
+        self._constants = {(hole, symbol): [p for p in counts.analysis.useful(symbol)
+                                            if isinstance(p.template, IntConst)]
+                           for hole, counts in self.counts.items()
+                           for symbol in counts.grammar.symbols()}
+        self._functions: Dict[int, Callable[[List[tuple]], tuple]] = {}
+        self._environments: List[Dict[str, Union[int, bool]]] = []
+        self._epoch = -1
+
+    def _refresh(self) -> None:
+        # Compiles the patterns again when examples have been added.
+        if self._epoch != len(self.examples):
+            self._environments = [hole_environment(self.prog, example) for example in self.examples]
+            self._functions = {id(p): compile_pattern(p.pattern, self._environments)
+                               for grammar in self.grammars.values()
+                               for symbol in grammar.symbols()
+                               for p in grammar.productions[symbol]}
+            self._epoch = len(self.examples)
+
+    def values(self, node: Derivation) -> tuple:
+        """Returns the values of a derivation on each example."""
+        self._refresh()
+        if node._epoch != self._epoch:
+            node._values = self._functions[id(node.production)]([self.values(c) for c in node.children])
+            node._epoch = self._epoch
+        return node._values
+
+    def failures(self, state: Mapping[str, Derivation]) -> int:
+        """Returns the number of examples on which the constraint is false."""
+        values = {hole: self.values(node) for hole, node in state.items()}
+        return sum(run_program(self.prog, example, {hole: v[i] for hole, v in values.items()}) is False
+                   for i, example in enumerate(self.examples))
+
+    def cost(self, state: Mapping[str, Derivation]) -> Tuple[int, float]:
+        """Returns the number of failures and the cost of derivations."""
+        failures = self.failures(state)
+        return failures, FAILURE_COST * failures + SIZE_COST * sum(n.size for n in state.values())
+
+    def sizes(self, hole: str, symbol: str) -> Tuple[List[int], List[float]]:
+        """Returns the sizes of the subtrees drawn for a symbol, and their probabilities."""
+        if (hole, symbol) not in self._sizes:
+            counts = self.counts[hole]
+            sizes = [size for size in range(1, self.max_size + 1) if counts.count(size, symbol)]
+            weights = [2.0 ** -size for size in sizes]
+            total = sum(weights)
+            self._sizes[(hole, symbol)] = sizes, [w / total for w in weights]
+        return self._sizes[(hole, symbol)]
+
+    def derivation(self, hole: str, n: int, size: int, symbol: str) -> Derivation:
+        """Returns the n-th derivation of a size from symbol (see GrammarCounts)."""
+        production, slots = self.counts[hole].choose(n, size, symbol)
+        return Derivation(production, tuple(self.derivation(hole, k, slot_size, slot)
+                                            for slot, slot_size, k in slots))
+
+    def draw(self, hole: str, symbol: str) -> Derivation:
+        """Returns a random derivation of symbol, of a random size."""
+        sizes, probabilities = self.sizes(hole, symbol)
+        size = self.rand.choices(sizes, probabilities)[0]
+        return self.derivation(hole, self.rand.randrange(self.counts[hole].count(size, symbol)),
+                               size, symbol)
+
+    def _probability(self, hole: str, node: Derivation) -> float:
+        # The log of the probability that `draw` returns node.
+        symbol = node.production.symbol
+        sizes, probabilities = self.sizes(hole, symbol)
+        if node.size not in sizes:
+            return -math.inf
+        return (math.log(probabilities[sizes.index(node.size)])
+                - math.log(self.counts[hole].count(node.size, symbol)))
+
+    def propose(self, state: Dict[str, Derivation]) -> Tuple[Dict[str, Derivation], float]:
+        """
+        Returns the derivations after a random move, and the log of the
+        ratio of the probabilities of the reverse and forward moves.
+        """
+        nodes = [(hole, path, node) for hole, root in state.items() for path, node in root.nodes()]
+        kind = self.rand.choices([k for k, _ in MOVES], [p for _, p in MOVES])[0]
+        if kind == "swap":
+            sites = [(hole, path, node) for hole, path, node in nodes
+                     if len(set(node.production.slots)) < len(node.production.slots)
+                     and not (isinstance(node.production.pattern, BinaryExpr)
+                              and node.production.pattern.operator in COMMUTATIVE)]
+            if sites:
+                hole, path, node = self.rand.choice(sites)
+                slots = node.production.slots
+                pairs = [(i, j) for i in range(len(slots)) for j in range(i + 1, len(slots))
+                         if slots[i] == slots[j]]
+                i, j = self.rand.choice(pairs)
+                children = list(node.children)
+                children[i], children[j] = children[j], children[i]
+                new = dict(state)
+                new[hole] = state[hole].replace(path, Derivation(node.production, tuple(children)))
+                return new, 0.0
+        if kind == "constant":
+            sites = [(hole, path, node) for hole, path, node in nodes
+                     if node.production in self._constants.get((hole, node.production.symbol), [])
+                     and len(self._constants[(hole, node.production.symbol)]) > 1]
+            if sites:
+                hole, path, node = self.rand.choice(sites)
+                others = [p for p in self._constants[(hole, node.production.symbol)]
+                          if p is not node.production]
+                new = dict(state)
+                new[hole] = state[hole].replace(path, Derivation(self.rand.choice(others)))
+                return new, 0.0
+        hole, path, node = self.rand.choice(nodes)
+        subtree = self.draw(hole, node.production.symbol)
+        new = dict(state)
+        new[hole] = state[hole].replace(path, subtree)
+        count = sum(root.size for root in new.values())
+        log_ratio = (math.log(len(nodes)) - math.log(count)
+                     + self._probability(hole, node) - self._probability(hole, subtree))
+        return new, log_ratio
+
+    def candidates(self) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the completions of the chain that no example refutes, from
+        the smallest derivations, until the chain has made `steps` steps.
+        The same completion is yielded again while the chain stays on it.
+        """
+        state = {hole: self.derivation(hole, 0, next(s for s in range(1, self.max_size + 1)
+                                                     if counts.count(s)), counts.grammar.start)
+                 for hole, counts in self.counts.items()}
+        epoch = len(self.examples)
+        failures, cost = self.cost(state)
+        for _ in range(self.steps):
+            if failures == 0:
+                yield {hole: node.expression() for hole, node in state.items()}
+            if epoch != len(self.examples):
+                # Counterexamples were added while the completion was
+                # verified.
+                epoch = len(self.examples)
+                failures, cost = self.cost(state)
+            new, log_ratio = self.propose(state)
+            self.proposed += 1
+            if any(node.size > self.max_size for node in new.values()):
+                continue
+            new_failures, new_cost = self.cost(new)
+            if math.log(1.0 - self.rand.random()) < cost - new_cost + log_ratio:
+                state, failures, cost = new, new_failures, new_cost
+                self.accepted += 1
@@ -0,0 +1,223 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the bank store, which keeps the terms enumerated for a
+hole grammar across problems, and across runs in files.
+Problems of a family (`sum4`, `sum4b`, `sum4c`...) have holes with the
+same grammar over variables of the same types, but different constraints
+and examples, so the banks of a problem cannot be reused as they are: the
+values of their expressions are the values on the examples of the
+problem, and observational equivalence pruned the expressions that have
+the same values on them.
+The store enumerates the terms of a grammar once, with the values of the
+terms on canonical inputs: fixed values of the variables (see below),
+the same for all the grammars with the same signature (the grammar with
+its variables numbered, and the types of the variables). Terms with the
+same values on the canonical inputs are almost surely equivalent, so the
+smallest is kept. A term is stored by its production and the positions of
+its children in their levels, without its variables: the bank of a
+problem with the same signature warm-starts from the stored terms,
+evaluating them on its examples instead of enumerating the combinations
+of its levels.
+"""
+
+import gzip
+import hashlib
+import os
+import pickle
+import random
+from itertools import product
+from typing import Dict, List, Mapping, Optional, Tuple
+from lang.ast import *
+from lang.interp import Value
+from synthesis.analysis import GrammarAnalysis
+from synthesis.banks import compile_pattern, compositions, grammar_key
+from synthesis.canonical import CanonicalRules
+from synthesis.grammar import HoleGrammar
+
+# The number of canonical inputs the stored terms are compared on: the
+# inputs with all integers 0, 1 and -1, then pseudo-random inputs, half of
+# them with small integers (where integer division and modulo are coarse).
+CANONICAL_INPUTS = 16
+# The ranges of the small and large integer values of the random inputs.
+SMALL_RANGE = 3
+LARGE_RANGE = 50
+
+# A stored term: the index of its production in the productions of its
+# symbol, and the (size, index in its level) of the term in each slot.
+StoredTerm = Tuple[int, Tuple[Tuple[int, int], ...]]
+
+
+def _numbered(key: tuple, numbers: Mapping[str, int]) -> tuple:
+    # The key of an expression with its variables by number.
+    if len(key) == 1 and key[0] in numbers:
+        return ("var", numbers[key[0]])
+    return tuple(_numbered(k, numbers) if isinstance(k, tuple) else k for k in key)
+
+
+def signature(grammar: HoleGrammar) -> tuple:
+    """
+    Returns the signature of a hole grammar: the key of its structure
+    (see `grammar_key`) with its variables numbered in order, and the types
+    of its variables.
+    """
+    numbers = {var.name: i for i, var in enumerate(grammar.variables)}
+    return (_numbered(grammar_key(grammar), numbers),
+            tuple(var.type.value for var in grammar.variables))
+
+
+def canonical_inputs(grammar: HoleGrammar) -> List[Dict[str, Value]]:
+    """
+    Returns the canonical inputs of the variables of a hole grammar, which
+    only depend on the types of the variables.
+    """
+    rand = random.Random(410)
+    inputs = []
+    for i in range(CANONICAL_INPUTS):
+        bound = SMALL_RANGE if i % 2 else LARGE_RANGE
+        values = [(rand.random() < 0.5 if i >= 3 else i == 1) if var.type == PaddleType.BOOL
+                  else ((0, 1, -1)[i] if i < 3 else rand.randint(-bound, bound)) for var in grammar.variables]
+        inputs.append({var.name: value for var, value in zip(grammar.variables, values)})
+    return inputs
+
+
+class StoredBank():
+    """
+    The stored terms of the grammars of a signature, by symbol and size.
+    - grammar: the grammar the terms are enumerated with (the first one of
+    the signature), whose symbols name the levels,
+    - levels: maps (symbol, size) to the stored terms of that level,
+    - values: maps (symbol, size) to the values of the terms of the level
+    on the canonical inputs,
+    - sizes: the largest size built so far of each symbol.
+    As in the banks, the levels are built by increasing size, the terms
+    that are not canonical are not built, and the terms whose values are
+    already in a level of their symbol are pruned (terms with undefined
+    values are kept).
+    """
+
+    def __init__(self, grammar: HoleGrammar) -> None:
+        self.grammar = grammar
+        self.levels: Dict[Tuple[str, int], List[StoredTerm]] = {}
+        self.values: Dict[Tuple[str, int], List[tuple]] = {}
+        self.sizes: Dict[str, int] = {symbol: 0 for symbol in grammar.symbols()}
+        self.seen: Dict[str, set] = {symbol: set() for symbol in grammar.symbols()}
+        # Whether levels were built since the bank was last written.
+        self.changed = False
+        self._setup()
+
+    def _setup(self) -> None:
+        # What is rebuilt when the bank is read back: the compiled patterns
+        # on the canonical inputs, and the expressions of the terms.
+        environments = canonical_inputs(self.grammar)
+        self._functions = {id(production): compile_pattern(production.pattern, environments)
+                           for symbol in self.grammar.symbols()
+                           for production in self.grammar.productions[symbol]}
+        self._rules = CanonicalRules(self.grammar)
+        self._analysis = GrammarAnalysis(self.grammar)
+        self._exprs: Dict[Tuple[str, int], List[Expression]] = {}
+
+    def __getstate__(self) -> dict:
+        return {"grammar": self.grammar, "levels": self.levels, "values": self.values,
+                "sizes": self.sizes, "seen": self.seen}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.changed = False
+        self._setup()
+
+    def level(self, symbol: str, size: int) -> List[StoredTerm]:
+        """Returns the stored terms of a symbol and size, building them if needed."""
+        if size > self.sizes[symbol]:
+            for smaller in range(self.sizes[symbol] + 1, size + 1):
+                self._build(symbol, smaller)
+                self.sizes[symbol] = smaller
+            self.changed = True
+        return self.levels[(symbol, size)]
+
+    def exprs(self, symbol: str, size: int) -> List[Expression]:
+        """Returns the expressions of the stored terms of a symbol and size, in the grammar."""
+        key = (symbol, size)
+        if key not in self._exprs:
+            exprs = []
+            for index, children in self.level(symbol, size):
+                production = self.grammar.productions[symbol][index]
+                exprs.append(production.build([self.exprs(slot, slot_size)[child] for slot, (slot_size, child)
+                                               in zip(production.slots, children)]))
+            self._exprs[key] = exprs
+        return self._exprs[key]
+
+    def _build(self, symbol: str, size: int) -> None:
+        terms: List[StoredTerm] = []
+        values: List[tuple] = []
+        seen = self.seen[symbol]
+        self.levels[(symbol, size)], self.values[(symbol, size)] = terms, values
+        if size < self._analysis.min_size[symbol]:
+            return
+        productions = self.grammar.productions[symbol]
+        for production in self._analysis.useful(symbol):
+            index = productions.index(production)
+            function = self._functions[id(production)]
+            for sizes in compositions(size - 1, len(production.slots), self._analysis.slot_sizes(production)):
+                # The terms of the slots, with their positions.
+                args = [list(zip(range(len(self.level(slot, slot_size))), self.exprs(slot, slot_size),
+                                 self.values[(slot, slot_size)]))
+                        for slot, slot_size in zip(production.slots, sizes)]
+                for combination in product(*args):
+                    if not self._rules.accepts(production, [arg[1] for arg in combination]):
+                        continue
+                    term_values = function([arg[2] for arg in combination])
+                    if None not in term_values:
+                        if term_values in seen:
+                            continue
+                        seen.add(term_values)
+                    terms.append((index, tuple((slot_size, arg[0]) for slot_size, arg in zip(sizes, combination))))
+                    values.append(term_values)
+
+
+class BankStore():
+    """
+    The stored banks of hole grammars, by signature.
+    - directory: if set, the directory of the files of the stored banks,
+    which are read back by the stores of later runs (see `save`).
+    A store can be shared by the synthesizers of several problems (see
+    `Synthesizer.bank_store`).
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory
+        self.banks: Dict[tuple, StoredBank] = {}
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{digest}.bank")
+
+    def bank(self, grammar: HoleGrammar) -> Tuple[StoredBank, Dict[str, str]]:
+        """
+        Returns the stored bank of the signature of a hole grammar (read
+        from its file, or new), and the map from the symbols of the grammar
+        to the symbols of the stored bank.
+        """
+        key = signature(grammar)
+        if key not in self.banks:
+            bank = None
+            if self.directory is not None and os.path.exists(self._path(key)):
+                with gzip.open(self._path(key), "rb") as stored:
+                    bank = pickle.load(stored)
+            self.banks[key] = StoredBank(grammar) if bank is None else bank
+        bank = self.banks[key]
+        return bank, dict(zip(grammar.symbols(), bank.grammar.symbols()))
+
+    def save(self) -> None:
+        """Writes the stored banks with new levels to their files, in the directory of the store."""
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for key, bank in self.banks.items():
+            if bank.changed:
+                temporary = f"{self._path(key)}.tmp"
+                with gzip.open(temporary, "wb") as stored:
+                    pickle.dump(bank, stored, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporary, self._path(key))
+                bank.changed = False
@@ -0,0 +1,247 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the memory-bounded structures of the streaming mode of
+the synthesizer, in which the memory of the best-first search (method 1)
+stays flat however long the search runs. The bottom-up enumeration of
+methods 2 and 3 is bounded by the budget of its banks instead (see
+synthesis/banks.py).
+- A SeenSet records the completions already returned (or the keys of any
+other structure) as 64-bit fingerprints in a Bloom filter. A key that was
+never added is taken for one that was with a small probability, the
+false-positive rate: such a completion is skipped. When the filter in
+memory is full, it is spilled to a file and a new one is started; the
+files are mapped in memory, so that the operating system can drop their
+pages.
+- A SpillingHeap is a priority queue that keeps at most a budget of
+entries in memory: when it has more, its worse half is written to a file,
+sorted, and read back when its best entry comes first.
+"""
+
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import pickle
+import tempfile
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# The default probability that a SeenSet takes a new key for one it has.
+FALSE_POSITIVE_RATE = 1e-6
+# The default number of keys of the Bloom filter of a SeenSet in memory.
+SEEN_CAPACITY = 2 ** 20
+
+
+def fingerprint(key: Any) -> int:
+    """
+    Returns the 64-bit fingerprint of a key whose `repr` describes it, such
+    as the keys of `expression_key`. Unlike `hash`, it is the same in
+    every run.
+    """
+    return int.from_bytes(hashlib.blake2b(repr(key).encode(), digest_size=8).digest(), "little")
+
+
+class _BloomFilter():
+    # A Bloom filter of fingerprints, whose bits are a bytearray or the map
+    # of a file.
+
+    def __init__(self, capacity: int, rate: float) -> None:
+        # The optimal number of hashes, and the number of bits for which
+        # the rate of the filter with capacity keys is (1 - e^(-kn/m))^k.
+        self.hashes = max(1, round(-math.log2(rate)))
+        self.size = max(8, math.ceil(-self.hashes * capacity / math.log(1 - rate ** (1 / self.hashes))))
+        self.bits: Any = bytearray((self.size + 7) // 8)
+
+    def positions(self, fp: int) -> List[int]:
+        # The bits of a fingerprint, by double hashing of its halves.
+        low, high = fp & 0xFFFFFFFF, fp >> 32 | 1
+        return [(low + i * high) % self.size for i in range(self.hashes)]
+
+    def add(self, fp: int) -> None:
+        for position in self.positions(fp):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, fp: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(fp))
+
+
+class SeenSet():
+    """
+    A set of keys with a bounded memory: a Bloom filter of the 64-bit
+    fingerprints of the keys.
+    - false_positive_rate: the bound of the probability that a key that
+    was never added is in the set (up to the approximations of Bloom
+    filters, which are small for large capacities),
+    - capacity: the number of keys of the filter in memory, which sets its
+    memory (about 30 bits per key for a rate of 1e-6).
+    When the filter in memory has capacity keys, it is spilled to a file,
+    and a new filter starts. Each filter has half the rate of the previous
+    one, so that the rate of the whole set stays below false_positive_rate.
+    The number of keys is `count`, and the number of filters spilled is
+    `spilled`. A SeenSet can be pickled (with the bits of all its filters),
+    e.g. in a checkpoint.
+    """
+
+    def __init__(self, false_positive_rate: float = FALSE_POSITIVE_RATE,
+                 capacity: int = SEEN_CAPACITY) -> None:
+        self.false_positive_rate = false_positive_rate
+        self.capacity = capacity
+        self.count = 0
+        self.spilled = 0
+        self._filters: List[_BloomFilter] = []
+        self._current = self._new_filter()
+        self._spill_dir: Optional[tempfile.TemporaryDirectory] = None
+        self._files: list = []
+
+    def _new_filter(self) -> _BloomFilter:
+        return _BloomFilter(self.capacity, self.false_positive_rate / 2 ** (len(self._filters) + 1))
+
+    def __contains__(self, key: Any) -> bool:
+        fp = fingerprint(key)
+        return fp in self._current or any(fp in bloom for bloom in self._filters)
+
+    def add(self, key: Any) -> None:
+        """Adds a key to the set."""
+        self._current.add(fingerprint(key))
+        self.count += 1
+        if self.count % self.capacity == 0:
+            self._spill()
+
+    def __getstate__(self) -> dict:
+        return {"false_positive_rate": self.false_positive_rate, "capacity": self.capacity,
+                "count": self.count, "filters": [bytes(bloom.bits) for bloom in self._filters],
+                "current": bytes(self._current.bits)}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["false_positive_rate"], state["capacity"])
+        # The spilled filters are spilled again, to new files.
+        for bits in state["filters"]:
+            self._current.bits[:] = bits
+            self._spill()
+        self._current.bits[:] = state["current"]
+        self.count = state["count"]
+
+    def memory(self) -> int:
+        """The number of bytes of the filter in memory."""
+        return len(self._current.bits)
+
+    def _spill(self) -> None:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="seen-")
+        bloom = self._current
+        path = os.path.join(self._spill_dir.name, f"{self.spilled}.bloom")
+        with open(path, "wb") as spill:
+            spill.write(bloom.bits)
+        spill = open(path, "rb")
+        bloom.bits = mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(spill)
+        self._filters.append(bloom)
+        self.spilled += 1
+        self._current = self._new_filter()
+
+    def close(self) -> None:
+        """
+        Removes the files of the spilled filters (they are also removed when
+        the set is garbage collected). The set is empty afterwards.
+        """
+        for bloom in self._filters:
+            bloom.bits.close()
+        for spill in self._files:
+            spill.close()
+        self._filters, self._files = [], []
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+        self.count = self.spilled = 0
+        self._current = self._new_filter()
+
+
+class SpillingHeap():
+    """
+    A priority queue (a heap of entries, as with heapq) that keeps at most
+    budget entries in memory.
+    - budget: the number of entries in memory, or None for no bound,
+    - encode, decode: the representation of an entry in a file, and back.
+    The entries must be tuples whose first two elements order them with no
+    ties (such as a cost and an insertion counter).
+    When there are more entries than the budget, the worse half is written
+    to a file as a sorted run; a run is read back when its first entry is
+    better than the ones in memory. The number of entries written is
+    `spilled`, and of runs read back is `restored`.
+    """
+
+    def __init__(self, budget: Optional[int] = None, encode: Callable[[tuple], Any] = lambda entry: entry,
+                 decode: Callable[[Any], tuple] = lambda encoded: encoded) -> None:
+        self.budget = budget
+        self.encode = encode
+        self.decode = decode
+        self.spilled = 0
+        self.restored = 0
+        self._heap: List[tuple] = []
+        # The runs on disk: the order of their first entry, their number of
+        # entries, and their file.
+        self._runs: List[Tuple[tuple, int, str]] = []
+        self._spill_dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) + sum(count for _, count, _ in self._runs)
+
+    def push(self, entry: tuple) -> None:
+        """Adds an entry."""
+        heapq.heappush(self._heap, entry)
+        if self.budget is not None and len(self._heap) > self.budget:
+            self._spill()
+
+    def pop(self) -> tuple:
+        """Removes and returns the best entry. Raises an IndexError if there is none."""
+        while self._runs:
+            run = min(self._runs)
+            if self._heap and self._heap[0][:2] < run[0]:
+                break
+            self._runs.remove(run)
+            self.restored += 1
+            with open(run[2], "rb") as spill:
+                # One entry at a time: the encoded run is not in memory.
+                for _ in range(run[1]):
+                    self._heap.append(self.decode(pickle.load(spill)))
+            os.remove(run[2])
+            heapq.heapify(self._heap)
+            if len(self._heap) > self.budget:
+                self._spill()
+        return heapq.heappop(self._heap)
+
+    def encoded(self) -> Iterator[Any]:
+        """Yields the representation (see `encode`) of every entry, in no particular order."""
+        for entry in self._heap:
+            yield self.encode(entry)
+        for _, count, path in self._runs:
+            with open(path, "rb") as spill:
+                for _ in range(count):
+                    yield pickle.load(spill)
+
+    def _spill(self) -> None:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.TemporaryDirectory(prefix="frontier-")
+        self._heap.sort()
+        keep = max(1, self.budget // 2)
+        worse = self._heap[keep:]
+        # A sorted list is a heap.
+        del self._heap[keep:]
+        path = os.path.join(self._spill_dir.name, f"{self.spilled}.pickle")
+        with open(path, "wb") as spill:
+            for entry in worse:
+                pickle.dump(self.encode(entry), spill)
+        self._runs.append((worse[0][:2], len(worse), path))
+        self.spilled += len(worse)
+
+    def close(self) -> None:
+        """
+        Removes the files of the runs (they are also removed when the heap
+        is garbage collected). The entries of the runs are lost.
+        """
+        if self._spill_dir is not None:
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+        self._runs = []
@@ -6,9 +6,91 @@ Fill in this file to complete the synthesis portion
 of the assignment.
 """
 
+import os
+import random
+import time
+import warnings
 from typing import Mapping
 from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Callable, Dict, Generator, Iterator, List, Optional, Set, Tuple, Union
 from lang.ast import *
+from lang.interp import hole_environment, interpret, run_program
+from lang.symb_eval import Evaluator
+from synthesis.abstract import AbstractPruner
+from synthesis.banks import DEFAULT_BUDGET, BankPool, Eviction
+from synthesis.best_first import BestFirstEnumerator, variables_first_cost
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.checkpoint import (decode_completion, encode_completion, program_variables, read_checkpoint,
+                                  write_checkpoint)
+from synthesis.conflicts import ConflictLearner
+from synthesis.constants import ConstantSolver, has_unknowns
+from synthesis.divide import DivideAndConquer, find_ite
+from synthesis.grammar import HoleGrammar
+from synthesis.holes import HoleGroup, diagonal, independent_groups, interchangeable, is_representative
+from synthesis.normalize import normalize
+from synthesis.stochastic import SEED, StochasticSearch
+from synthesis.store import BankStore
+from synthesis.streaming import FALSE_POSITIVE_RATE, SeenSet
+from verification.decompose import SubqueryCache
+from verification.verifier import Verdict, Verifier, default_verifier, verify_completions
+
+# How many consistent candidates method 3 verifies in one solver session.
+FRONTIER_SIZE = 16
+# How long (in milliseconds) the verifier of the synthesizer may spend on a
+# candidate: a nonlinear query can take forever.
+VERIFY_TIMEOUT = 2000
+# The best-first search of method 1 gives up after pushing this many
+# partial derivations: the derivations of the largest sizes are too many.
+DERIVATION_BUDGET = 100000
+# The number of partial derivations the best-first search keeps in memory
+# in streaming mode.
+FRONTIER_BUDGET = 20000
+# How often (in seconds) a synthesizer with a checkpoint path writes its
+# checkpoint.
+CHECKPOINT_INTERVAL = 60
+# The environment variable that names the checkpoint file of the
+# synthesizers (see `Synthesizer.checkpoint_path`): main.py runs resume
+# from it when it exists. Only set it to a file you trust: a checkpoint is
+# a pickle, and reading one can run arbitrary code.
+CHECKPOINT_VARIABLE = "SYNTH_CHECKPOINT"
+# The settings of a synthesizer that the synthesizers of its independent
+# groups of holes follow: they are copied to them once, when the first
+# combined completion is built (the settings are set after `__init__`).
+PART_SETTINGS = ("bank_budget", "bank_eviction", "bank_store", "cost", "abstract_pruning", "conflict_pruning",
+                 "symbolic_constants", "stochastic_seed", "derivation_budget", "streaming",
+                 "frontier_budget", "false_positive_rate")
+
+
+class SynthesisException(Exception):
+    """
+    Exception that is raised when the synthesizer has no new hole
+    completion to propose.
+    """
+
+
+def default_value(var: Variable) -> Union[int, bool]:
+    """The value of a variable that a counterexample does not constrain."""
+    return False if var.type == PaddleType.BOOL else 0
+
+
+def seed_examples(prog: Program) -> List[Dict[str, Union[int, bool]]]:
+    """
+    Returns the inputs the synthesizer starts with, before any
+    counterexample: all inputs zero (or false), and fixed pseudo-random
+    values.
+    """
+    rand = random.Random(410)
+    zero = {var.name: default_value(var) for var in prog.inputs}
+    spread = {var.name: (rand.random() < 0.5 if var.type == PaddleType.BOOL
+                         else rand.randint(-10, 10)) for var in prog.inputs}
+    return [zero] if spread == zero else [zero, spread]
+
+
+def completion_key(completion: Mapping[str, Expression]) -> tuple:
+    """A hashable key identifying a hole completion."""
+    return tuple(sorted((hole, expression_key(expr))
+                        for hole, expr in completion.items()))
 
 
 class Synthesizer():
@@ -51,46 +133,705 @@ class Synthesizer():
     e.g. `prog.hole_can_use("h1")` returns the variables that "h1" can use.
     """
 
-    def __init__(self, ast: Program):
+    def __init__(self, ast: Program, checkpoint_variable: bool = True):
         """
         Initialize the Synthesizer.
         The Synthesizer can have a state or other data attributes and
         methods to remember which programs have been synthesized before.
+        With checkpoint_variable set, the checkpoint path is read from the
+        environment variable `CHECKPOINT_VARIABLE`, and the synthesizer
+        resumes from the checkpoint if the file exists (a checkpoint of
+        another program or version is replaced, with a warning).
         """
-        self.state = None
+        # The keys (method number, completion key) of the completions that
+        # have already been returned by each method (see `remember`).
+        self.state = set()
         # The synthesizer is initialized with the program ast it needs
         # to synthesize hole completions for.
         self.ast = ast
+        # The verifier of the run of the synthesizer, whose cache is shared
+        # with `default_verifier` (see below).
+        self.verifier = Verifier(timeout=VERIFY_TIMEOUT, cache=SubqueryCache())
+        # The inputs candidates are tested on: seed inputs, then the
+        # counterexamples returned by the verifier for the candidates that
+        # were rejected. Maps from input names to values.
+        self.examples: List[Dict[str, Union[int, bool]]] = seed_examples(ast)
+        # The normalized grammar of each hole (see synthesis/normalize.py).
+        self.grammars = {hole.var.name: normalize(HoleGrammar(ast, hole))
+                         for hole in ast.holes}
+        # The classes of interchangeable holes: only one ordering of the
+        # completions of each class is searched (see synthesis/holes.py).
+        self.symmetries = interchangeable(ast, self.grammars)
+        # The memory budget (in bytes) of the banks of each candidate
+        # stream, and what happens to the levels evicted to stay in it.
+        self.bank_budget = DEFAULT_BUDGET
+        self.bank_eviction = Eviction.DROP
+        # If set, the bank store the banks warm-start from, which can be
+        # shared by the synthesizers of several problems (see
+        # synthesis/store.py).
+        self.bank_store: Optional[BankStore] = None
+        # The cost of the productions for the best-first search.
+        self.cost = variables_first_cost()
+        # Whether the best-first search drops the partial derivations that
+        # the abstract values of the examples refute (see
+        # synthesis/abstract.py).
+        self.abstract_pruning = False
+        # Whether the best-first search learns lemmas from the candidates
+        # that fail on an example, and drops the partial derivations that
+        # contain one (see synthesis/conflicts.py).
+        self.conflict_pruning = False
+        # Whether the best-first search of method 1 leaves each `Integer`
+        # as an unknown constant, solved for by the constant solver.
+        self.symbolic_constants = False
+        self.constant_solver = ConstantSolver(ast, self.verifier, timeout=VERIFY_TIMEOUT)
+        # The seed of the random moves of the stochastic search of method 4.
+        self.stochastic_seed = SEED
+        # The number of partial derivations the best-first search of method
+        # 1 pushes before it gives up (None for no limit).
+        self.derivation_budget: Optional[int] = DERIVATION_BUDGET
+        # In streaming mode (to be set before the first call), the memory
+        # of method 1 stays flat however long the search runs: the
+        # best-first search keeps `frontier_budget` partial derivations in
+        # memory and spills the others to disk, and the completions
+        # already returned are remembered by their fingerprints, which may
+        # take a new completion for an old one with probability
+        # `false_positive_rate` (see synthesis/streaming.py). It does not
+        # bound methods 2 and 3: their levels stay within `bank_budget`,
+        # but the values seen by their banks are kept in memory (see
+        # synthesis/banks.py).
+        self.streaming = False
+        self.frontier_budget = FRONTIER_BUDGET
+        self.false_positive_rate = FALSE_POSITIVE_RATE
+        # The divide-and-conquer engine of method 3, for programs with a
+        # single hole whose grammar has an if-then-else production.
+        self.divide: Optional[DivideAndConquer] = None
+        if len(self.grammars) == 1:
+            grammar = next(iter(self.grammars.values()))
+            if find_ite(grammar) is not None:
+                self.divide = DivideAndConquer(ast, grammar)
+        # The number of examples when divide-and-conquer last failed.
+        self._divide_failed: Optional[int] = None
+        # For each method: the stream of candidates, the number of
+        # examples it was built with, and the last batch of completions
+        # returned, which is verified before the next one (see `batch`).
+        self._streams: Dict[int, Generator[Dict[str, Expression], None, None]] = {}
+        self._stream_examples: Dict[int, int] = {}
+        self._last: Dict[int, List[Dict[str, Expression]]] = {}
+        # For each method: the last completion returned by its
+        # `synth_method_*`, returned again once it has no new one.
+        self._returned: Dict[int, Dict[str, Expression]] = {}
+        # For each method whose stream can be resumed: a function returning
+        # the state of the stream (see `checkpoint`).
+        self._progress: Dict[int, Callable[[], dict]] = {}
+        # With a checkpoint path, the state of the synthesizer is written
+        # there every `checkpoint_interval` seconds, at the start of a call
+        # (see `autosave`).
+        self.checkpoint_path: Optional[str] = os.environ.get(CHECKPOINT_VARIABLE) if checkpoint_variable else None
+        self.checkpoint_interval = CHECKPOINT_INTERVAL
+        self._saved_at = time.monotonic()
+        # The values of the variables holes can use, on each example.
+        self._environments: List[Dict[str, Union[int, bool]]] = []
+        # With independent groups of holes (see synthesis/holes.py), each
+        # group is synthesized by its own synthesizer. For each method, the
+        # valid completion it found for each solved group, by group index.
+        groups = independent_groups(ast)
+        self.parts: List[Tuple[HoleGroup, Synthesizer]] = []
+        if len(groups) > 1:
+            # Their states are in the checkpoint of this synthesizer.
+            self.parts = [(group, Synthesizer(group.prog, checkpoint_variable=False)) for group in groups]
+            for _, part in self.parts:
+                part.verifier = self.verifier
+        self.solved: Dict[int, Dict[int, Dict[str, Expression]]] = {}
+        # A synthesizer starts a synthesis run: `is_valid` (the verifier of
+        # main.py) uses the cache of its verifier from now on, so that a
+        # candidate that main.py checked is not checked again, and the
+        # results of earlier runs (e.g. of another benchmark configuration)
+        # are not reused.
+        default_verifier.cache = self.verifier.cache
+        self._parts_configured = False
+        # The methods that search the whole program, whose combined
+        # completion of valid group solutions was not valid.
+        self.unsplit: Set[int] = set()
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            try:
+                self.restore(self.checkpoint_path)
+            except ValueError as error:
+                # A stale checkpoint, of another program or version: the
+                # search starts afresh, and the next autosave replaces it.
+                warnings.warn(f"{error} The synthesis starts afresh.")
+
+    def add_example(self, cex: Mapping[str, Union[int, bool]]) -> None:
+        """
+        Adds a counterexample to the examples. Inputs that the
+        counterexample does not constrain get a default value.
+        """
+        example = {var.name: cex.get(var.name, default_value(var))
+                   for var in self.ast.inputs}
+        if example not in self.examples:
+            self.examples.append(example)
+
+    def verify_frontier(self, frontier: List[Mapping[str, Expression]]) -> Optional[Mapping[str, Expression]]:
+        """
+        Verifies a whole frontier of hole completions in one solver session
+        and returns the first valid completion, or None if there is none.
+        The counterexamples of the invalid completions are added to
+        `self.examples`.
+        """
+        solution = None
+        verdicts = verify_completions(self.ast, frontier, self.verifier)
+        for completion, verdict in zip(frontier, verdicts):
+            if verdict.valid:
+                if solution is None:
+                    solution = completion
+            elif verdict.counterexample is not None:
+                self.add_example(verdict.counterexample)
+        return solution
+
+    def failing_example(self, hole_values: List[Mapping[str, Union[int, bool]]]) -> Optional[int]:
+        """
+        Returns the index of the first example on which the constraint is
+        false when the holes have the given values (one map from hole names
+        to values per example), or None if there is none.
+        """
+        for i, (example, values) in enumerate(zip(self.examples, hole_values)):
+            if run_program(self.ast, example, values) is False:
+                return i
+        return None
+
+    def is_consistent(self, hole_values: List[Mapping[str, Union[int, bool]]]) -> bool:
+        """
+        Returns true if the constraint holds on every example when the
+        holes have the given values (one map from hole names to values per
+        example). Undefined values do not make a candidate inconsistent.
+        """
+        return self.failing_example(hole_values) is None
+
+    def bottom_up(self, method: int, state: Optional[dict] = None) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the hole completions that are consistent with the examples,
+        built by the bottom-up enumerator of each hole, with observational
+        equivalence pruning. The enumerators compare expressions on the
+        examples known when the stream is created, so the stream must be
+        rebuilt when examples are added.
+        With several holes, the terms of the holes are combined diagonally,
+        by increasing total size (see `synthesis.holes.diagonal`), and the
+        terms of interchangeable holes, which share their bank, in order.
+        The state of the stream of the method is the state of the banks and
+        the number of combinations consumed: with a state, the stream
+        resumes after them.
+        """
+        environments = [hole_environment(self.ast, example) for example in self.examples]
+        # Holes with identical grammars share their banks.
+        pool = BankPool(environments, True, self.bank_budget, self.bank_eviction, store=self.bank_store)
+        enumerators = {hole: BottomUpEnumerator(grammar, environments, pool=pool)
+                       for hole, grammar in self.grammars.items()}
+        holes = list(enumerators)
+        classes = [[holes.index(hole) for hole in members] for members in self.symmetries]
+        position = 0
+        if state is not None:
+            pool.load(state["banks"])
+            position = state["position"]
+        self._progress[method] = lambda: {"banks": pool.state(), "position": position}
+        try:
+            for combination in diagonal([enumerators[hole].level for hole in holes],
+                                        [enumerators[hole].max_size for hole in holes], classes, position):
+                position += 1
+                completion = {hole: term[0] for hole, (_, term) in zip(holes, combination)}
+                hole_values = [{hole: term[1][i] for hole, (_, term) in zip(holes, combination)}
+                               for i in range(len(environments))]
+                if self.is_consistent(hole_values):
+                    yield completion
+        finally:
+            # The stream is exhausted, or closed when it is replaced.
+            pool.close()
+
+    def best_first(self, state: Optional[dict] = None) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the hole completions that are consistent with the examples,
+        by increasing cost of their derivations (see `self.cost`). The
+        completions are checked on the current examples, so the stream does
+        not need to be rebuilt when examples are added. Of the permutations
+        of a completion over interchangeable holes, only one is checked.
+        With `conflict_pruning` set, the completions that fail on an
+        example, checked here or when they are verified, are analyzed by
+        the conflict learner.
+        The state of the stream is the state of the enumerator: with a
+        state, the stream resumes from it (the lemmas of the conflict
+        learner are learned again).
+        """
+        pruner = self.pruner(self.grammars)
+        enumerator = self.enumerator(self.grammars, pruner)
+        if state is not None:
+            enumerator.load(state)
+        self._progress[1] = enumerator.state
+        for completion in enumerator.enumerate():
+            if not is_representative(completion, self.symmetries):
+                continue
+            failing = self.failing_example(self.hole_values(completion))
+            if failing is None:
+                yield completion
+                # The completion was verified: its counterexample, if it
+                # has one, is the last example.
+                failing = self.failing_example(self.hole_values(completion))
+            if failing is not None and isinstance(pruner, ConflictLearner):
+                pruner.learn(enumerator.derivation, failing)
+
+    def enumerator(self, grammars: Mapping[str, HoleGrammar],
+                   pruner: Optional[AbstractPruner]) -> BestFirstEnumerator:
+        """Returns the best-first enumerator of grammars, with the settings of the synthesizer."""
+        return BestFirstEnumerator(grammars, self.cost, budget=self.derivation_budget, pruner=pruner,
+                                   frontier_budget=self.frontier_budget if self.streaming else None,
+                                   false_positive_rate=self.false_positive_rate if self.streaming else None)
+
+    def pruner(self, grammars: Mapping[str, HoleGrammar]) -> Optional[AbstractPruner]:
+        """
+        Returns the pruner of the best-first search of grammars on the
+        examples, which sees the examples added later: the conflict learner
+        if `conflict_pruning` is set, the abstract pruner if only
+        `abstract_pruning` is, and None otherwise.
+        """
+        if self.conflict_pruning:
+            return ConflictLearner(self.ast, grammars, self.examples, abstract=self.abstract_pruning)
+        if not self.abstract_pruning:
+            return None
+        return AbstractPruner(self.ast, grammars, self.examples)
+
+    def symbolic(self, state: Optional[dict] = None) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the hole completions found by the best-first search of the
+        skeletons of the symbolic grammars, where each `Integer` is an
+        unknown constant. Skeletons without unknowns are checked on the
+        examples; the others are completed by the constant solver, whose
+        counterexamples are added to the examples. As in `best_first`, the
+        stream resumes from the state of its enumerator.
+        """
+        grammars = {hole.var.name: normalize(HoleGrammar(self.ast, hole, symbolic=True))
+                    for hole in self.ast.holes}
+        enumerator = self.enumerator(grammars, self.pruner(grammars))
+        if state is not None:
+            enumerator.load(state)
+        self._progress[1] = enumerator.state
+        for skeleton in enumerator.enumerate():
+            if not is_representative(skeleton, self.symmetries):
+                continue
+            if not has_unknowns(skeleton):
+                if self.is_consistent(self.hole_values(skeleton)):
+                    yield skeleton
+                continue
+            completion = self.constant_solver.solve(skeleton, self.examples)
+            if completion is not None:
+                yield completion
+
+    def stochastic(self) -> Iterator[Dict[str, Expression]]:
+        """
+        Yields the hole completions of the stochastic search (see
+        synthesis/stochastic.py) that no example refutes. The search reads
+        the examples as they grow, so the stream does not need to be
+        rebuilt when examples are added.
+        """
+        return StochasticSearch(self.ast, self.grammars, self.examples,
+                                seed=self.stochastic_seed).candidates()
 
-    # TODO: implement something that allows you to remember which
-    # programs have already been generated.
+    def hole_values(self, completion: Mapping[str, Expression]) -> List[Dict[str, Union[int, bool]]]:
+        """
+        Returns the values of the holes on each example, for a completion.
+        """
+        if len(self._environments) != len(self.examples):
+            self._environments = [hole_environment(self.ast, example)
+                                  for example in self.examples]
+        return [{hole: interpret(expr, env) for hole, expr in completion.items()}
+                for env in self._environments]
+
+    def learn(self, method: int) -> None:
+        """
+        Verifies the last batch of completions returned by a method (several
+        completions in one solver session), and adds the counterexamples of
+        the invalid ones to the examples.
+        """
+        batch = self._last.pop(method, [])
+        if len(batch) > 1:
+            self.verify_frontier(batch)
+        elif batch:
+            formula = Evaluator(batch[0]).evaluate(self.ast)
+            cex = self.verifier.counterexample(formula)
+            if cex is not None:
+                self.add_example(cex)
+
+    def remember(self, key: tuple) -> bool:
+        """
+        Records the key (method number, completion key) of a completion
+        returned by a method, and returns true if it was not recorded yet.
+        In streaming mode, the keys are recorded in a SeenSet.
+        """
+        if self.streaming and not isinstance(self.state, SeenSet):
+            self.state = SeenSet(self.false_positive_rate)
+        if key in self.state:
+            return False
+        self.state.add(key)
+        return True
+
+    def next_candidate(self, method: int, stream, restart: bool = True) -> Dict[str, Expression]:
+        """
+        Returns the next completion of the candidate stream of a method
+        that this method has not returned yet. The stream is built by
+        calling stream(), and rebuilt whenever new examples have been found
+        if restart is set.
+        """
+        while True:
+            if method not in self._streams or (
+                    restart and self._stream_examples[method] != len(self.examples)):
+                if method in self._streams:
+                    self._streams[method].close()
+                self._streams[method] = stream()
+                self._stream_examples[method] = len(self.examples)
+            completion = next(self._streams[method], None)
+            if completion is None:
+                raise SynthesisException(
+                    f"Method {method} has no new completion to propose.")
+            if self.remember((method, completion_key(completion))):
+                return completion
+
+    def close(self) -> None:
+        """
+        Closes the candidate streams of the synthesizer and of its groups of
+        holes, which removes the files of their spilled frontiers and banks,
+        and removes the files of the returned completions in streaming mode.
+        The synthesizer must not be used afterwards.
+        """
+        for stream in self._streams.values():
+            stream.close()
+        self._streams = {}
+        if isinstance(self.state, SeenSet):
+            self.state.close()
+        for _, part in self.parts:
+            part.close()
+
+    def autosave(self) -> None:
+        """
+        Writes the checkpoint of the synthesizer to `checkpoint_path`, if it
+        is set and the last one is older than `checkpoint_interval`.
+        """
+        if self.checkpoint_path is not None and time.monotonic() - self._saved_at >= self.checkpoint_interval:
+            self.checkpoint(self.checkpoint_path)
+
+    def checkpoint(self, path: str) -> None:
+        """
+        Writes the state of the synthesizer to a checkpoint file (see
+        synthesis/checkpoint.py), from which `restore` resumes the search.
+        """
+        write_checkpoint(path, self.ast, self.checkpoint_state())
+        self._saved_at = time.monotonic()
+
+    def restore(self, path: str) -> None:
+        """
+        Restores the state of the synthesizer from a checkpoint file written
+        by `checkpoint` for the same program, with the same settings. Raises
+        a ValueError if the checkpoint is of another program. The file must
+        be trusted (see `read_checkpoint`).
+        """
+        self.load_checkpoint_state(read_checkpoint(path, self.ast))
+        self._saved_at = time.monotonic()
+
+    def checkpoint_state(self) -> dict:
+        """
+        Returns the state of the synthesizer, which can be pickled: the
+        examples, the completions already returned and the last ones, the
+        streams of candidates that can be resumed, the solved groups of
+        holes, the methods that search the whole program, and the state of
+        the synthesizer of each group. The stream
+        of method 1 is resumed from the frontier of its best-first search,
+        and the streams of methods 2 and 3 (while their examples have not
+        changed) from their banks and their position in the diagonal
+        enumeration; the stochastic search of method 4 starts a new chain.
+        """
+        streams = {method: self._progress[method]() for method in self._streams
+                   if method in self._progress
+                   and (method == 1 or self._stream_examples[method] == len(self.examples))}
+        return {"examples": self.examples, "state": self.state,
+                "last": {method: [encode_completion(completion) for completion in batch]
+                         for method, batch in self._last.items()},
+                "streams": streams,
+                "stream_examples": {method: self._stream_examples[method] for method in streams},
+                "divide_failed": self._divide_failed,
+                "solved": {method: {index: encode_completion(completion) for index, completion in solved.items()}
+                           for method, solved in self.solved.items()},
+                "unsplit": self.unsplit,
+                "parts": [part.checkpoint_state() for _, part in self.parts]}
+
+    def load_checkpoint_state(self, state: dict) -> None:
+        """Restores the state returned by `checkpoint_state`."""
+        variables = program_variables(self.ast)
+        self.examples[:] = state["examples"]
+        self._environments = []
+        self.state = state["state"]
+        self._last = {method: [decode_completion(completion, variables) for completion in batch]
+                      for method, batch in state["last"].items()}
+        self._divide_failed = state["divide_failed"]
+        self.solved = {method: {index: decode_completion(completion, variables)
+                                for index, completion in solved.items()}
+                       for method, solved in state["solved"].items()}
+        self.unsplit = state["unsplit"]
+        for stream in self._streams.values():
+            stream.close()
+        self._streams, self._stream_examples, self._progress = {}, {}, {}
+        for method, stream_state in state["streams"].items():
+            if method == 1:
+                self._streams[method] = self.stream(method)[0](stream_state)
+            else:
+                self._streams[method] = self.bottom_up(method, stream_state)
+            self._stream_examples[method] = state["stream_examples"][method]
+            # Until the stream resumes, its state is the one restored.
+            self._progress[method] = lambda stream_state=stream_state: stream_state
+        for (_, part), part_state in zip(self.parts, state["parts"]):
+            part.load_checkpoint_state(part_state)
+
+    def split(self, method: int) -> bool:
+        """
+        Returns whether a method synthesizes the independent groups of holes
+        separately (see `combined`).
+        """
+        return bool(self.parts) and method not in self.unsplit
+
+    def combined(self, method: int) -> Dict[str, Expression]:
+        """
+        Returns the completion of the holes that combines the solutions of
+        the solved groups of holes and the next candidate of the others,
+        proposed by the synthesizers of the groups. Each candidate is
+        verified against the program of its group: a valid one solves the
+        group, and the verdict of an invalid one goes to the synthesizer of
+        the group only.
+        If every group was already solved, the completion of their
+        solutions was returned: if it is a solution, the method has no new
+        completion, and otherwise it searches the whole program from then
+        on.
+        """
+        if not self._parts_configured:
+            for _, part in self.parts:
+                for setting in PART_SETTINGS:
+                    setattr(part, setting, getattr(self, setting))
+            self._parts_configured = True
+        solved = self.solved.setdefault(method, {})
+        if len(solved) == len(self.parts):
+            completion = {hole: expr for index in solved for hole, expr in solved[index].items()}
+            result, _ = self.verifier.check(Evaluator(completion).evaluate(self.ast))
+            if result == unsat:
+                raise SynthesisException(f"Method {method} has no new completion to propose.")
+            self.unsplit.add(method)
+            return self.batch(method, 1)[0]
+        completion: Dict[str, Expression] = {}
+        for index, (group, part) in enumerate(self.parts):
+            if index in solved:
+                completion.update(solved[index])
+                continue
+            candidate = part.propose(method)
+            result, cex = self.verifier.check(Evaluator(candidate).evaluate(group.prog))
+            if result == unsat:
+                solved[index] = candidate
+            else:
+                part.feedback(Verdict(False, cex))
+            completion.update(candidate)
+        return completion
+
+    def stream(self, method: int) -> Tuple[Callable[[], Iterator[Dict[str, Expression]]], bool]:
+        """
+        Returns the function that builds the candidate stream of a method,
+        and whether the stream is rebuilt when examples are added (see
+        `next_candidate`).
+        """
+        if method == 1:
+            return (self.symbolic if self.symbolic_constants else self.best_first), False
+        if method == 4:
+            return self.stochastic, False
+        return (lambda: self.bottom_up(method)), True
+
+    def batch(self, method: int, size: int) -> List[Dict[str, Expression]]:
+        """
+        Returns a batch of at most size new completions of a method (see
+        `synth_method_1` to `synth_method_4`), and at least one: raises a
+        SynthesisException if the method has none. The previous batch of
+        the method is verified first, in one solver session, and the
+        counterexamples of its invalid completions are added to the
+        examples: the completions of a batch are all consistent with the
+        same examples. With independent groups of holes, the batch has the
+        combined completions of the groups, whose candidates are verified
+        by the synthesizers of the groups.
+        """
+        self.autosave()
+        if self.split(method):
+            batch = [self.combined(method)]
+            # A completion of the solutions of every group ends the batch.
+            while len(batch) < size and self.split(method) and len(self.solved[method]) < len(self.parts):
+                try:
+                    batch.append(self.combined(method))
+                except SynthesisException:
+                    break
+            return batch
+        self.learn(method)
+        batch = []
+        if method == 3 and self.divide is not None and self._divide_failed != len(self.examples):
+            tree = self.divide.solve(self.examples)
+            if tree is None:
+                # No need to try again before new examples are found.
+                self._divide_failed = len(self.examples)
+            if tree is not None:
+                completion = {self.divide.grammar.hole: tree}
+                if self.remember((3, completion_key(completion))):
+                    # The decision tree is verified on its own.
+                    batch = [completion]
+                    size = 1
+        stream, restart = self.stream(method)
+        while len(batch) < size:
+            try:
+                batch.append(self.next_candidate(method, stream, restart))
+            except SynthesisException:
+                if not batch:
+                    raise
+                break
+        self._last[method] = batch
+        return batch
+
+    def candidates(self, method: int = 3, batch_size: int = FRONTIER_SIZE) -> Generator[
+            List[Dict[str, Expression]], Optional[List[Verdict]], None]:
+        """
+        Yields batches of at most batch_size new completions of a method
+        (see `batch`), until the method has none. Each batch can be
+        evaluated and verified at once, e.g. with
+        `verification.verifier.verify_completions`, whose verdicts are sent
+        back to the generator (`batches.send(verdicts)` for the next batch):
+        the counterexamples of the verdicts are added to the examples. A
+        batch whose verdicts are not sent (`next(batches)`) is verified by
+        the synthesizer before the next one is built.
+        """
+        while True:
+            try:
+                batch = self.batch(method, batch_size)
+            except SynthesisException:
+                return
+            verdicts = yield batch
+            if verdicts is not None:
+                self.verified(method, verdicts)
+
+    def verified(self, method: int, verdicts: List[Verdict]) -> None:
+        """
+        Records that the last batch of a method was verified by the caller,
+        with these verdicts: the batch is not verified again by `batch`,
+        and the counterexamples of the verdicts are added to the examples.
+        With independent groups of holes, the candidates of the groups are
+        verified by their synthesizers, and the verdicts are ignored.
+        """
+        if self.split(method):
+            return
+        self._last.pop(method, None)
+        for verdict in verdicts:
+            self.feedback(verdict)
+
+    def propose(self, method: int) -> Dict[str, Expression]:
+        """
+        Returns the next new completion of a method, as in `batch`, which
+        the caller verifies: its verdict can be sent back with `feedback`.
+        Raises a SynthesisException if the method has none.
+        """
+        completion = self.batch(method, 1)[0]
+        self._last.pop(method, None)
+        return completion
+
+    def feedback(self, verdict: Verdict) -> None:
+        """
+        Records the verdict of a completion verified by the caller: the
+        counterexample of an invalid completion is added to the examples.
+        """
+        if not verdict.valid and verdict.counterexample is not None:
+            self.add_example(verdict.counterexample)
+
+    def respond(self, method: int, propose: Callable[[], Dict[str, Expression]]) -> Dict[str, Expression]:
+        """
+        Returns the completion a method returns to the synthesis loop: the
+        one proposed by propose(), or, once the method has no new
+        completion, a copy of the last one it returned (the fallback
+        completion if it never returned one). The loop of main.py then runs
+        to its iteration limit instead of stopping on a SynthesisException.
+        """
+        try:
+            self._returned[method] = propose()
+            return self._returned[method]
+        except SynthesisException:
+            last = self._returned[method] if method in self._returned else self.fallback()
+            # The expressions of the copy are new nodes.
+            return decode_completion(encode_completion(last), program_variables(self.ast))
+
+    def fallback(self) -> Dict[str, Expression]:
+        """
+        Returns the completion of the holes for a method that has none to
+        propose: the first expression of the grammar of each hole.
+        """
+        return {hole: next(BottomUpEnumerator(grammar, [], prune=False).enumerate())[0]
+                for hole, grammar in self.grammars.items()}
 
     def synth_method_1(self,) -> Mapping[str, Expression]:
         """
         Returns a map from each hole id in the program `self.ast`
         to an expression (method 1).
 
-        **TODO: write a description of your approach in this method.**
+        Best-first enumeration: the derivations of the holes are searched
+        by increasing cost, with variables before constants, and a
+        completion is returned only if it satisfies the constraint on every
+        example. The last completion is verified at the next call, and its
+        counterexample is added to the examples.
+        With `symbolic_constants` set, the search is over skeletons whose
+        constants are solved for instead (see `symbolic`). With
+        `conflict_pruning` set, the derivations that contain the part of a
+        failed completion that made it fail are not expanded.
         """
-        # TODO : complete this method
-        raise Exception("Synth.Synthesizer.synth_method_1 is not implemented.")
+        return self.respond(1, lambda: self.batch(1, 1)[0])
 
     def synth_method_2(self,) -> Mapping[str, Expression]:
         """
         Returns a map from each hole id in the program `self.ast`
         to an expression (method 2).
 
-        **TODO: write a description of your approach in this method.**
+        Bottom-up enumeration with observational equivalence: the
+        expressions of each hole are built by increasing size from smaller
+        ones, and only one expression is kept in the bank for each distinct
+        vector of values on the examples. The bank is rebuilt whenever a
+        new counterexample is found.
         """
-        # TODO : complete this method
-        raise Exception("Synth.Synthesizer.synth_method_2 is not implemented.")
+        return self.respond(2, lambda: self.batch(2, 1)[0])
 
     def synth_method_3(self,) -> Mapping[str, Expression]:
         """
         Returns a map from each hole id in the program `self.ast`
         to an expression (method 3).
 
-        **TODO: write a description of your approach in this method.**
+        Bottom-up enumeration with observational equivalence, as in method
+        2, but the consistent candidates are verified by frontiers of
+        `FRONTIER_SIZE` in one solver session: the first valid completion
+        of the frontier is returned if there is one, otherwise the first
+        completion, and the counterexamples of the whole frontier are added
+        to the examples at once.
+        If the hole has an if-then-else production, the divide-and-conquer
+        engine is tried first: it returns a decision tree over enumerated
+        predicates whose leaves are enumerated terms, and is verified on its
+        own.
+        """
+        def propose() -> Dict[str, Expression]:
+            if self.split(3):
+                return self.batch(3, 1)[0]
+            frontier = self.batch(3, FRONTIER_SIZE)
+            # The frontier is verified now, to return its valid completion.
+            solution = self.verify_frontier(self._last.pop(3))
+            return frontier[0] if solution is None else solution
+        return self.respond(3, propose)
+
+    def synth_method_4(self,) -> Mapping[str, Expression]:
+        """
+        Returns a map from each hole id in the program `self.ast`
+        to an expression (method 4).
+
+        Stochastic search: a Markov chain mutates the derivations of the
+        holes, and accepts the mutations with the Metropolis-Hastings rule
+        on the number of examples they fail (see `stochastic`). It is meant
+        for grammars too large to enumerate; the moves are reproducible
+        for a given `stochastic_seed`. The last completion is verified at
+        the next call, and its counterexample is added to the examples.
         """
-        # TODO : complete this method
-        raise Exception("Synth.synth_method_3 is not implemented.")
+        return self.respond(4, lambda: self.batch(4, 1)[0])
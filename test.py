@@ -17,24 +17,39 @@ python3 ./test.py -k test_verif
 # These tests check the syntax presented in Part 1
 from test.parser_test import *
 from test.ast_test import *
-# Below are tests you should uncomment as you make progress.
-
-# TODO Once you have completed 2 - Symbolic Evaluation
-# uncomment the next line
-# from test.eval_test import *
-
-# 3 and 4 can be done independently, for most of it.
-
-# TODO Once you have completed 3 - Verifying Programs, uncomment the next line
-# from test.verif_test import *
-
-# TODO Once you have completed 4 - Enumerating Progams, uncomment the next line
-# from test.enumerate_test import *
-
-# TODO Once you have completed 3 and 4, uncomment the next line.
-# from test.synth_test import *
-# You should also check on some input files that the correct
-# program is synthesized.
+# These tests check symbolic evaluation (Part 2)
+from test.eval_test import *
+# These tests check verification (Part 3)
+from test.verif_test import *
+from test.classify_test import *
+from test.bitvector_test import *
+from test.decompose_test import *
+
+# These tests check enumeration (Part 4)
+from test.enumerate_test import *
+from test.interp_test import *
+from test.bottom_up_test import *
+from test.banks_test import *
+from test.best_first_test import *
+from test.pcfg_test import *
+from test.divide_test import *
+from test.constants_test import *
+from test.canonical_test import *
+from test.analysis_test import *
+from test.normalize_test import *
+from test.abstract_test import *
+from test.smt_test import *
+from test.holes_test import *
+from test.counting_test import *
+from test.stochastic_test import *
+from test.conflicts_test import *
+from test.streaming_test import *
+from test.checkpoint_test import *
+from test.candidates_test import *
+from test.store_test import *
+from test.pipeline_test import *
+# These tests check that the correct program is synthesized.
+from test.synth_test import *
 
 # TODO Write your own tests
 from test.student_test import *
@@ -0,0 +1,136 @@
+from lang.ast import *
+from lang.interp import interpret, interpret_binary, interpret_unary, run_program
+from lang.symb_eval import Evaluator
+from synthesis.abstract import (INF, Abstract, AbstractPruner, abstract_binary, abstract_ite,
+                                abstract_unary, symbol_values)
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.grammar import HoleGrammar
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+NEGATIVE = """
+input x : int;
+input y : int;
+hole h : int [G : int -> abs G | G - G | G % 3 | Var];
+assert (h < 0);
+"""
+
+
+def contains(value, concrete):
+    if concrete is None:
+        return value.undefined
+    if isinstance(concrete, bool):
+        return concrete in value.bools
+    sign = (concrete > 0) - (concrete < 0)
+    return value.lo <= concrete <= value.hi and sign in value.signs
+
+
+def small_values():
+    # Abstract values over [-4, 4], with the integers they contain.
+    for lo in range(-4, 5):
+        for hi in range(lo, 5):
+            for signs in ((-1, 0, 1), (-1, 1), (0, 1), (-1,)):
+                value = Abstract(lo, hi, signs)
+                yield value, [v for v in range(lo, hi + 1) if contains(value, v)]
+
+
+class TestAbstract(unittest.TestCase):
+    def test_reduction(self):
+        self.assertEqual(str(Abstract(-3, 5, (0, 1))), "[0, 5]")
+        self.assertEqual(str(Abstract(0, 5, (-1, 1))), "[1, 5]")
+        self.assertEqual(Abstract(0, 0, (-1, 1)).is_int(), False)
+        self.assertEqual(str(Abstract(1, 1, (1,)).join(Abstract.of(None))), "[1, 1] | undefined")
+
+    def test_operators(self):
+        nonzero = Abstract(-3, 5, (-1, 1))
+        self.assertEqual(str(abstract_unary(UnaryOperator.ABS, nonzero)), "[1, 5]")
+        self.assertEqual(str(abstract_binary(BinaryOperator.TIMES, nonzero, Abstract(0, 2, (0,)))),
+                         "[0, 0]")
+        small, divisor = Abstract(0, 1, (0, 1)), Abstract(2, 4, (1,))
+        self.assertEqual(str(abstract_binary(BinaryOperator.MODULO, small, divisor)), "[0, 1]")
+        self.assertEqual(str(abstract_binary(BinaryOperator.MODULO, Abstract.top(PaddleType.INT),
+                                             divisor)), "[0, 3]")
+        self.assertEqual(str(abstract_binary(BinaryOperator.DIV, divisor, Abstract(0, 2, (0, 1)))),
+                         "[1, 4] | undefined")
+        self.assertEqual(str(abstract_binary(BinaryOperator.GREATER, divisor, small)), "{true}")
+        either = Abstract.top(PaddleType.BOOL)
+        self.assertEqual(str(abstract_ite(either, small, divisor)), "[0, 4]")
+        # An undefined disjunct does not matter when the other one is true.
+        self.assertEqual(str(abstract_binary(BinaryOperator.OR, Abstract.of(True),
+                                             Abstract.of(None))), "{true}")
+
+    def test_sound(self):
+        values = list(small_values())[::7]
+        for operator in BinaryOperator:
+            if operator in (BinaryOperator.AND, BinaryOperator.OR):
+                continue
+            for lhs, lhs_values in values:
+                for rhs, rhs_values in values:
+                    result = abstract_binary(operator, lhs, rhs)
+                    for a in lhs_values:
+                        for b in rhs_values:
+                            self.assertTrue(contains(result, interpret_binary(operator, a, b)),
+                                            f"{lhs} {operator} {rhs}: {a} {operator} {b}")
+        for operator in (UnaryOperator.NEG, UnaryOperator.ABS):
+            for operand, operand_values in values:
+                result = abstract_unary(operator, operand)
+                for a in operand_values:
+                    self.assertTrue(contains(result, interpret_unary(operator, a)))
+        # Unbounded intervals.
+        positive = Abstract(1, INF, (1,))
+        self.assertEqual(str(abstract_binary(BinaryOperator.DIV, Abstract(-INF, -5, (-1,)), positive)),
+                         "[-inf, -1]")
+
+    def test_symbol_values(self):
+        ast = parse(string=NEGATIVE)
+        grammar = HoleGrammar(ast, ast.holes[0])
+        values = symbol_values(grammar, {"x": Abstract.of(3), "y": Abstract.of(5)})
+        # Widened: the differences of the variables grow without bound.
+        self.assertEqual(str(values["G"]), "[-inf, inf]")
+        ast = parse(string="input x : int; hole h : int [G : int -> G + G | abs G | Var];"
+                           "assert (h < x);")
+        values = symbol_values(HoleGrammar(ast, ast.holes[0]), {"x": Abstract.of(3)})
+        self.assertEqual(str(values["G"]), "[3, inf]")
+
+    def test_pruned_enumeration(self):
+        ast = parse(string=NEGATIVE)
+        grammars = {"h": HoleGrammar(ast, ast.holes[0])}
+        examples = [{"x": 3, "y": 5}]
+
+        def consistent(enumerator):
+            return [str(c["h"]) for c in enumerator.enumerate()
+                    if all(run_program(ast, example, {"h": interpret(c["h"], example)}) is not False
+                           for example in examples)]
+        plain = BestFirstEnumerator(grammars, max_size=6)
+        pruner = AbstractPruner(ast, grammars, examples)
+        pruned = BestFirstEnumerator(grammars, max_size=6, pruner=pruner)
+        self.assertEqual(consistent(pruned), consistent(plain))
+        self.assertIn("(x - y)", consistent(pruned))
+        # `abs G` and `G % 3` can never be negative.
+        self.assertGreater(pruner.refuted, 0)
+        self.assertLess(pruned.pushed, plain.pushed)
+        # Examples added later are used by the pruner.
+        examples.append({"x": 5, "y": 3})
+        later = consistent(BestFirstEnumerator(grammars, max_size=6,
+                                               pruner=AbstractPruner(ast, grammars, examples)))
+        self.assertNotIn("(x - y)", later)
+
+    def test_synthesize_with_pruning(self):
+        for name in ("max2.paddle", "abs_neg.paddle", "sum5.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            synt = Synthesizer(ast)
+            synt.abstract_pruning = True
+            for _ in range(50):
+                completion = synt.synth_method_1()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from lang.ast import *
+from lang.interp import hole_environment
+from synthesis.analysis import INFINITY, GrammarAnalysis
+from synthesis.banks import compositions
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.grammar import HoleGrammar
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+# H never derives an expression, and U is not reachable from G.
+USELESS = """
+input x : int;
+input b : bool;
+hole h : int [
+    G : int -> G + G | G * H | B ? G : G | Var | 1;
+    H : int -> H - H;
+    B : bool -> G > G | Var;
+    U : int -> 0
+];
+assert (h > x);
+"""
+
+
+class TestAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.ast = parse(string=USELESS)
+        self.grammar = HoleGrammar(self.ast, self.ast.holes[0])
+        self.analysis = GrammarAnalysis(self.grammar)
+
+    def test_tables(self):
+        analysis = self.analysis
+        self.assertEqual(analysis.productive, {"G", "B", "U"})
+        self.assertEqual(analysis.reachable, {"G", "B"})
+        self.assertEqual(analysis.min_size, {"G": 1, "H": INFINITY, "B": 1, "U": 1})
+        self.assertEqual(analysis.min_depth["G"], 1)
+        self.assertEqual(analysis.min_depth["H"], INFINITY)
+        self.assertEqual(analysis.types["B"], PaddleType.BOOL)
+        self.assertEqual({v.name for v in analysis.variables["G"]}, {"x", "b"})
+        self.assertEqual({v.name for v in analysis.variables["B"]}, {"x", "b"})
+        self.assertEqual(analysis.variables["U"], set())
+        self.assertEqual([str(p) for p in analysis.useful("G")],
+                         ["G -> (G + G)", "G -> B ? G : G", "G -> x", "G -> 1"])
+        self.assertEqual(analysis.useful("H"), [])
+
+    def test_depth(self):
+        ast = parse(str(EXAMPLES / "example.paddle"))
+        analysis = GrammarAnalysis(HoleGrammar(ast, ast.holes[0]))
+        # ITE -> B ? G : G, with B -> G > G.
+        self.assertEqual(analysis.min_size, {"G": 1, "ITE": 6, "B": 3})
+        self.assertEqual(analysis.min_depth, {"G": 1, "ITE": 3, "B": 2})
+
+    def test_compositions_with_minimums(self):
+        self.assertEqual(list(compositions(5, 3, [3, 1, 1])), [(3, 1, 1)])
+        self.assertEqual(list(compositions(5, 2, [1, 3])), [(1, 4), (2, 3)])
+        self.assertEqual(list(compositions(3, 2, [3, 1])), [])
+
+    def test_enumerators_skip_useless_productions(self):
+        environments = [hole_environment(self.ast, {"x": 1, "b": True})]
+        bottom_up = BottomUpEnumerator(self.grammar, environments, prune=False, max_size=5)
+        best_first = BestFirstEnumerator({"h": self.grammar}, max_size=5, canonical=False)
+        terms = {expression_key(expr) for expr, _ in bottom_up.enumerate()}
+        self.assertEqual(terms, {expression_key(c["h"]) for c in best_first.enumerate()})
+        self.assertFalse(any("*" in str(expr) for expr, _ in bottom_up.enumerate()))
+        self.assertEqual(bottom_up.bank.sizes["H"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
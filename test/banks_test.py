@@ -0,0 +1,83 @@
+from lang.ast import *
+from lang.interp import hole_environment
+from synthesis.banks import BankPool, Eviction, level_bytes
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.grammar import HoleGrammar
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+TWO_HOLES = """
+input x : int;
+input y : int;
+hole h1 : int [ G : int -> G + G | G * G | Var | 1 ];
+hole h2 : int [ H : int -> H + H | H * H | Var | 1 ];
+assert (h1 + h2 > x);
+"""
+
+
+def terms(enumerator):
+    return [(str(expr), values) for expr, values in enumerator.enumerate()]
+
+
+class TestBanks(unittest.TestCase):
+    def setUp(self):
+        self.ast = parse(str(EXAMPLES / "max3.paddle"))
+        self.grammar = HoleGrammar(self.ast, self.ast.holes[0])
+        examples = [{"x": 1, "y": 2, "z": 3}, {"x": -3, "y": 5, "z": 0}]
+        self.environments = [hole_environment(self.ast, e) for e in examples]
+
+    def test_shared_banks(self):
+        ast = parse(string=TWO_HOLES)
+        environments = [hole_environment(ast, {"x": 2, "y": -1})]
+        pool = BankPool(environments)
+        first, second = (BottomUpEnumerator(HoleGrammar(ast, hole), environments,
+                                            max_size=5, pool=pool)
+                         for hole in ast.holes)
+        # The grammars only differ by the name of their nonterminal.
+        self.assertEqual(len(pool.banks), 1)
+        self.assertIs(first.bank, second.bank)
+        self.assertEqual(terms(first), terms(second))
+
+    def test_lazy_levels(self):
+        pool = BankPool(self.environments)
+        enumerator = BottomUpEnumerator(self.grammar, self.environments, pool=pool)
+        enumerator.level(4)
+        # Only the levels that G of size 4 depends on are built: B ? G : G
+        # has size 4 only if B has size 1, but the smallest B (G > G) has
+        # size 3, so no level of B is needed.
+        self.assertEqual(enumerator.bank.sizes, {"G": 4, "B": 0})
+        enumerator.level(6)
+        self.assertEqual(enumerator.bank.sizes, {"G": 6, "B": 3})
+        self.assertEqual(pool.used, sum(pool.resident.values()) + pool.seen_used)
+        self.assertEqual(pool.used - pool.seen_used, sum(level_bytes(level)
+                                                         for level in enumerator.bank.levels.values()))
+        # The values seen are accounted for, and are not evicted.
+        self.assertEqual(pool.seen_used, enumerator.bank.seen_bytes)
+        self.assertGreater(pool.seen_used, 0)
+        self.assertGreaterEqual(pool.peak, pool.used)
+
+    def test_eviction(self):
+        expected = terms(BottomUpEnumerator(self.grammar, self.environments, max_size=7))
+        for eviction in (Eviction.DROP, Eviction.SPILL):
+            pool = BankPool(self.environments, budget=1, eviction=eviction)
+            enumerator = BottomUpEnumerator(self.grammar, self.environments,
+                                            max_size=7, pool=pool)
+            # Evicted levels are rebuilt or read back with the same entries.
+            self.assertEqual(terms(enumerator), expected)
+            self.assertEqual(terms(enumerator), expected)
+            self.assertGreater(pool.evictions, 0)
+            self.assertGreater(pool.restores, 0)
+            # Only the last level is in memory, with the values seen.
+            self.assertEqual(len(pool.resident), 1)
+            self.assertEqual(pool.used, sum(pool.resident.values()) + enumerator.bank.seen_bytes)
+            pool.close()
+
+    def test_expression_from_key(self):
+        variables = {v.name: v for v in self.ast.inputs}
+        for expr, _ in BottomUpEnumerator(self.grammar, self.environments, max_size=6).enumerate():
+            rebuilt = expression_from_key(expression_key(expr), variables)
+            self.assertEqual(expression_key(rebuilt), expression_key(expr))
+            self.assertEqual(str(rebuilt), str(expr))
@@ -0,0 +1,58 @@
+from lang.ast import *
+from synthesis.best_first import (BestFirstEnumerator, minimum_sizes, size_cost,
+                                  variables_first_cost, weighted_cost)
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.grammar import HoleGrammar
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def grammars(ast):
+    return {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+
+
+class TestBestFirst(unittest.TestCase):
+    def test_minimum_sizes(self):
+        ast = parse(str(EXAMPLES / "example.paddle"))
+        # ITE -> B ? G : G, with B -> G > G.
+        self.assertEqual(minimum_sizes(HoleGrammar(ast, ast.holes[0])),
+                         {"G": 1, "ITE": 6, "B": 3})
+
+    def test_complete_without_duplicates(self):
+        ast = parse(str(EXAMPLES / "max2.paddle"))
+        completions = [c["hmax"] for c in BestFirstEnumerator(grammars(ast), max_size=6,
+                                                              canonical=False).enumerate()]
+        keys = [expression_key(expr) for expr in completions]
+        self.assertEqual(len(keys), len(set(keys)))
+        # The same expressions as the bottom-up enumeration without pruning.
+        bottom_up = BottomUpEnumerator(HoleGrammar(ast, ast.holes[0]), [], prune=False, max_size=6)
+        self.assertEqual(set(keys), {expression_key(expr) for expr, _ in bottom_up.enumerate()})
+        self.assertIn("(x > y) ? x : y", [str(expr) for expr in completions])
+
+    def test_cost_order(self):
+        ast = parse(str(EXAMPLES / "sum2.paddle"))
+        holes = grammars(ast)
+        by_size = [str(c["h"]) for c in BestFirstEnumerator(holes, size_cost, max_size=3).enumerate()]
+        self.assertEqual(by_size[:4], ["x", "y", "0", "1"])
+        self.assertEqual(by_size[4], "(x + x)")
+        # Variables first: x + y comes before the constant 1.
+        variables_first = BestFirstEnumerator(holes, variables_first_cost(4), max_size=3)
+        ordered = [str(c["h"]) for c in variables_first.enumerate()]
+        self.assertLess(ordered.index("(x + y)"), ordered.index("1"))
+        # Weights by production.
+        weighted = BestFirstEnumerator(holes, weighted_cost({"G -> y": 0.5}), max_size=3)
+        self.assertEqual(str(next(weighted.enumerate())["h"]), "y")
+
+    def test_holes_and_budget(self):
+        ast = parse(str(EXAMPLES / "division.paddle"))
+        enumerator = BestFirstEnumerator(grammars(ast), max_size=3)
+        completions = list(enumerator.enumerate())
+        self.assertEqual(set(completions[0]), {"h1", "h2"})
+        keys = {tuple(expression_key(c[h]) for h in ("h1", "h2")) for c in completions}
+        self.assertEqual(len(keys), len(completions))
+        budgeted = BestFirstEnumerator(grammars(ast), max_size=3, budget=10)
+        self.assertLess(len(list(budgeted.enumerate())), len(completions))
+        self.assertLess(budgeted.pushed, enumerator.pushed)
@@ -0,0 +1,47 @@
+from lang.symb_eval import Evaluator
+from lang.ast import *
+from verification.bitvector import bitvector_counterexample
+from verification.verifier import Verifier
+import unittest
+from lang.paddle import parse
+import os
+from pathlib import Path
+
+
+def constraint_of(string: str) -> Expression:
+    return Evaluator({}).evaluate(parse(string=string))
+
+
+class TestBitVector(unittest.TestCase):
+    def test_overflow_is_not_a_counterexample(self):
+        # Over 8-bit vectors x + 1 > x is false for x = 127, but the
+        # overflow guards must prevent that counterexample.
+        formula = constraint_of("input x : int; assert (x + 1 > x);")
+        self.assertIsNone(bitvector_counterexample(formula, 8))
+        self.assertTrue(Verifier(bitvector_width=8).is_valid(formula))
+        formula = constraint_of("input x : int; assert (x * x >= 0 && (abs x) >= 0);")
+        self.assertIsNone(bitvector_counterexample(formula, 4))
+
+    def test_counterexamples_are_integer_counterexamples(self):
+        formula = constraint_of(
+            "input x : int; input y : int; assert (x * y != 12 || x % 5 = 2);")
+        cex = bitvector_counterexample(formula, 8)
+        self.assertIsNotNone(cex)
+        self.assertEqual(cex["x"] * cex["y"], 12)
+        self.assertNotEqual(cex["x"] % 5, 2)
+        # Euclidean division: -7 = 2 * (-4) + 1.
+        formula = constraint_of("input x : int; assert (x / 2 != (- 4) || x % 2 != 1);")
+        self.assertEqual(bitvector_counterexample(formula, 8), {"x": -7})
+
+    def test_same_verdicts_as_integers(self):
+        examples_directory = '%s/examples/verification' % Path(
+            __file__).parent.parent.absolute()
+        bitvector = Verifier(bitvector_width=8)
+        integer = Verifier()
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                expr = Evaluator({}).evaluate(
+                    parse(os.path.join(examples_directory, filename)))
+                self.assertEqual(bitvector.is_valid(expr), integer.is_valid(expr),
+                                 msg=f"The bit-vector fast path changed the result on {filename}")
+        self.assertGreater(bitvector.bitvector_rejections, 0)
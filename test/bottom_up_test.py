@@ -0,0 +1,98 @@
+from lang.ast import *
+from lang.interp import hole_environment, interpret
+from lang.symb_eval import Evaluator
+from synthesis.bottom_up import BottomUpEnumerator, compositions
+from synthesis.grammar import HoleGrammar
+from synthesis.synth import SynthesisException, Synthesizer, completion_key
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+class TestBottomUp(unittest.TestCase):
+    def test_compositions(self):
+        self.assertEqual(list(compositions(3, 2)), [(1, 2), (2, 1)])
+        self.assertEqual(list(compositions(2, 3)), [])
+        self.assertEqual(list(compositions(0, 0)), [()])
+
+    def test_grammar(self):
+        ast = parse(str(EXAMPLES / "even.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0])
+        self.assertEqual(grammar.start, "G")
+        # H -> Integer is expanded into the pool of constants, which
+        # contains the constants of the program.
+        constants = [p.template.value for p in grammar.productions["H"]]
+        self.assertIn(2, constants)
+        self.assertEqual(constants[0], 0)
+        self.assertEqual([p.slots for p in grammar.productions["G"]][:3],
+                         [["G", "G"], ["G", "H"], ["H", "G"]])
+        ast = parse(string="""
+        input x : int; input b : bool;
+        hole h : int [ G : int -> B ? G : G | Var; B : bool -> B && B | Var ];
+        assert (h > 0);""")
+        grammar = HoleGrammar(ast, ast.holes[0])
+        # Var is expanded into the variables of the type of the symbol.
+        self.assertEqual([str(p.template) for p in grammar.productions["G"][1:]], ["x"])
+        self.assertEqual([str(p.template) for p in grammar.productions["B"][1:]], ["b"])
+        self.assertEqual(grammar.productions["G"][0].slots, ["B", "G", "G"])
+
+    def test_observational_equivalence(self):
+        ast = parse(str(EXAMPLES / "sum2.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0])
+        examples = [{"x": 1, "y": 2}, {"x": -3, "y": 5}]
+        environments = [hole_environment(ast, e) for e in examples]
+        plain = BottomUpEnumerator(grammar, environments, prune=False, max_size=5)
+        pruned = BottomUpEnumerator(grammar, environments, prune=True, max_size=5)
+        plain_terms = list(plain.enumerate())
+        pruned_terms = list(pruned.enumerate())
+        self.assertLess(len(pruned_terms), len(plain_terms))
+        self.assertGreater(pruned.pruned, 0)
+        # Values are the values of the expressions on the examples, and
+        # no two kept expressions have the same values.
+        for expr, values in pruned_terms:
+            self.assertEqual(values, tuple(interpret(expr, env) for env in environments))
+        self.assertEqual(len({values for _, values in pruned_terms}), len(pruned_terms))
+        # Every value vector of the plain enumeration is represented.
+        self.assertEqual({values for _, values in plain_terms},
+                         {values for _, values in pruned_terms})
+        # Expressions come by increasing size: 0 + 1 (size 3) after x.
+        self.assertEqual([str(e) for e, _ in pruned_terms[:4]], ["x", "y", "0", "1"])
+
+    def test_no_new_completion(self):
+        # A method with no new completion returns its last one (or the
+        # fallback completion) again, and the loop runs to its limit.
+        for name in ("no_sol_1.paddle", "no_sol_2.paddle", "max3.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            for method in (1, 2, 3):
+                synt = Synthesizer(ast)
+                completions = [getattr(synt, f"synth_method_{method}")() for _ in range(60)]
+                self.assertEqual(sorted(completions[-1]), [hole.var.name for hole in ast.holes])
+                self.assertEqual(completion_key(completions[-2]), completion_key(completions[-1]))
+        synt = Synthesizer(parse(str(EXAMPLES / "no_sol_1.paddle")))
+        self.assertEqual({hole: str(expr) for hole, expr in synt.synth_method_2().items()}, {"h": "0"})
+        with self.assertRaises(SynthesisException):
+            synt.batch(2, 1)
+
+    def test_verified_once(self):
+        # The synthesizer does not check again the candidates main.py checked.
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        synt = Synthesizer(ast)
+        for _ in range(5):
+            completion = synt.synth_method_2()
+            self.assertFalse(is_valid(Evaluator(completion).evaluate(ast)))
+        self.assertEqual(sum(len(times) for times in synt.verifier.stats.latencies.values()), 0)
+        self.assertGreaterEqual(synt.verifier.cache.hits, 4)
+
+    def test_cache_per_run(self):
+        # A new synthesizer does not reuse the results of an earlier run.
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        first = Synthesizer(ast)
+        completion = first.synth_method_2()
+        self.assertFalse(is_valid(Evaluator(completion).evaluate(ast)))
+        second = Synthesizer(ast)
+        self.assertIsNot(second.verifier.cache, first.verifier.cache)
+        self.assertFalse(is_valid(Evaluator(second.synth_method_2()).evaluate(ast)))
+        self.assertEqual(second.verifier.cache.hits, 0)
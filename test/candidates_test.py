@@ -0,0 +1,86 @@
+from lang.ast import *
+from lang.interp import hole_environment, interpret, run_program
+from synthesis.synth import Synthesizer, completion_key
+from verification.verifier import verify_completions
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def batch_solve(synt, method, batch_size):
+    # The synthesis loop of main.py, one batch of candidates at a time.
+    batches = synt.candidates(method, batch_size)
+    batch = next(batches, None)
+    while batch is not None:
+        verdicts = verify_completions(synt.ast, batch)
+        for completion, verdict in zip(batch, verdicts):
+            if verdict.valid:
+                return completion
+        # The verdicts go back to the synthesizer, which adds the
+        # counterexamples to its examples.
+        try:
+            batch = batches.send(verdicts)
+        except StopIteration:
+            return None
+    return None
+
+
+class TestCandidates(unittest.TestCase):
+    def test_batches(self):
+        ast = parse(str(EXAMPLES / "not_really_max.paddle"))
+        synt = Synthesizer(ast)
+        batches = synt.candidates(2, batch_size=4)
+        batch = next(batches)
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(len({completion_key(c) for c in batch}), 4)
+        # The completions of a batch are consistent with the same examples.
+        examples = list(synt.examples)
+        for completion in batch:
+            for example in examples:
+                env = hole_environment(ast, example)
+                values = {hole: interpret(expr, env) for hole, expr in completion.items()}
+                self.assertIsNot(run_program(ast, example, values), False)
+        # The batch is verified before the next one is built.
+        later = next(batches)
+        self.assertGreater(len(synt.examples), len(examples))
+        self.assertFalse({completion_key(c) for c in later} & {completion_key(c) for c in batch})
+
+    def test_send_verdicts(self):
+        ast = parse(str(EXAMPLES / "not_really_max.paddle"))
+        synt = Synthesizer(ast)
+        batches = synt.candidates(2, batch_size=4)
+        batch = next(batches)
+        verdicts = verify_completions(ast, batch)
+        counterexamples = [v.counterexample for v in verdicts if v.counterexample is not None]
+        examples = len(synt.examples)
+        batches.send(verdicts)
+        self.assertTrue(counterexamples)
+        self.assertTrue(all(cex in synt.examples[examples:] for cex in counterexamples
+                            if set(cex) == {var.name for var in ast.inputs}))
+        self.assertGreater(len(synt.examples), examples)
+
+    def test_single_calls(self):
+        # A call of a method is a batch of one completion.
+        for method in (1, 2):
+            ast = parse(str(EXAMPLES / "max2.paddle"))
+            single, batched = Synthesizer(ast), Synthesizer(ast)
+            calls = [completion_key(single.synth_method_1() if method == 1 else single.synth_method_2())
+                     for _ in range(2)]
+            batches = batched.candidates(method, batch_size=1)
+            self.assertEqual([completion_key(next(batches)[0]) for _ in range(2)], calls)
+
+    def test_solve_with_batches(self):
+        for name in ("max2.paddle", "abs_neg.paddle", "xor.paddle", "independent.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            for method in (1, 2, 3):
+                self.assertIsNotNone(batch_solve(Synthesizer(ast), method, 8), f"{name}, method {method}")
+
+    def test_no_solution(self):
+        ast = parse(str(EXAMPLES / "no_sol_1.paddle"))
+        self.assertIsNone(batch_solve(Synthesizer(ast), 2, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
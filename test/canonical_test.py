@@ -0,0 +1,80 @@
+from lang.ast import *
+from lang.interp import hole_environment
+from synthesis.banks import BankPool
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.canonical import CanonicalRules, canonical, is_canonical
+from synthesis.grammar import HoleGrammar
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def expression(text):
+    ast = parse(string=f"input x : int; input y : int; input z : int; input b : bool; assert {text};")
+    return ast.constraint
+
+
+def enumerate_all(name, canonical_only, max_size):
+    ast = parse(str(EXAMPLES / name))
+    holes = {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+    enumerator = BestFirstEnumerator(holes, max_size=max_size, canonical=canonical_only)
+    return [c[ast.holes[0].var.name] for c in enumerator.enumerate()]
+
+
+class TestCanonical(unittest.TestCase):
+    def test_canonical(self):
+        self.assertEqual(str(canonical(expression("(y + (z + x) > 0)"))), "(((x + y) + z) > 0)")
+        self.assertEqual(str(canonical(expression("((y * 2) = (x - z))"))), "((x - z) = (y * 2))")
+        self.assertEqual(str(canonical(expression("((- (- (x + 1))) > 0)"))), "((x + 1) > 0)")
+        self.assertEqual(str(canonical(expression("(! (! ((x > 0) && b)))"))), "(b && (x > 0))")
+        # Subtraction is neither commutative nor associative.
+        self.assertEqual(str(canonical(expression("((y - x) - z > 0)"))), "(((y - x) - z) > 0)")
+        self.assertTrue(is_canonical(expression("((x + y) > 0)")))
+        self.assertFalse(is_canonical(expression("((y + x) > 0)")))
+
+    def test_rules(self):
+        ast = parse(str(EXAMPLES / "obfuscated_1.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0])
+        rules = CanonicalRules(grammar)
+        plus, minus = grammar.productions["G"][:2]
+        x3, x4 = (VarExpr(v) for v in grammar.variables if v.type == PaddleType.INT)
+        self.assertTrue(rules.accepts(plus, [x3, x4]))
+        self.assertFalse(rules.accepts(plus, [x4, x3]))
+        self.assertFalse(rules.accepts(plus, [x3, plus.build([x3, x4])]))
+        self.assertTrue(rules.accepts(minus, [x4, x3]))
+        # The right operand of + is never built by +.
+        self.assertIs(rules.excludes(plus, 1), plus)
+        self.assertIsNone(rules.excludes(plus, 0))
+        self.assertIsNone(rules.excludes(minus, 1))
+
+    def test_same_expressions_up_to_canonical_form(self):
+        # Every expression has a canonical expression with the same
+        # canonical form among the ones that are kept.
+        for name, size in (("sum3.paddle", 5), ("xor.paddle", 5), ("max2.paddle", 7),
+                           ("obfuscated_1.paddle", 5)):
+            everything = enumerate_all(name, False, size)
+            kept = enumerate_all(name, True, size)
+            self.assertLess(len(kept), len(everything))
+            kept_keys = {expression_key(expr) for expr in kept}
+            self.assertTrue(kept_keys <= {expression_key(expr) for expr in everything})
+            self.assertEqual({expression_key(canonical(expr)) for expr in kept},
+                             {expression_key(canonical(expr)) for expr in everything})
+
+    def test_banks_discard_before_evaluation(self):
+        ast = parse(str(EXAMPLES / "sum3.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0])
+        environments = [hole_environment(ast, {"x": 1, "y": 2, "z": 3})]
+        plain = BottomUpEnumerator(grammar, environments, max_size=6,
+                                   pool=BankPool(environments, canonical=False))
+        pruned = BottomUpEnumerator(grammar, environments, max_size=6)
+        self.assertEqual({values for _, values in plain.enumerate()},
+                         {values for _, values in pruned.enumerate()})
+        self.assertGreater(pruned.noncanonical, 0)
+        self.assertLess(pruned.built, plain.built)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+from lang.ast import *
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.checkpoint import decode_completion, encode_completion, program_variables
+from synthesis.grammar import HoleGrammar
+from synthesis.holes import diagonal
+from synthesis.streaming import SeenSet
+from synthesis.synth import CHECKPOINT_VARIABLE, Synthesizer, seed_examples
+import os
+import pickle
+import tempfile
+import unittest
+import warnings
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def candidates(synt, method, count):
+    # The next completions of the stream of a method, without verifying them.
+    if method == 1:
+        stream, restart = synt.best_first, False
+    else:
+        stream, restart = (lambda: synt.bottom_up(method)), True
+    return [{hole: str(expr) for hole, expr in synt.next_candidate(method, stream, restart).items()}
+            for _ in range(count)]
+
+
+def solved_keys(synt):
+    return {method: {index: encode_completion(completion) for index, completion in solved.items()}
+            for method, solved in synt.solved.items()}
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_completion(self):
+        ast = parse(str(EXAMPLES / "independent.paddle"))
+        completion = Synthesizer(ast).synth_method_1()
+        decoded = decode_completion(encode_completion(completion), program_variables(ast))
+        self.assertEqual({hole: expression_key(expr) for hole, expr in decoded.items()},
+                         {hole: expression_key(expr) for hole, expr in completion.items()})
+
+    def test_diagonal_start(self):
+        levels = [lambda size: list(range(size)), lambda size: list("ab" * size)]
+        combinations = list(diagonal(levels, [4, 3]))
+        for start in (0, 1, 7, 20, len(combinations)):
+            self.assertEqual(list(diagonal(levels, [4, 3], start=start)), combinations[start:])
+        # With ties between interchangeable enumerations.
+        same = [lambda size: list(range(size))] * 2
+        combinations = list(diagonal(same, [4, 4], [[0, 1]]))
+        self.assertEqual(list(diagonal(same, [4, 4], [[0, 1]], start=5)), combinations[5:])
+
+    def test_enumerator_state(self):
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        grammars = {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+        for settings in ({}, {"frontier_budget": 20, "false_positive_rate": 1e-6}):
+            enumerator = BestFirstEnumerator(grammars, max_size=6, **settings)
+            stream = enumerator.enumerate()
+            [next(stream) for _ in range(30)]
+            state = pickle.loads(pickle.dumps(enumerator.state()))
+            resumed = BestFirstEnumerator(grammars, max_size=6, **settings)
+            resumed.load(state)
+            self.assertEqual([str(c["hmax"]) for c in resumed.enumerate()],
+                             [str(c["hmax"]) for c in stream])
+            self.assertEqual(resumed.pushed, enumerator.pushed)
+
+    def test_seen_set(self):
+        seen = SeenSet(false_positive_rate=0.01, capacity=50)
+        for i in range(120):
+            seen.add(("key", i))
+        copy = pickle.loads(pickle.dumps(seen))
+        self.assertEqual((copy.count, copy.spilled), (120, 2))
+        self.assertTrue(all(("key", i) in copy for i in range(120)))
+        seen.close()
+        copy.close()
+
+    def test_resume_streams(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synth.ckpt")
+            for name, method in (("max3.paddle", 1), ("not_really_max.paddle", 2), ("even.paddle", 3),
+                                 ("independent.paddle", 1)):
+                ast = parse(str(EXAMPLES / name))
+                synt = Synthesizer(ast)
+                synt = synt.parts[0][1] if synt.parts else synt
+                candidates(synt, method, 5)
+                synt.checkpoint(path)
+                restored = Synthesizer(synt.ast)
+                restored.restore(path)
+                # The restored stream continues where the stream was.
+                self.assertEqual(candidates(restored, method, 5), candidates(synt, method, 5), name)
+
+    def test_resume_synthesis(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synth.ckpt")
+            ast = parse(str(EXAMPLES / "independent.paddle"))
+            synt = Synthesizer(ast)
+            synt.checkpoint_path = path
+            synt.checkpoint_interval = 0
+            synt.synth_method_1()
+            synt.synth_method_1()
+            # The checkpoint was written at the start of the second call.
+            restored = Synthesizer(ast)
+            restored.restore(path)
+            self.assertEqual(len(restored.examples), len(synt.examples))
+            self.assertEqual(len(restored.solved[1]), 2)
+            self.assertEqual(solved_keys(restored), solved_keys(synt))
+            with self.assertRaises(ValueError):
+                Synthesizer(parse(str(EXAMPLES / "max2.paddle"))).restore(path)
+
+    def test_checkpoint_variable(self):
+        # main.py runs checkpoint to the file named by the variable, and
+        # resume from it.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synth.ckpt")
+            os.environ[CHECKPOINT_VARIABLE] = path
+            try:
+                ast = parse(str(EXAMPLES / "independent.paddle"))
+                synt = Synthesizer(ast)
+                self.assertEqual(synt.checkpoint_path, path)
+                synt.checkpoint_interval = 0
+                synt.synth_method_1()
+                synt.synth_method_1()
+                # The checkpoint was written at the start of the second call.
+                restored = Synthesizer(ast)
+                self.assertEqual(solved_keys(restored), solved_keys(synt))
+                # A checkpoint of another program is replaced.
+                with self.assertWarns(UserWarning):
+                    other = Synthesizer(parse(str(EXAMPLES / "max2.paddle")))
+                self.assertEqual(other.examples, seed_examples(other.ast))
+                other.checkpoint_interval = 0
+                other.synth_method_1()
+                with warnings.catch_warnings():
+                    warnings.simplefilter("error")
+                    Synthesizer(other.ast)
+            finally:
+                del os.environ[CHECKPOINT_VARIABLE]
+
+
+if __name__ == '__main__':
+    unittest.main()
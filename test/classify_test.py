@@ -0,0 +1,69 @@
+from lang.symb_eval import Evaluator
+from lang.ast import *
+from verification.classify import FormulaClass, classify, constant_value
+from verification.verifier import Verifier, is_valid
+import unittest
+from lang.paddle import parse
+import os
+from pathlib import Path
+
+
+def constraint_of(string: str) -> Expression:
+    return Evaluator({}).evaluate(parse(string=string))
+
+
+class TestClassify(unittest.TestCase):
+    def test_constant_value(self):
+        self.assertEqual(constant_value(parse(string="assert (2 * (1 + - 3) > 0);")
+                                        .constraint.left_operand), -4)
+        x = Variable("x", PaddleType.INT)
+        self.assertIsNone(constant_value(
+            BinaryExpr(BinaryOperator.PLUS, VarExpr(x), IntConst(1))))
+
+    def test_classes(self):
+        header = "input x : int; input y : int;"
+        # Without the parentheses, abs applies to the whole comparison.
+        linear = constraint_of(header + "assert ((abs x) + y > x - 2);")
+        factor = constraint_of(header + "assert (x * 3 + y / 2 >= y % (- 4));")
+        nonlinear = constraint_of(header + "assert (x * y >= 0 || x / y > 0);")
+        self.assertEqual(classify(linear), FormulaClass.LINEAR)
+        self.assertEqual(classify(factor), FormulaClass.CONSTANT_FACTOR)
+        self.assertEqual(classify(nonlinear), FormulaClass.NONLINEAR)
+        # Division by the constant 0 cannot be linearized.
+        self.assertEqual(classify(constraint_of(header + "assert (x / 0 = 0);")),
+                         FormulaClass.NONLINEAR)
+
+    def test_linearized_division(self):
+        header = "input x : int;"
+        # Division and modulo follow the SMT-LIB (euclidean) semantics.
+        self.assertTrue(is_valid(constraint_of(
+            header + "assert (x = 3 * (x / 3) + x % 3);")))
+        self.assertTrue(is_valid(constraint_of(
+            header + "assert (x % (- 3) >= 0 && x % (- 3) < 3);")))
+        self.assertFalse(is_valid(constraint_of(
+            header + "assert (x / 2 * 2 = x);")))
+
+    def test_routing_agrees_with_default_solver(self):
+        examples_directory = '%s/examples/verification' % Path(
+            __file__).parent.parent.absolute()
+        routed = Verifier(route=True)
+        plain = Verifier(route=False)
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                expr = Evaluator({}).evaluate(
+                    parse(os.path.join(examples_directory, filename)))
+                self.assertEqual(routed.is_valid(expr), plain.is_valid(expr),
+                                 msg=f"Routing changed the result on {filename}")
+        queries = sum(len(x) for x in routed.stats.latencies.values())
+        self.assertEqual(queries, len(
+            [f for f in os.listdir(examples_directory) if f.endswith(".paddle")]))
+
+    def test_counterexample(self):
+        verifier = Verifier()
+        cex = verifier.counterexample(constraint_of(
+            "input x : int; input b : bool; assert (b || x > 5);"))
+        self.assertIsNotNone(cex)
+        self.assertFalse(cex["b"])
+        self.assertLessEqual(cex["x"], 5)
+        self.assertIsNone(verifier.counterexample(constraint_of(
+            "input x : int; assert (x * x >= 0);")))
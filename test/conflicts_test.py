@@ -0,0 +1,84 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.conflicts import ConflictLearner, derivation_nodes
+from synthesis.grammar import HoleGrammar
+from synthesis.synth import SynthesisException, Synthesizer, seed_examples
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+NEGATIVE = """
+input x : int;
+input y : int;
+hole h : int [G : int -> abs G | G - G | G % 3 | Var];
+assert (h < 0);
+"""
+
+
+def production(grammar, text):
+    return next(p for p in grammar.productions[grammar.start] if str(p) == text)
+
+
+class TestConflicts(unittest.TestCase):
+    def test_derivation_nodes(self):
+        ast = parse(string=NEGATIVE)
+        grammar = HoleGrammar(ast, ast.holes[0])
+        minus, x = production(grammar, "G -> (G - G)"), production(grammar, "G -> x")
+        # `x - G`: the second operand is not expanded yet.
+        nodes = derivation_nodes(((0, minus), (0, x)))
+        self.assertEqual(nodes, {(0, ()): minus, (0, (0,)): x})
+
+    def test_lemma(self):
+        ast = parse(string=NEGATIVE)
+        grammars = {"h": HoleGrammar(ast, ast.holes[0])}
+        grammar = grammars["h"]
+        examples = [{"x": 3, "y": 5}]
+        learner = ConflictLearner(ast, grammars, examples)
+        absolute, minus = production(grammar, "G -> (abs G)"), production(grammar, "G -> (G - G)")
+        x, y = production(grammar, "G -> x"), production(grammar, "G -> y")
+        # `abs (x - y)` is never negative, whatever its operand.
+        lemma = learner.learn(((0, absolute), (0, minus), (0, x), (0, y)), 0)
+        self.assertEqual(lemma, frozenset({((0, ()), absolute)}))
+        self.assertTrue(learner.refutes(((0, absolute),), ((0, "G", None),)))
+        self.assertFalse(learner.refutes(((0, minus),), ((0, "G", None), (0, "G", None))))
+        # `x - y` is negative on the example: there is no conflict.
+        self.assertIsNone(learner.learn(((0, minus), (0, x), (0, y)), 0))
+        # The lemma holds for every completion of the enumeration.
+        for completion in BestFirstEnumerator(grammars, max_size=5, pruner=learner).enumerate():
+            self.assertFalse(str(completion["h"]).startswith("abs"), str(completion["h"]))
+        self.assertGreater(learner.blocked, 0)
+
+    def test_no_solution(self):
+        ast = parse(str(EXAMPLES / "no_sol_1.paddle"))
+        grammars = {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+        learner = ConflictLearner(ast, grammars, seed_examples(ast))
+        enumerator = BestFirstEnumerator(grammars, pruner=learner)
+        next(enumerator.enumerate())
+        # `0` fails on x = -6, and so does every constant the grammar has:
+        # even the start derivation is refuted.
+        self.assertEqual(learner.learn(enumerator.derivation, 1), frozenset())
+        self.assertTrue(learner.refutes((), ((0, "G", None),)))
+        synt = Synthesizer(ast)
+        synt.conflict_pruning = True
+        with self.assertRaises(SynthesisException):
+            for _ in range(10):
+                synt.batch(1, 1)
+
+    def test_synthesize_with_conflicts(self):
+        for name in ("max2.paddle", "abs_neg.paddle", "xor.paddle", "independent.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            synt = Synthesizer(ast)
+            synt.conflict_pruning = True
+            for _ in range(50):
+                completion = synt.synth_method_1()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.constants import ConstantSolver, fill_unknowns, has_unknowns, number_unknowns
+from synthesis.grammar import HoleGrammar, is_unknown
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+# The constant 1000 does not appear in the program, so the pool of
+# constants of `Integer` does not have it.
+LARGE_CONSTANT = """
+input x : int;
+input y : int;
+hole h : int [ G : int -> G + G | G * G | Var | Integer ];
+define r : int = h;
+assert (r - y = 3 * x + 500 + 500);
+"""
+
+
+class TestConstants(unittest.TestCase):
+    def test_symbolic_grammar(self):
+        ast = parse(str(EXAMPLES / "obfuscated_1.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0], symbolic=True)
+        leaves = [p.template for p in grammar.productions["G"] if not p.slots]
+        self.assertEqual(sum(1 for leaf in leaves if is_unknown(leaf)), 1)
+        self.assertFalse(any(isinstance(leaf, IntConst) for leaf in leaves))
+
+    def test_number_unknowns(self):
+        ast = parse(string=LARGE_CONSTANT)
+        grammar = HoleGrammar(ast, ast.holes[0], symbolic=True)
+        plus = next(p for p in grammar.productions["G"] if p.slots)
+        unknown = next(p for p in grammar.productions["G"] if is_unknown(p.template))
+        skeleton = {"h": plus.build([unknown.template, unknown.template])}
+        self.assertTrue(has_unknowns(skeleton))
+        numbered, names = number_unknowns(skeleton)
+        self.assertEqual(names, ["?c0", "?c1"])
+        self.assertEqual(str(numbered["h"]), "(?c0 + ?c1)")
+        filled = fill_unknowns(numbered, {"?c0": 4, "?c1": -2})
+        self.assertFalse(has_unknowns(filled))
+        self.assertEqual(str(filled["h"]), "(4 + -2)")
+
+    def test_solve_constant(self):
+        ast = parse(string=LARGE_CONSTANT)
+        x, y = sorted(ast.inputs, key=lambda v: v.name)
+        grammar = HoleGrammar(ast, ast.holes[0], symbolic=True)
+        unknown = next(p for p in grammar.productions["G"] if is_unknown(p.template)).template
+        # y + (c + x * c'): the solver finds c = 1000 and c' = 3.
+        skeleton = {"h": BinaryExpr(BinaryOperator.PLUS, VarExpr(y),
+                                    BinaryExpr(BinaryOperator.PLUS, unknown,
+                                               BinaryExpr(BinaryOperator.TIMES, VarExpr(x), unknown)))}
+        examples = [{"x": 0, "y": 0}]
+        completion = ConstantSolver(ast).solve(skeleton, examples)
+        self.assertIsNotNone(completion)
+        self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)))
+        self.assertEqual(str(completion["h"]), "(y + (1000 + (x * 3)))")
+        # No constants make x + c valid.
+        skeleton = {"h": BinaryExpr(BinaryOperator.PLUS, VarExpr(x), unknown)}
+        self.assertIsNone(ConstantSolver(ast).solve(skeleton, [{"x": 0, "y": 0}]))
+
+    def test_synthesize_large_constant(self):
+        ast = parse(string=LARGE_CONSTANT)
+        synt = Synthesizer(ast)
+        synt.symbolic_constants = True
+        for _ in range(5):
+            completion = synt.synth_method_1()
+            if is_valid(Evaluator(completion).evaluate(ast)):
+                break
+        self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import random
+from lang.ast import *
+from lang.interp import hole_environment
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.counting import GrammarCounts
+from synthesis.grammar import HoleGrammar
+from synthesis.normalize import normalize
+from synthesis.synth import seed_examples
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def counts_of(name, hole=0):
+    ast = parse(str(EXAMPLES / name))
+    return ast, GrammarCounts(normalize(HoleGrammar(ast, ast.holes[hole])))
+
+
+class TestCounting(unittest.TestCase):
+    def test_count(self):
+        # G -> G + G | Var | 0 | 1 on three variables.
+        _, counts = counts_of("sum3.paddle")
+        self.assertEqual([counts.count(size) for size in range(1, 8)], [5, 0, 25, 0, 250, 0, 3125])
+        self.assertEqual(counts.total(7), 5 + 25 + 250 + 3125)
+        # The trees of 30 additions (Catalan(30) shapes) over 31 leaves: the
+        # counts are unbounded integers.
+        self.assertEqual(counts.count(61), 3814986502092304 * 5 ** 31)
+        # The unpruned bank has one expression per derivation.
+        for name in ("example.paddle", "division.paddle"):
+            ast, counts = counts_of(name)
+            environments = [hole_environment(ast, example) for example in seed_examples(ast)]
+            enumerator = BottomUpEnumerator(counts.grammar, environments, prune=False)
+            for size in range(1, 6):
+                self.assertEqual(len(enumerator.level(size)), counts.count(size), (name, size))
+
+    def test_unrank_rank(self):
+        for name in ("max3.paddle", "division.paddle", "odd.paddle"):
+            _, counts = counts_of(name)
+            for size in range(1, 6):
+                keys = set()
+                for n, expr in enumerate(counts.expressions(size)):
+                    self.assertEqual(counts.rank(expr), (size, n))
+                    keys.add(expression_key(expr))
+                self.assertEqual(len(keys), counts.count(size))
+            # Random access far beyond what can be enumerated.
+            n = counts.count(41) // 3
+            self.assertEqual(counts.rank(counts.unrank(n, 41)), (41, n))
+            with self.assertRaises(IndexError):
+                counts.unrank(counts.count(5), 5)
+        _, counts = counts_of("sum3.paddle")
+        self.assertIsNone(counts.rank(IntConst(2)))
+
+    def test_shards_and_samples(self):
+        _, counts = counts_of("max3.paddle")
+        everything = [str(e) for e in counts.expressions(5)]
+        shards = [str(e) for start in range(0, len(everything), 50)
+                  for e in counts.expressions(5, start, start + 50)]
+        self.assertEqual(shards, everything)
+        rand = random.Random(410)
+        samples = [counts.sample(5, rand) for _ in range(20)]
+        self.assertTrue(all(counts.rank(e)[0] == 5 for e in samples))
+        self.assertIsNone(counts.sample(2, rand))
+
+
+if __name__ == '__main__':
+    unittest.main()
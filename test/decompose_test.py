@@ -0,0 +1,96 @@
+from lang.symb_eval import Evaluator
+from lang.ast import *
+from verification.decompose import subqueries, query_cost
+from verification.verifier import Verifier
+from z3 import Z3Exception, unknown
+import unittest
+from lang.paddle import parse
+import os
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+class TestDecompose(unittest.TestCase):
+    def test_split_conjunctions(self):
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        x, y, z = (VarExpr(v) for v in ast.inputs)
+        formula = Evaluator({"hmax": x}).evaluate(ast)
+        parts = subqueries(formula)
+        # (c >= x), (c >= y), (c >= z) and the disjunction.
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(str(parts[0]), "(x >= x)")
+        self.assertEqual(parts[3].operator, BinaryOperator.OR)
+
+    def test_split_ite_cases(self):
+        ast = parse(str(EXAMPLES / "obfuscated_1.paddle"))
+        formula = Evaluator({"h": IntConst(1)}).evaluate(ast)
+        parts = subqueries(formula)
+        self.assertEqual(len(parts), 4)
+        for part in parts:
+            # Each case is guarded by its path: !(path) || case
+            self.assertEqual(part.operator, BinaryOperator.OR)
+            self.assertEqual(part.left_operand.operator, UnaryOperator.NOT)
+        self.assertEqual(subqueries(BoolConst(True)), [])
+
+    def test_same_verdicts(self):
+        whole = Verifier()
+        split = Verifier(decompose=True)
+        for filename in os.listdir(EXAMPLES / "verification"):
+            if filename.endswith(".paddle"):
+                formula = Evaluator({}).evaluate(parse(str(EXAMPLES / "verification" / filename)))
+                self.assertEqual(whole.is_valid(formula), split.is_valid(formula),
+                                 msg=f"Decomposition changed the result on {filename}")
+                cex = split.counterexample(formula)
+                if cex is not None:
+                    model = {name: IntConst(v) if isinstance(v, int) and not isinstance(v, bool)
+                             else BoolConst(v) for name, v in cex.items()}
+                    result = Verifier().is_valid(Evaluator({}).evaluate_expr(model, formula))
+                    self.assertFalse(result, msg=f"Wrong counterexample for {filename}")
+
+    def test_cache_across_candidates(self):
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        x, y, z = (VarExpr(v) for v in ast.inputs)
+        verifier = Verifier(decompose=True)
+        good = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        self.assertFalse(verifier.is_valid(Evaluator({"hmax": good}).evaluate(ast)))
+        # Checking stops at the first failing subquery, (x >= y): the
+        # other conjuncts are not checked.
+        queries = sum(len(t) for t in verifier.stats.latencies.values())
+        self.assertFalse(verifier.is_valid(Evaluator({"hmax": x}).evaluate(ast)))
+        self.assertEqual(sum(len(t) for t in verifier.stats.latencies.values()), queries + 2)
+        hits = verifier.cache.hits
+        self.assertFalse(verifier.is_valid(Evaluator({"hmax": x}).evaluate(ast)))
+        self.assertGreater(verifier.cache.hits, hits)
+        self.assertLess(query_cost(subqueries(Evaluator({"hmax": x}).evaluate(ast))[0]),
+                        query_cost(Evaluator({"hmax": x}).evaluate(ast)))
+
+    def test_unknown_not_cached(self):
+        # An unknown result (e.g. a timeout) is not cached: the subquery is
+        # checked again next time.
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        formula = Evaluator({"hmax": VarExpr(ast.inputs[0])}).evaluate(ast)
+        verifier = Verifier(decompose=True)
+        check_query = verifier._check_query
+        verifier._check_query = lambda query: (unknown, None)
+        self.assertFalse(verifier.is_valid(formula))
+        self.assertEqual(len(verifier.cache.results), 0)
+        verifier._check_query = check_query
+        self.assertFalse(verifier.is_valid(formula))
+        self.assertEqual(verifier.cache.hits, 0)
+        self.assertGreater(len(verifier.cache.results), 0)
+
+    def test_untranslatable_query(self):
+        # The formula of simplify3 is ill-typed: the shared solver of the
+        # linear queries stays usable after it.
+        ast = parse(str(EXAMPLES / "simplify3.paddle"))
+        verifier = Verifier()
+        with self.assertRaises(Z3Exception):
+            verifier.is_valid(Evaluator({"h": IntConst(1)}).evaluate(ast))
+        self.assertTrue(all(solver.num_scopes() == 0 for solver in verifier._solvers.values()))
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        x, y, z = (VarExpr(v) for v in ast.inputs)
+        self.assertFalse(verifier.is_valid(Evaluator({"hmax": x}).evaluate(ast)))
+        greater = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        best = Ite(BinaryExpr(BinaryOperator.GREATER, greater, z), greater, z)
+        self.assertTrue(verifier.is_valid(Evaluator({"hmax": best}).evaluate(ast)))
@@ -0,0 +1,62 @@
+from lang.ast import *
+from lang.interp import interpret, run_program
+from lang.symb_eval import Evaluator
+from synthesis.divide import DivideAndConquer, find_ite, learn_tree, unit_derives
+from synthesis.grammar import HoleGrammar
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def grammar_of(name):
+    ast = parse(str(EXAMPLES / name))
+    return ast, HoleGrammar(ast, ast.holes[0])
+
+
+class TestDivide(unittest.TestCase):
+    def test_find_ite(self):
+        _, grammar = grammar_of("max3.paddle")
+        production, condition, term = find_ite(grammar)
+        self.assertEqual((production.symbol, condition, term), ("G", "B", "G"))
+        # G -> ITE and ITE -> B ? G : G: the trees are expressions of G.
+        _, grammar = grammar_of("example.paddle")
+        self.assertTrue(unit_derives(grammar, "G", "ITE"))
+        self.assertEqual(find_ite(grammar)[0].symbol, "ITE")
+        # G -> B ? H : H, but H does not derive G: no nesting.
+        _, grammar = grammar_of("odd.paddle")
+        self.assertIsNone(find_ite(grammar))
+        _, grammar = grammar_of("sum2.paddle")
+        self.assertIsNone(find_ite(grammar))
+
+    def test_learn_tree(self):
+        ast, grammar = grammar_of("max2.paddle")
+        ite = find_ite(grammar)[0]
+        x, y = (VarExpr(v) for v in ast.inputs)
+        greater = BinaryExpr(BinaryOperator.GREATER, x, y)
+        # x covers examples 0 and 1, y covers 2, and x > y is only true on 0.
+        terms = [(x, 0b011), (y, 0b100)]
+        self.assertIsNone(learn_tree(0b111, terms, [(greater, 0b001, 0b110)], ite))
+        tree = learn_tree(0b111, terms, [(greater, 0b011, 0b100)], ite)
+        self.assertEqual(str(tree), "(x > y) ? x : y")
+        self.assertIs(learn_tree(0b011, terms, [], ite), x)
+
+    def test_solve(self):
+        ast, grammar = grammar_of("max3.paddle")
+        engine = DivideAndConquer(ast, grammar)
+        examples = [{"x": 1, "y": 2, "z": 3}, {"x": 5, "y": -1, "z": 0},
+                    {"x": 0, "y": 7, "z": 2}, {"x": 0, "y": 0, "z": 0}]
+        tree = engine.solve(examples)
+        self.assertIsInstance(tree, Ite)
+        for example in examples:
+            self.assertTrue(run_program(ast, example, {"hmax": interpret(tree, example)}))
+        # max3 needs a tree of size 16: method 3 solves it quickly.
+        synt = Synthesizer(ast)
+        for _ in range(50):
+            completion = synt.synth_method_3()
+            if is_valid(Evaluator(completion).evaluate(ast)):
+                break
+        self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)))
@@ -0,0 +1,138 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.holes import conjuncts, diagonal, independent_groups, interchangeable, is_representative
+from synthesis.grammar import HoleGrammar
+from synthesis.synth import SynthesisException, Synthesizer
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+# h2 can use b, which is assigned from h1 before the first use of h2.
+USES_OTHER = """
+input x : int;
+hole h1 : int [G : int -> G + G | Var];
+hole h2 : int [G : int -> G + G | Var];
+define b : int = h1;
+define c : int = h2;
+assert (b = x && c = x + x);
+"""
+
+# h1 and h2 can be swapped.
+SYMMETRIC = """
+input x : int;
+input y : int;
+hole h1 : int [G : int -> G + G | G - G | G * G | Var];
+hole h2 : int [G : int -> G + G | G - G | G * G | Var];
+assert (h1 * h2 = x * x - y * y && h2 + h1 = x + x);
+"""
+
+
+def two_holes(constraint, grammar="G + G | G - G | G * G | Var"):
+    return parse(string=f"input x : int; input y : int; hole h1 : int [G : int -> {grammar}];"
+                        f"hole h2 : int [G : int -> G + G | G - G | G * G | Var]; assert ({constraint});")
+
+
+def grammars_of(ast):
+    return ast, {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+
+
+class TestHoles(unittest.TestCase):
+    def test_diagonal(self):
+        levels = [lambda size: ["a" * size], lambda size: ["b" * size, "B" * size]]
+        combinations = list(diagonal(levels, [3, 2]))
+        totals = [sum(size for size, _ in combination) for combination in combinations]
+        self.assertEqual(totals, sorted(totals))
+        # Every pair of sizes up to the maximum sizes, with both items of b.
+        self.assertEqual(len(combinations), 3 * 2 * 2)
+        self.assertEqual(combinations[:3], [((1, "a"), (1, "b")), ((1, "a"), (1, "B")),
+                                            ((1, "a"), (2, "bb"))])
+
+    def test_diagonal_classes(self):
+        levels = [lambda size: ["a" * size, "A" * size], lambda size: ["a" * size, "A" * size]]
+        combinations = list(diagonal(levels, [2, 2], [[0, 1]]))
+        # One of each pair of permutations, and the pairs of the same item.
+        self.assertEqual([tuple(item for _, item in c) for c in combinations],
+                         [("a", "a"), ("a", "A"), ("A", "A"), ("a", "aa"), ("a", "AA"),
+                          ("A", "aa"), ("A", "AA"), ("aa", "aa"), ("aa", "AA"), ("AA", "AA")])
+
+    def test_groups(self):
+        ast = parse(str(EXAMPLES / "independent.paddle"))
+        self.assertEqual(len(conjuncts(ast.constraint)), 2)
+        groups = independent_groups(ast)
+        self.assertEqual([group.holes for group in groups], [["h1"], ["h2"]])
+        self.assertEqual([hole.var.name for hole in groups[1].prog.holes], ["h2"])
+        self.assertEqual(str(groups[1].prog.constraint), "(h2 = ((y - x) - x))")
+        # The holes of division are in the same conjuncts.
+        ast = parse(str(EXAMPLES / "division.paddle"))
+        self.assertEqual([group.holes for group in independent_groups(ast)], [["h1", "h2"]])
+        ast = parse(string=USES_OTHER)
+        self.assertEqual(len(independent_groups(ast)), 1)
+        # A constraint without holes goes to the first group.
+        ast = parse(string="input x : int; hole h1 : int [G : int -> Var];"
+                           "hole h2 : int [G : int -> Var]; assert (x > 0 && h2 = x);")
+        groups = independent_groups(ast)
+        self.assertEqual(str(groups[0].prog.constraint), "(x > 0)")
+        self.assertEqual(str(groups[1].prog.constraint), "(h2 = x)")
+
+    def test_interchangeable(self):
+        ast = parse(string=SYMMETRIC)
+        synt = Synthesizer(ast)
+        self.assertEqual(synt.symmetries, [["h1", "h2"]])
+        # Not symmetric: the constraint, or the grammars, tell the holes apart.
+        self.assertEqual(interchangeable(*grammars_of(two_holes("h1 - h2 = x"))), [])
+        self.assertEqual(interchangeable(*grammars_of(two_holes("h1 + h2 = x", "G + G | Var"))), [])
+        self.assertEqual(interchangeable(*grammars_of(two_holes("h1 + h2 = x && h1 > y"))), [])
+        ast = parse(str(EXAMPLES / "division.paddle"))
+        self.assertEqual(interchangeable(*grammars_of(ast)), [])
+
+    def test_one_permutation(self):
+        ast = parse(string=SYMMETRIC)
+        synt = Synthesizer(ast)
+        completions = [c for _, c in zip(range(200), synt.best_first())]
+        self.assertTrue(all(is_representative(c, synt.symmetries) for c in completions))
+        keys = {(str(c["h1"]), str(c["h2"])) for c in completions}
+        self.assertFalse(any((h2, h1) in keys for h1, h2 in keys if h1 != h2))
+        for method in (1, 2):
+            synt = Synthesizer(ast)
+            for _ in range(50):
+                completion = getattr(synt, f"synth_method_{method}")()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), method)
+
+    def test_synthesize_parts(self):
+        ast = parse(str(EXAMPLES / "independent.paddle"))
+        for method in (1, 2, 3):
+            synt = Synthesizer(ast)
+            self.assertEqual(len(synt.parts), 2)
+            for _ in range(50):
+                completion = getattr(synt, f"synth_method_{method}")()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), method)
+            self.assertEqual(sorted(completion), ["h1", "h2"])
+
+    def test_unsplit(self):
+        # Once every group is solved, the method has no new completion, unless
+        # the solutions of the groups do not make a solution: then it
+        # searches the whole program.
+        ast = parse(str(EXAMPLES / "independent.paddle"))
+        synt = Synthesizer(ast)
+        solution = synt.synth_method_2()
+        self.assertTrue(is_valid(Evaluator(solution).evaluate(ast)))
+        self.assertEqual(len(synt.solved[2]), 2)
+        self.assertEqual(synt.parts[0][1]._last, {})
+        with self.assertRaises(SynthesisException):
+            synt.batch(2, 1)
+        synt.solved[2][0] = {"h1": VarExpr(ast.inputs[0])}
+        completion = synt.synth_method_2()
+        self.assertEqual(synt.unsplit, {2})
+        self.assertEqual(sorted(completion), ["h1", "h2"])
+        self.assertIn(2, synt._last)
+
+
+if __name__ == '__main__':
+    unittest.main()
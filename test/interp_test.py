@@ -0,0 +1,58 @@
+from lang.ast import *
+from lang.interp import interpret, run_program, hole_environment, euclidean_div, euclidean_mod
+from lang.symb_eval import Evaluator
+from verification.verifier import Verifier
+import unittest
+from random import randint
+from lang.paddle import parse
+import os
+from pathlib import Path
+
+
+class TestInterp(unittest.TestCase):
+    def test_euclidean_division(self):
+        for lhs, rhs, quotient, remainder in [(7, 2, 3, 1), (-7, 2, -4, 1),
+                                              (7, -2, -3, 1), (-7, -2, 4, 1)]:
+            self.assertEqual(euclidean_div(lhs, rhs), quotient)
+            self.assertEqual(euclidean_mod(lhs, rhs), remainder)
+
+    def test_undefined_values(self):
+        prog = parse(string="input x : int; input b : bool; assert (b || x / 0 > 1);")
+        self.assertIsNone(interpret(prog.constraint, {"x": 1, "b": False}))
+        # The undefined disjunct does not matter when the other one is true.
+        self.assertTrue(interpret(prog.constraint, {"x": 1, "b": True}))
+        self.assertIsNone(interpret(prog.constraint, {"b": False}))
+
+    def test_agrees_with_verifier(self):
+        # A formula is valid iff no input makes it false, so the interpreter
+        # must never find a false value for a valid example.
+        examples_directory = '%s/examples/verification' % Path(
+            __file__).parent.parent.absolute()
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                prog = parse(os.path.join(examples_directory, filename))
+                formula = Evaluator({}).evaluate(prog)
+                cex = Verifier().counterexample(formula)
+                if cex is None:
+                    for _ in range(10):
+                        inputs = {v.name: randint(-5, 5) if v.type == PaddleType.INT
+                                  else randint(0, 1) == 1 for v in prog.inputs}
+                        self.assertNotEqual(run_program(prog, inputs, {}), False)
+                else:
+                    inputs = {v.name: cex.get(v.name, 0) for v in prog.inputs}
+                    self.assertFalse(run_program(prog, inputs, {}),
+                                     msg=f"{cex} should falsify {filename}")
+
+    def test_holes(self):
+        prog = parse(string="""
+        input x : int;
+        hole h : int [ G : int -> G + G | Var ];
+        define a : int = x + 1;
+        define c : int = h + a;
+        define d : int = c + 1;
+        assert (d > x);""")
+        env = hole_environment(prog, {"x": 2})
+        self.assertEqual(env["a"], 3)
+        self.assertIsNone(env["c"])
+        self.assertTrue(run_program(prog, {"x": 2}, {"h": 0}))
+        self.assertFalse(run_program(prog, {"x": 2}, {"h": -6}))
@@ -0,0 +1,83 @@
+from lang.ast import *
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.grammar import HoleGrammar
+from synthesis.normalize import inline, normalize
+from synthesis.pcfg import derivation
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+REDUNDANT = """
+input x : int;
+input b : bool;
+hole h : int [
+    G : int -> G + G | K | B ? G : G | Var | H;
+    H : int -> G | G - 1 | Var;
+    K : int -> - G;
+    B : bool -> G > G | Var;
+    U : int -> 0;
+    D : int -> D * D
+];
+assert (h > x);
+"""
+
+
+def productions(grammar):
+    return {symbol: [str(p) for p in grammar.productions[symbol]] for symbol in grammar.symbols()}
+
+
+def expressions(grammar, max_size):
+    holes = {grammar.hole: grammar}
+    return [c[grammar.hole] for c in BestFirstEnumerator(holes, max_size=max_size,
+                                                         canonical=False).enumerate()]
+
+
+class TestNormalize(unittest.TestCase):
+    def test_normal_form(self):
+        ast = parse(string=REDUNDANT)
+        grammar = normalize(HoleGrammar(ast, ast.holes[0]))
+        # H and G derive each other, K is inlined, U is unreachable, D is
+        # unproductive, and the second `Var` of G (from H) is a duplicate.
+        self.assertEqual(productions(grammar), {
+            "G": ["G -> (G + G)", "G -> (- G)", "G -> B ? G : G", "G -> x", "G -> (G - 1)"],
+            "B": ["B -> (G > G)", "B -> b"]})
+        self.assertEqual(grammar.types, {"G": PaddleType.INT, "B": PaddleType.BOOL})
+        # The original grammar is unchanged.
+        self.assertEqual(len(HoleGrammar(ast, ast.holes[0]).symbols()), 6)
+
+    def test_examples(self):
+        ast = parse(str(EXAMPLES / "obfuscated_1.paddle"))
+        grammar = normalize(HoleGrammar(ast, ast.holes[0]))
+        self.assertEqual(grammar.symbols(), ["G"])
+        self.assertEqual(len(grammar.productions["G"]), 9)
+        ast = parse(str(EXAMPLES / "example.paddle"))
+        grammar = normalize(HoleGrammar(ast, ast.holes[0]))
+        self.assertIn("G -> B ? G : G", productions(grammar)["G"])
+        self.assertNotIn("ITE", grammar.symbols())
+
+    def test_inline(self):
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        grammar = HoleGrammar(ast, ast.holes[0])
+        ite = grammar.productions["G"][1]
+        greater = grammar.productions["B"][0]
+        inlined = inline(ite, 0, greater)
+        self.assertEqual(inlined.slots, ["G", "G", "G", "G"])
+        self.assertEqual(str(inlined.pattern), "(#0 > #1) ? #2 : #3")
+        x, y, z = (VarExpr(v) for v in grammar.variables)
+        self.assertEqual(str(inlined.build([x, y, z, x])), "(x > y) ? z : x")
+
+    def test_same_language(self):
+        for name in ("obfuscated_1.paddle", "example.paddle", "odd.paddle", "max3.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            original = HoleGrammar(ast, ast.holes[0])
+            normalized = normalize(original)
+            for expr in expressions(original, 5):
+                self.assertIsNotNone(derivation(normalized, expr), str(expr))
+            for expr in expressions(normalized, 5):
+                self.assertIsNotNone(derivation(original, expr), str(expr))
+
+
+if __name__ == '__main__':
+    unittest.main()
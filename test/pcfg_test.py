@@ -0,0 +1,76 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.grammar import HoleGrammar
+from synthesis.pcfg import PCFG, derivation, feature
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import os
+import tempfile
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+class TestPCFG(unittest.TestCase):
+    def setUp(self):
+        ast = parse(str(EXAMPLES / "max2.paddle"))
+        self.grammar = HoleGrammar(ast, ast.holes[0])
+        x, y = (VarExpr(v) for v in ast.inputs)
+        self.solution = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+
+    def test_features(self):
+        features = [feature(self.grammar, p) for p in self.grammar.productions["G"]]
+        self.assertEqual(features, ["int -> (bool ? int : int)", "int -> Var", "int -> Var"])
+        self.assertIn("bool -> (int > int)",
+                      [feature(self.grammar, p) for p in self.grammar.productions["B"]])
+
+    def test_derivation(self):
+        productions = derivation(self.grammar, self.solution)
+        self.assertEqual([str(p) for p in productions],
+                         ["G -> B ? G : G", "B -> (G > G)", "G -> x", "G -> y", "G -> x", "G -> y"])
+        enumerator = BestFirstEnumerator({"hmax": self.grammar}, max_size=6)
+        for completion in enumerator.enumerate():
+            expr = completion["hmax"]
+            chosen = tuple(("hmax", p) for p in derivation(self.grammar, expr))
+            self.assertEqual(str(enumerator.build(chosen)["hmax"]), str(expr))
+        self.assertIsNone(derivation(self.grammar, IntConst(3)))
+
+    def test_training(self):
+        pcfg = PCFG()
+        self.assertTrue(pcfg.add(self.grammar, self.solution))
+        self.assertEqual(pcfg.counts["int -> Var"], 4)
+        cost = pcfg.cost([self.grammar])
+        greater, equals = self.grammar.productions["B"][:2]
+        self.assertLess(cost(greater), cost(equals))
+        probabilities = pcfg.probabilities(self.grammar)
+        self.assertAlmostEqual(sum(probabilities[id(p)] for p in self.grammar.productions["B"]), 1)
+        # The learned weights are saved, and loaded back.
+        path = os.path.join(tempfile.mkdtemp(), "pcfg.json")
+        pcfg.save(path)
+        loaded = PCFG.load(path)
+        self.assertEqual(loaded.counts, pcfg.counts)
+        os.remove(path)
+        # Likely completions come first.
+        enumerator = BestFirstEnumerator({"hmax": self.grammar}, loaded.cost([self.grammar]), max_size=6)
+        ordered = [str(c["hmax"]) for c in enumerator.enumerate()]
+        self.assertLess(ordered.index("(x > y) ? x : y"), ordered.index("(x = y) ? x : y"))
+
+    def test_other_grammars(self):
+        # The groups of holes and the symbolic constants use grammars built
+        # by the synthesizer, which get the costs of the same productions.
+        ast = parse(str(EXAMPLES / "independent.paddle"))
+        pcfg = PCFG()
+        self.assertTrue(pcfg.add(HoleGrammar(ast, ast.holes[0]), parse(
+            string="input x : int; input y : int; assert (x * x + y = 0);").constraint.left_operand))
+        for symbolic in (False, True):
+            synt = Synthesizer(ast)
+            synt.symbolic_constants = symbolic
+            synt.cost = pcfg.cost(synt.grammars.values())
+            for _ in range(50):
+                completion = synt.synth_method_1()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), symbolic)
@@ -0,0 +1,46 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.pipeline import VERIFY_BATCH, Pipeline
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+class TestPipeline(unittest.TestCase):
+    def test_solve(self):
+        for name, method in (("max2.paddle", 2), ("sum4.paddle", 2), ("max3.paddle", 3), ("odd.paddle", 1)):
+            ast = parse(str(EXAMPLES / name))
+            solution = Pipeline(Synthesizer(ast), method).run()
+            self.assertIsNotNone(solution, name)
+            self.assertTrue(is_valid(Evaluator(solution).evaluate(ast)), name)
+
+    def test_limit(self):
+        ast = parse(str(EXAMPLES / "division.paddle"))
+        pipeline = Pipeline(Synthesizer(ast), 2, limit=10)
+        self.assertIsNone(pipeline.run())
+        counters = pipeline.counters
+        self.assertEqual(counters["enumerate"].items, 10)
+        # Every completion went through the pipeline.
+        self.assertEqual(counters["evaluate"].items, 10)
+        self.assertEqual(counters["verify"].items + pipeline.pruned, 10)
+
+    def test_backpressure(self):
+        # With queues of one item, the enumeration cannot run ahead of the
+        # verification by more than the items the stages hold.
+        ast = parse(str(EXAMPLES / "division.paddle"))
+        pipeline = Pipeline(Synthesizer(ast), 2, batch_size=1, queue_size=1, evaluate_workers=1,
+                            verify_workers=1)
+        self.assertIsNotNone(pipeline.run())
+        counters = pipeline.counters
+        self.assertGreater(counters["verify"].items, 100)
+        ahead = counters["enumerate"].items - counters["verify"].items - pipeline.pruned
+        self.assertLessEqual(ahead, 2 + 1 + VERIFY_BATCH + 1)
+        self.assertGreater(counters["enumerate"].stalled, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from z3 import *
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.grammar import HoleGrammar
+from synthesis.normalize import normalize
+from synthesis.smt import SmtEngine, Unrolling
+from synthesis.synth import FRONTIER_SIZE, SynthesisException, Synthesizer, seed_examples
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def engine(ast, **kwargs):
+    grammars = {hole.var.name: normalize(HoleGrammar(ast, hole, symbolic=True))
+                for hole in ast.holes}
+    return SmtEngine(ast, grammars, **kwargs)
+
+
+class TestSmt(unittest.TestCase):
+    def test_unrolling(self):
+        ast = parse(str(EXAMPLES / "max2.paddle"))
+        grammars = {"hmax": HoleGrammar(ast, ast.holes[0])}
+        # At depth 1, only the variables fit.
+        root = Unrolling(grammars, 1).roots["hmax"]
+        self.assertEqual([str(p) for p in root.choices], ["G -> x", "G -> y"])
+        self.assertEqual(root.children, {})
+        # At depth 3, `B ? G : G` has its condition, and both branches.
+        unrolling = Unrolling(grammars, 3)
+        root = unrolling.roots["hmax"]
+        self.assertEqual(sorted(root.children), [(0, "B"), (1, "G"), (2, "G")])
+        solver = Solver()
+        solver.add(unrolling.domains())
+        solver.add(root.selector == 0)
+        self.assertEqual(solver.check(), sat)
+        model = solver.model()
+        completion, used = unrolling.decode(model)
+        self.assertIsInstance(completion["hmax"], Ite)
+        # One selector per production of the derivation.
+        self.assertGreaterEqual(len(used), 4)
+        self.assertTrue(all(is_true(model.eval(equality)) for equality in used))
+
+    def test_synthesize(self):
+        for name in ("max2.paddle", "abs_tern.paddle", "xor.paddle", "sum3.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            completion = engine(ast).synthesize(seed_examples(ast))
+            self.assertIsNotNone(completion, name)
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), name)
+
+    def test_deep_solution(self):
+        # x * 16 is a tree of 15 additions: too large to enumerate.
+        ast = parse(str(EXAMPLES / "smt" / "mult_to_add_deep.paddle"))
+        smt = engine(ast)
+        completion = smt.synthesize(seed_examples(ast))
+        self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)))
+        self.assertEqual(smt.depth, 5)
+        with self.assertRaises(SynthesisException):
+            Synthesizer(ast).batch(3, FRONTIER_SIZE)
+
+    def test_constants_and_no_solution(self):
+        ast = parse(string="input x : int; hole h : int [G : int -> G + G | Var | Integer];"
+                           "assert (h = x + 1000);")
+        completion = engine(ast).synthesize(seed_examples(ast))
+        self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)))
+        ast = parse(str(EXAMPLES / "no_sol_1.paddle"))
+        examples = seed_examples(ast)
+        smt = engine(ast, max_depth=3)
+        self.assertIsNone(smt.synthesize(examples))
+        self.assertEqual(smt.depth, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
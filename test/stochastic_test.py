@@ -0,0 +1,70 @@
+from lang.ast import *
+from lang.interp import hole_environment, interpret
+from lang.symb_eval import Evaluator
+from synthesis.grammar import HoleGrammar
+from synthesis.normalize import normalize
+from synthesis.pcfg import derivation
+from synthesis.stochastic import Derivation, StochasticSearch
+from synthesis.synth import Synthesizer, seed_examples
+from verification.verifier import is_valid
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def search_of(name, **kwargs):
+    ast = parse(str(EXAMPLES / name))
+    grammars = {hole.var.name: normalize(HoleGrammar(ast, hole)) for hole in ast.holes}
+    return ast, StochasticSearch(ast, grammars, seed_examples(ast), **kwargs)
+
+
+class TestStochastic(unittest.TestCase):
+    def test_values(self):
+        ast, search = search_of("max3.paddle")
+        environments = [hole_environment(ast, example) for example in search.examples]
+        for _ in range(50):
+            node = search.draw("hmax", "G")
+            expr = node.expression()
+            self.assertEqual(search.values(node), tuple(interpret(expr, env) for env in environments))
+        # New examples are seen by the values of the derivations.
+        search.examples.append({"x": 3, "y": 9, "z": -2})
+        self.assertEqual(len(search.values(node)), len(search.examples))
+
+    def test_moves(self):
+        ast, search = search_of("division.paddle")
+        state = {hole: search.draw(hole, search.grammars[hole].start) for hole in search.grammars}
+        for _ in range(300):
+            state, _ = search.propose(state)
+            for hole, node in state.items():
+                # Moves stay in the language of the grammar.
+                grammar = search.grammars[hole]
+                self.assertIsNotNone(derivation(grammar, node.expression()), str(node.expression()))
+                self.assertEqual(node.size, sum(1 for _ in node.nodes()))
+        # Replacing a node rebuilds the path to it only.
+        node = Derivation(state["h1"].production, state["h1"].children)
+        leaf = search.draw("h1", search.grammars["h1"].start)
+        self.assertIs(node.replace((), leaf), leaf)
+
+    def test_reproducible(self):
+        def run(seed):
+            _, search = search_of("abs_neg.paddle", seed=seed, steps=2000)
+            return [str(c["h"]) for _, c in zip(range(5), search.candidates())], search.accepted
+        self.assertEqual(run(1), run(1))
+        self.assertGreater(run(1)[1], 0)
+
+    def test_synthesize(self):
+        for name in ("sum5.paddle", "abs_neg.paddle", "max2.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            synt = Synthesizer(ast)
+            synt.stochastic_seed = 1
+            for _ in range(100):
+                completion = synt.synth_method_4()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
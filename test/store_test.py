@@ -0,0 +1,86 @@
+from lang.ast import *
+from lang.interp import hole_environment
+from lang.symb_eval import Evaluator
+from synthesis.banks import BankPool
+from synthesis.bottom_up import BottomUpEnumerator
+from synthesis.grammar import HoleGrammar
+from synthesis.store import BankStore, signature
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import tempfile
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+def hole_grammar(name):
+    ast = parse(str(EXAMPLES / name))
+    return ast, HoleGrammar(ast, ast.holes[0])
+
+
+def level_values(ast, grammar, store, size):
+    # The values of the expressions of the levels of the start symbol, on
+    # the seed example of the problem.
+    environments = [hole_environment(ast, {var.name: 0 if var.type == PaddleType.INT else False
+                                           for var in ast.inputs})]
+    pool = BankPool(environments, store=store)
+    enumerator = BottomUpEnumerator(grammar, environments, pool=pool)
+    bank = enumerator.bank
+    return [sorted(values for _, values in bank.level(grammar.start, k)) for k in range(1, size + 1)]
+
+
+def solve(synt, method):
+    for _ in range(1000):
+        completion = getattr(synt, f"synth_method_{method}")()
+        if is_valid(Evaluator(completion).evaluate(synt.ast)):
+            return completion
+    return None
+
+
+class TestStore(unittest.TestCase):
+    def test_signature(self):
+        # The problems of a family have the same signature, and so does
+        # sum5 (its five inputs are the four inputs and the definition of
+        # sum4), but not sum2, which has fewer variables.
+        signatures = [signature(hole_grammar(f"{name}.paddle")[1]) for name in ("sum4", "sum4b", "sum4c", "sum5")]
+        self.assertEqual(len(set(signatures)), 1)
+        self.assertNotEqual(signature(hole_grammar("sum2.paddle")[1]), signatures[0])
+        self.assertNotEqual(signature(hole_grammar("max3.paddle")[1]), signatures[0])
+
+    def test_warm_levels(self):
+        # A bank that warm-starts from the terms stored for another problem
+        # has the levels of a bank built from scratch.
+        store = BankStore()
+        ast, grammar = hole_grammar("sum4.paddle")
+        level_values(ast, grammar, store, 7)
+        ast, grammar = hole_grammar("sum4b.paddle")
+        self.assertEqual(level_values(ast, grammar, store, 7), level_values(ast, grammar, None, 7))
+        self.assertEqual(len(store.banks), 1)
+
+    def test_save(self):
+        ast, grammar = hole_grammar("max3.paddle")
+        with tempfile.TemporaryDirectory() as directory:
+            store = BankStore(directory)
+            stored, symbols = store.bank(grammar)
+            terms = stored.level(symbols[grammar.start], 5)
+            store.save()
+            self.assertFalse(stored.changed)
+            # The store of a later run reads the levels back.
+            later, _ = BankStore(directory).bank(grammar)
+            self.assertEqual(later.sizes, stored.sizes)
+            self.assertEqual(later.level(symbols[grammar.start], 5), terms)
+            self.assertEqual([str(e) for e in later.exprs(symbols[grammar.start], 5)],
+                             [str(e) for e in stored.exprs(symbols[grammar.start], 5)])
+
+    def test_shared_store(self):
+        store = BankStore()
+        for name in ("sum4.paddle", "sum4b.paddle", "sum4c.paddle", "max2.paddle", "division.paddle"):
+            synt = Synthesizer(parse(str(EXAMPLES / name)))
+            synt.bank_store = store
+            self.assertIsNotNone(solve(synt, 2), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
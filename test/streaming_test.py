@@ -0,0 +1,105 @@
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from synthesis.best_first import BestFirstEnumerator
+from synthesis.grammar import HoleGrammar
+from synthesis.streaming import SeenSet, SpillingHeap, fingerprint
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+import heapq
+import os
+import random
+import unittest
+from lang.paddle import parse
+from pathlib import Path
+
+EXAMPLES = Path(__file__).parent.parent.absolute() / "examples"
+
+
+class TestStreaming(unittest.TestCase):
+    def test_fingerprint(self):
+        ast = parse(str(EXAMPLES / "max2.paddle"))
+        key = expression_key(ast.constraint)
+        self.assertEqual(fingerprint(key), fingerprint(expression_key(ast.constraint)))
+        self.assertNotEqual(fingerprint(("a", 1)), fingerprint(("a", 2)))
+        self.assertLess(fingerprint(key), 2 ** 64)
+
+    def test_seen_set(self):
+        seen = SeenSet(false_positive_rate=0.01, capacity=100)
+        for i in range(350):
+            seen.add(("key", i))
+        # Three full filters were spilled to disk.
+        self.assertEqual(seen.spilled, 3)
+        self.assertTrue(all(("key", i) in seen for i in range(350)))
+        false_positives = sum(("other", i) in seen for i in range(10000))
+        self.assertLess(false_positives, 300)
+        directory = seen._spill_dir.name
+        seen.close()
+        self.assertFalse(os.path.exists(directory))
+        self.assertNotIn(("key", 0), seen)
+
+    def test_spilling_heap(self):
+        rand = random.Random(410)
+        heap = SpillingHeap(budget=10)
+        reference = []
+        popped, expected = [], []
+        for i in range(500):
+            entry = (rand.randint(0, 50), i)
+            heap.push(entry)
+            heapq.heappush(reference, entry)
+            if i % 3 == 0:
+                popped.append(heap.pop())
+                expected.append(heapq.heappop(reference))
+        self.assertEqual(len(heap), len(reference))
+        while reference:
+            popped.append(heap.pop())
+            expected.append(heapq.heappop(reference))
+        self.assertEqual(popped, expected)
+        self.assertGreater(heap.spilled, 0)
+        self.assertGreater(heap.restored, 0)
+        with self.assertRaises(IndexError):
+            heap.pop()
+        heap.close()
+
+    def test_streaming_enumeration(self):
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        grammars = {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+        plain = BestFirstEnumerator(grammars, max_size=6)
+        streaming = BestFirstEnumerator(grammars, max_size=6, frontier_budget=50,
+                                        false_positive_rate=1e-6)
+        # Spilled derivations come back with the same productions, in order.
+        self.assertEqual([str(c["hmax"]) for c in streaming.enumerate()],
+                         [str(c["hmax"]) for c in plain.enumerate()])
+        self.assertGreater(streaming.spilled, 0)
+        self.assertLessEqual(streaming.peak, plain.peak)
+
+    def test_replaced_enumeration(self):
+        # Closing an enumeration keeps the frontier of a later enumeration.
+        ast = parse(str(EXAMPLES / "max3.paddle"))
+        grammars = {hole.var.name: HoleGrammar(ast, hole) for hole in ast.holes}
+        plain = [str(c["hmax"]) for c in BestFirstEnumerator(grammars, max_size=6).enumerate()]
+        streaming = BestFirstEnumerator(grammars, max_size=6, frontier_budget=50, false_positive_rate=1e-6)
+        old = streaming.enumerate()
+        next(old)
+        new = streaming.enumerate()
+        first = [str(next(new)["hmax"]) for _ in range(20)]
+        self.assertGreater(streaming.spilled, 0)
+        old.close()
+        self.assertEqual(first + [str(c["hmax"]) for c in new], plain)
+
+    def test_synthesize_streaming(self):
+        for name in ("max2.paddle", "abs_neg.paddle", "independent.paddle"):
+            ast = parse(str(EXAMPLES / name))
+            synt = Synthesizer(ast)
+            synt.streaming = True
+            synt.frontier_budget = 100
+            for _ in range(50):
+                completion = synt.synth_method_1()
+                if is_valid(Evaluator(completion).evaluate(ast)):
+                    break
+            self.assertTrue(is_valid(Evaluator(completion).evaluate(ast)), name)
+            self.assertTrue(synt.parts or isinstance(synt.state, SeenSet), name)
+            synt.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 from lang.symb_eval import Evaluator
 from lang.ast import *
-from verification.verifier import is_valid
+from verification.verifier import is_valid, verify_completions
+from synthesis.synth import Synthesizer
 import unittest
 from lang.paddle import parse
 from lark import exceptions
@@ -41,3 +42,26 @@ class TestVerif(unittest.TestCase):
 
             else:
                 continue
+
+    def test_verif_batch(self):
+        filename = '%s/examples/max2.paddle' % Path(
+            __file__).parent.parent.absolute()
+        ast = parse(filename)
+        x = VarExpr(ast.inputs[0])
+        y = VarExpr(ast.inputs[1])
+        candidates = [x, y, BinaryExpr(BinaryOperator.PLUS, x, y),
+                      Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)]
+        completions = [{"hmax": c} for c in candidates]
+        verdicts = verify_completions(ast, completions)
+        self.assertEqual([v.valid for v in verdicts], [False, False, False, True])
+        for completion, verdict in zip(completions[:3], verdicts[:3]):
+            # Each counterexample falsifies the constraint for its candidate.
+            model = {name: IntConst(value) for name, value in verdict.counterexample.items()}
+            constraint = Evaluator(completion).evaluate(ast)
+            self.assertFalse(eval(pythonize(str(Evaluator({}).evaluate_expr(model, constraint)))))
+        # A synthesizer can submit a whole frontier at once.
+        synt = Synthesizer(ast)
+        seeds = len(synt.examples)
+        self.assertIsNone(synt.verify_frontier(completions[:3]))
+        self.assertGreater(len(synt.examples), seeds)
+        self.assertIs(synt.verify_frontier(completions), completions[3])
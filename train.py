@@ -0,0 +1,44 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file is the entry point for learning the weights of the productions
+(see synthesis/pcfg.py) from the solutions of the examples.
+Here are some examples of how you can use it:
+
+python3 ./train.py pcfg.json # learn from the examples in ./examples/
+python3 ./train.py pcfg.json examples/sum2.paddle examples/max2.paddle
+
+"""
+
+import sys
+from bench import EXAMPLES, paddle_files, solve
+from lang.paddle import parse
+from synthesis.pcfg import PCFG
+from synthesis.synth import Synthesizer
+
+# The method used to solve the examples.
+TRAINING_METHOD = 3
+
+
+def train(filenames) -> PCFG:
+    """Solves each file, and counts the productions of the solutions."""
+    pcfg = PCFG()
+    for filename in filenames:
+        synt = Synthesizer(parse(str(filename)), checkpoint_variable=False)
+        solution = solve(synt, TRAINING_METHOD)
+        if solution is None:
+            print(f"{filename}: no solution")
+            continue
+        for hole, expr in solution.items():
+            pcfg.add(synt.grammars[hole], expr)
+        print(f"{filename}: " + ", ".join(f"{hole} = {expr}" for hole, expr in solution.items()))
+    return pcfg
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 1:
+        print("Usage: python3 train.py OUTPUT_FILE [INPUT_FILE ...]")
+        sys.exit(-1)
+    files = sys.argv[2:] or paddle_files(EXAMPLES)
+    train(files).save(sys.argv[1])
@@ -0,0 +1,123 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the bit-vector fast path of the verifier.
+A constraint is first checked over fixed-width bit-vectors, with guards
+that rule out any overflow. A bit-vector counterexample that respects the
+guards is also a counterexample over the (unbounded) integers, so the
+candidate can be rejected without the more expensive integer query.
+"""
+
+from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Dict, Optional, Union
+from lang.ast import *
+from verification.translate import Translator, model_values
+
+
+class BitVecTranslator(Translator):
+    """
+    A BitVecTranslator converts evaluated Paddle expressions into z3
+    bit-vector terms of a fixed width. Every arithmetic operation adds a
+    guard to `side_conditions` stating that it does not overflow, and
+    divisions follow the euclidean semantics of the integer encoding.
+    """
+
+    def __init__(self, width: int) -> None:
+        super().__init__()
+        self.width = width
+
+    def _variable(self, var: Variable) -> ExprRef:
+        if var.name not in self.variables:
+            if var.type == PaddleType.BOOL:
+                self.variables[var.name] = Bool(var.name)
+            else:
+                self.variables[var.name] = BitVec(var.name, self.width)
+        return self.variables[var.name]
+
+    def _negate(self, operand: BitVecRef) -> BitVecRef:
+        self.side_conditions.append(BVSNegNoOverflow(operand))
+        return -operand
+
+    def _division(self, operator: BinaryOperator, lhs: BitVecRef,
+                  rhs: BitVecRef) -> BitVecRef:
+        # Division by zero is left unspecified by the integer semantics:
+        # only look for counterexamples where every divisor is non-zero.
+        self.side_conditions += [rhs != 0, BVSDivNoOverflow(lhs, rhs)]
+        # Bit-vector division truncates towards zero, the euclidean
+        # remainder is always non-negative.
+        quotient = lhs / rhs
+        remainder = SRem(lhs, rhs)
+        negative = remainder < 0
+        if operator == BinaryOperator.DIV:
+            return If(negative, If(rhs > 0, quotient - 1, quotient + 1),
+                      quotient)
+        return If(negative, If(rhs > 0, remainder + rhs, remainder - rhs),
+                  remainder)
+
+    def translate(self, expr: Expression) -> ExprRef:
+        if isinstance(expr, IntConst):
+            if not -2 ** (self.width - 1) <= expr.value < 2 ** (self.width - 1):
+                # The constant cannot be represented: the fast path cannot
+                # find any counterexample.
+                self.side_conditions.append(BoolVal(False))
+            return BitVecVal(expr.value, self.width)
+        if isinstance(expr, UnaryExpr) and expr.operator in (
+                UnaryOperator.NEG, UnaryOperator.ABS):
+            operand = self.translate(expr.operand)
+            if expr.operator == UnaryOperator.NEG:
+                return self._negate(operand)
+            return If(operand >= 0, operand, self._negate(operand))
+        if isinstance(expr, BinaryExpr) and expr.operator in (
+                BinaryOperator.PLUS, BinaryOperator.MINUS, BinaryOperator.TIMES,
+                BinaryOperator.DIV, BinaryOperator.MODULO):
+            op = expr.operator
+            lhs = self.translate(expr.left_operand)
+            rhs = self.translate(expr.right_operand)
+            if op == BinaryOperator.PLUS:
+                self.side_conditions += [BVAddNoOverflow(lhs, rhs, True),
+                                         BVAddNoUnderflow(lhs, rhs)]
+                return lhs + rhs
+            if op == BinaryOperator.MINUS:
+                self.side_conditions += [BVSubNoOverflow(lhs, rhs),
+                                         BVSubNoUnderflow(lhs, rhs, True)]
+                return lhs - rhs
+            if op == BinaryOperator.TIMES:
+                self.side_conditions += [BVMulNoOverflow(lhs, rhs, True),
+                                         BVMulNoUnderflow(lhs, rhs)]
+                return lhs * rhs
+            return self._division(op, lhs, rhs)
+        return super().translate(expr)
+
+
+def bitvector_counterexample(formula: Expression, width: int) -> Optional[Dict[str, Union[int, bool]]]:
+    """
+    Looks for a counterexample to the validity of formula over bit-vectors
+    of the given width. Returns the counterexample if one is found and it
+    falsifies formula over the integers, None otherwise.
+    A None result does not mean that the formula is valid.
+    """
+    translator = BitVecTranslator(width)
+    solver = SolverFor("QF_BV")
+    solver.add(Not(translator.translate(formula)))
+    solver.add(translator.side_conditions)
+    if solver.check() != sat:
+        return None
+    model = solver.model()
+    cex = {}
+    for name, value in model_values(model, translator.variables).items():
+        if isinstance(value, bool):
+            cex[name] = value
+        else:
+            # model_values reads bit-vectors as unsigned numbers.
+            cex[name] = value - 2 ** width if value >= 2 ** (width - 1) else value
+    # The guards should make this check redundant, but it is cheap and
+    # keeps the fast path sound whatever the encoding.
+    int_translator = Translator()
+    int_formula = int_translator.translate(formula)
+    substitution = [(z3var, BoolVal(cex[name]) if is_bool(z3var) else IntVal(cex[name]))
+                    for name, z3var in int_translator.variables.items()]
+    if is_false(simplify(substitute(int_formula, *substitution))):
+        return cex
+    return None
@@ -0,0 +1,91 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the classifier that sorts verification queries by
+the kind of arithmetic they use. The verifier uses the class of a
+query to pick a cheaper z3 solver for it.
+"""
+
+from enum import Enum, unique
+from typing import Optional
+from lang.ast import *
+
+
+@unique
+class FormulaClass(Enum):
+    """Classes of verification queries, from cheapest to most expensive."""
+    # Only +, -, abs, comparisons and boolean connectives.
+    LINEAR = 1
+    # Uses *, / or % but always with a constant operand: the query
+    # can be rewritten into linear arithmetic.
+    CONSTANT_FACTOR = 2
+    # Uses *, / or % between two non-constant operands.
+    NONLINEAR = 3
+
+    def __str__(self):
+        strings = ["linear", "constant-factor", "nonlinear"]
+        return strings[self.value - 1]
+
+
+def constant_value(expr: Expression) -> Optional[int]:
+    """
+    Returns the integer value of expr if it is a constant integer
+    expression (e.g. `2`, `- 3` or `(1 + 2) * 4`), and None otherwise.
+    Divisions are not folded: their value depends on the semantics of
+    division by zero.
+    """
+    if isinstance(expr, IntConst):
+        return expr.value
+    if isinstance(expr, UnaryExpr):
+        value = constant_value(expr.operand)
+        if value is None:
+            return None
+        if expr.operator == UnaryOperator.NEG:
+            return -value
+        if expr.operator == UnaryOperator.ABS:
+            return abs(value)
+        return None
+    if isinstance(expr, BinaryExpr):
+        if expr.operator not in (BinaryOperator.PLUS, BinaryOperator.MINUS,
+                                 BinaryOperator.TIMES):
+            return None
+        lhs = constant_value(expr.left_operand)
+        rhs = constant_value(expr.right_operand)
+        if lhs is None or rhs is None:
+            return None
+        if expr.operator == BinaryOperator.PLUS:
+            return lhs + rhs
+        if expr.operator == BinaryOperator.MINUS:
+            return lhs - rhs
+        return lhs * rhs
+    return None
+
+
+def classify(expr: Expression) -> FormulaClass:
+    """
+    Returns the class of the (evaluated) expression expr: the class of
+    its most expensive subexpression.
+    """
+    result = FormulaClass.LINEAR
+    if isinstance(expr, BinaryExpr):
+        if expr.operator == BinaryOperator.TIMES:
+            if (constant_value(expr.left_operand) is not None
+                    or constant_value(expr.right_operand) is not None):
+                result = FormulaClass.CONSTANT_FACTOR
+            else:
+                return FormulaClass.NONLINEAR
+        elif expr.operator in (BinaryOperator.DIV, BinaryOperator.MODULO):
+            # Division by a non-zero constant can be encoded with linear
+            # constraints, division by zero cannot.
+            if constant_value(expr.right_operand) in (None, 0):
+                return FormulaClass.NONLINEAR
+            result = FormulaClass.CONSTANT_FACTOR
+    for child in expr.children():
+        if isinstance(child, Expression):
+            child_class = classify(child)
+            if child_class == FormulaClass.NONLINEAR:
+                return child_class
+            if child_class.value > result.value:
+                result = child_class
+    return result
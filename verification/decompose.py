@@ -0,0 +1,104 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the decomposition of a constraint into independent
+subqueries. A constraint such as `(c >= x) && (c >= y) && (c >= z)` is
+valid if and only if each of its conjuncts is valid, and
+`b ? f1 : f2` is valid if and only if both `b => f1` and `!b => f2`
+are valid. The verifier can check these subqueries separately, cheapest
+first, and stop at the first one that fails.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional
+from lang.ast import *
+from verification.classify import FormulaClass, classify
+
+
+def conjunction(exprs: List[Expression]) -> Optional[Expression]:
+    """Returns the conjunction of the expressions, None if there is none."""
+    result = None
+    for expr in exprs:
+        if result is None:
+            result = expr
+        else:
+            result = BinaryExpr(BinaryOperator.AND, result, expr)
+    return result
+
+
+def subqueries(formula: Expression,
+               path: Optional[List[Expression]] = None) -> List[Expression]:
+    """
+    Splits formula into subqueries such that formula is valid if and only
+    if every subquery is valid.
+    Top-level conjunctions are split into their conjuncts, and top-level
+    if-then-else expressions into one case per branch, guarded by the
+    condition of the branch (the path). The path is the list of
+    conditions leading to formula.
+    """
+    path = [] if path is None else path
+    if isinstance(formula, BinaryExpr) and formula.operator == BinaryOperator.AND:
+        return (subqueries(formula.left_operand, path)
+                + subqueries(formula.right_operand, path))
+    if isinstance(formula, Ite):
+        negated = UnaryExpr(UnaryOperator.NOT, formula.cond)
+        return (subqueries(formula.true_br, path + [formula.cond])
+                + subqueries(formula.false_br, path + [negated]))
+    if isinstance(formula, BoolConst) and formula.value:
+        return []
+    guard = conjunction(path)
+    if guard is None:
+        return [formula]
+    # path => formula
+    return [BinaryExpr(BinaryOperator.OR,
+                       UnaryExpr(UnaryOperator.NOT, guard), formula)]
+
+
+# How much more expensive a query of each class is expected to be than a
+# linear query of the same size.
+CLASS_WEIGHT = {
+    FormulaClass.LINEAR: 1,
+    FormulaClass.CONSTANT_FACTOR: 2,
+    FormulaClass.NONLINEAR: 8,
+}
+
+
+def expression_size(expr: Expression) -> int:
+    """Returns the number of expression nodes in expr."""
+    return 1 + sum(expression_size(child) for child in expr.children()
+                   if isinstance(child, Expression))
+
+
+def query_cost(formula: Expression) -> int:
+    """Returns an estimate of the cost of checking the validity of formula."""
+    return expression_size(formula) * CLASS_WEIGHT[classify(formula)]
+
+
+class SubqueryCache():
+    """
+    A bounded cache of subquery results, shared across candidates.
+    The least recently used results are evicted first.
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, formula: Expression):
+        """Returns the cached result for formula, or None."""
+        key = expression_key(formula)
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        self.misses += 1
+        return None
+
+    def put(self, formula: Expression, result) -> None:
+        """Caches the result of checking formula."""
+        self.results[expression_key(formula)] = result
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
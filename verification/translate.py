@@ -0,0 +1,132 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the translation of evaluated Paddle expressions
+into z3 formulas, used by the verifier.
+"""
+
+from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Dict, List, Mapping, Union
+from lang.ast import *
+from verification.classify import constant_value
+
+
+class VerificationError(Exception):
+    """
+    Exception that is raised when an expression cannot be translated
+    into a z3 formula.
+    """
+
+
+class Translator():
+    """
+    A Translator converts evaluated Paddle expressions (expressions
+    that only use input variables) into z3 terms.
+    When `linearize` is set, divisions and modulos by a non-zero constant
+    are replaced by fresh variables constrained by linear side conditions,
+    so that the resulting formula stays in linear integer arithmetic.
+    """
+
+    def __init__(self, linearize: bool = False) -> None:
+        self.linearize = linearize
+        # The z3 constants of the Paddle variables, by name.
+        self.variables: Dict[str, ExprRef] = {}
+        # Constraints defining the fresh variables introduced by
+        # linearization. They must hold alongside the translated formula.
+        self.side_conditions: List[BoolRef] = []
+        self._fresh_count = 0
+
+    def _variable(self, var: Variable) -> ExprRef:
+        if var.name not in self.variables:
+            if var.type == PaddleType.BOOL:
+                self.variables[var.name] = Bool(var.name)
+            else:
+                self.variables[var.name] = Int(var.name)
+        return self.variables[var.name]
+
+    def _division(self, operator: BinaryOperator, lhs: ArithRef,
+                  divisor: int) -> ArithRef:
+        # lhs = divisor * q + r with 0 <= r < |divisor| defines q = lhs / divisor
+        # and r = lhs % divisor, as in the (euclidean) SMT-LIB semantics.
+        self._fresh_count += 1
+        quotient = Int(f"__q{self._fresh_count}")
+        remainder = Int(f"__r{self._fresh_count}")
+        self.side_conditions += [lhs == divisor * quotient + remainder,
+                                 remainder >= 0, remainder < abs(divisor)]
+        if operator == BinaryOperator.DIV:
+            return quotient
+        return remainder
+
+    def translate(self, expr: Expression) -> ExprRef:
+        """Returns the z3 term corresponding to the expression expr."""
+        if isinstance(expr, BinaryExpr):
+            op = expr.operator
+            lhs = self.translate(expr.left_operand)
+            if op in (BinaryOperator.DIV, BinaryOperator.MODULO):
+                divisor = constant_value(expr.right_operand)
+                if self.linearize and divisor not in (None, 0):
+                    return self._division(op, lhs, divisor)
+            rhs = self.translate(expr.right_operand)
+            if op == BinaryOperator.PLUS:
+                return lhs + rhs
+            if op == BinaryOperator.MINUS:
+                return lhs - rhs
+            if op == BinaryOperator.TIMES:
+                return lhs * rhs
+            if op == BinaryOperator.DIV:
+                return lhs / rhs
+            if op == BinaryOperator.MODULO:
+                return lhs % rhs
+            if op == BinaryOperator.EQUALS:
+                return lhs == rhs
+            if op == BinaryOperator.NOTEQUALS:
+                return lhs != rhs
+            if op == BinaryOperator.GREATER:
+                return lhs > rhs
+            if op == BinaryOperator.GREATER_EQ:
+                return lhs >= rhs
+            if op == BinaryOperator.LESSTHAN:
+                return lhs < rhs
+            if op == BinaryOperator.LESSTHAN_EQ:
+                return lhs <= rhs
+            if op == BinaryOperator.AND:
+                return And(lhs, rhs)
+            if op == BinaryOperator.OR:
+                return Or(lhs, rhs)
+        elif isinstance(expr, UnaryExpr):
+            operand = self.translate(expr.operand)
+            if expr.operator == UnaryOperator.NOT:
+                return Not(operand)
+            if expr.operator == UnaryOperator.NEG:
+                return -operand
+            if expr.operator == UnaryOperator.ABS:
+                return If(operand >= 0, operand, -operand)
+        elif isinstance(expr, Ite):
+            return If(self.translate(expr.cond), self.translate(expr.true_br),
+                      self.translate(expr.false_br))
+        elif isinstance(expr, VarExpr):
+            if expr.var is None:
+                raise VerificationError(f"Variable {expr.name} has no declaration.")
+            return self._variable(expr.var)
+        elif isinstance(expr, IntConst):
+            return IntVal(expr.value)
+        elif isinstance(expr, BoolConst):
+            return BoolVal(expr.value)
+        raise VerificationError(f"Cannot translate {expr} to z3.")
+
+
+def model_values(model: ModelRef, variables: Mapping[str, ExprRef]) -> Dict[str, Union[int, bool]]:
+    """
+    Returns the python values of the variables in the model.
+    Variables that the model does not constrain get a default value.
+    """
+    values = {}
+    for name, z3var in variables.items():
+        value = model.eval(z3var, model_completion=True)
+        if is_bool(z3var):
+            values[name] = is_true(value)
+        else:
+            values[name] = value.as_long()
+    return values
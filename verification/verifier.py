@@ -6,8 +6,260 @@ Fill in this file to complete the verification portion
 of the assignment.
 """
 
+import time
 from z3 import *
+# z3 exports its own `Union` (of regular expressions): import typing after it.
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 from lang.ast import *
+from lang.symb_eval import Evaluator
+from verification.classify import FormulaClass, classify
+from verification.translate import Translator, VerificationError, model_values
+from verification.bitvector import bitvector_counterexample
+from verification.decompose import SubqueryCache, query_cost, subqueries
+
+
+class QueryStats():
+    """
+    Latency of the verification queries, broken down by formula class.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[FormulaClass, List[float]] = {
+            fclass: [] for fclass in FormulaClass}
+
+    def record(self, fclass: FormulaClass, seconds: float) -> None:
+        """Record that a query of class fclass took some seconds."""
+        self.latencies[fclass].append(seconds)
+
+    def report(self) -> str:
+        """Returns a table of the query latencies per class."""
+        lines = [f"{'class':<16}{'queries':>8}{'total (s)':>12}"
+                 f"{'mean (ms)':>12}{'max (ms)':>12}"]
+        for fclass, times in self.latencies.items():
+            total = sum(times)
+            mean = 1000 * total / len(times) if times else 0.0
+            worst = 1000 * max(times) if times else 0.0
+            lines.append(f"{str(fclass):<16}{len(times):>8}{total:>12.3f}"
+                         f"{mean:>12.2f}{worst:>12.2f}")
+        return "\n".join(lines)
+
+
+class Verdict():
+    """
+    The verdict of the verifier on one formula of a batch: whether the
+    formula is valid and, if it is not, a counterexample (which can be None
+    if the solver could not decide).
+    """
+
+    def __init__(self, valid: bool,
+                 counterexample: Optional[Dict[str, Union[int, bool]]] = None) -> None:
+        self.valid = valid
+        self.counterexample = counterexample
+
+    def __str__(self) -> str:
+        if self.valid:
+            return "valid"
+        return f"invalid ({self.counterexample})"
+
+
+# The solver logic used for each class of query.
+# Queries with constant factors are linearized first.
+LOGIC_OF_CLASS = {
+    FormulaClass.LINEAR: "QF_LIA",
+    FormulaClass.CONSTANT_FACTOR: "QF_LIA",
+    FormulaClass.NONLINEAR: "QF_NIA",
+}
+
+
+class Verifier():
+    """
+    A Verifier checks the validity of evaluated constraints.
+    With `route` set, each query is classified (see `classify.py`) and sent
+    to a solver specialized for its class; otherwise the default z3
+    solver is used for every query.
+    With `bitvector_width` set, each query is first checked over
+    bit-vectors of that width (see `bitvector.py`): a counterexample found
+    there rejects the formula immediately, otherwise the integer query
+    decides.
+    With `decompose` set, each formula is split into independent
+    subqueries (see `decompose.py`) that are checked cheapest first until
+    one fails. The results of subqueries are cached across formulas.
+    With `timeout` set (in milliseconds), the solver gives up on queries
+    that take longer: their result is `unknown`, so the formula is not
+    valid, but there is no counterexample.
+    With `cache` set, the results of whole formulas are cached too, in
+    that cache (which is also the cache of the subqueries): verifiers that
+    share a cache do not check the same formula twice.
+    """
+
+    def __init__(self, route: bool = True,
+                 bitvector_width: Optional[int] = None,
+                 decompose: bool = False,
+                 timeout: Optional[int] = None,
+                 cache: Optional[SubqueryCache] = None) -> None:
+        self.route = route
+        self.bitvector_width = bitvector_width
+        self.decompose = decompose
+        self.timeout = timeout
+        self.stats = QueryStats()
+        # Number of queries decided by the bit-vector fast path.
+        self.bitvector_rejections = 0
+        self.cache_formulas = cache is not None
+        self.cache = SubqueryCache() if cache is None else cache
+        # The solvers shared by the linear queries, by logic.
+        self._solvers = {}
+
+    def check(self, formula: Expression) -> Tuple[CheckSatResult, Optional[Dict[str, Union[int, bool]]]]:
+        """
+        Checks whether the negation of the formula is satisfiable.
+        Returns the z3 result and, if the negation is satisfiable, the
+        values of the Paddle variables in the model (a counterexample).
+        """
+        if not self.decompose:
+            return self._check_cached(formula) if self.cache_formulas else self._check_query(formula)
+        for query in sorted(subqueries(formula), key=query_cost):
+            result, cex = self._check_cached(query)
+            if result != unsat:
+                return result, cex
+        return unsat, None
+
+    def _check_cached(self, query: Expression) -> Tuple[CheckSatResult, Optional[Dict[str, Union[int, bool]]]]:
+        cached = self.cache.get(query)
+        if cached is None:
+            cached = self._check_query(query)
+            # An unknown result (e.g. a timeout) is not cached: the query is
+            # checked again next time.
+            if cached[0] != unknown:
+                self.cache.put(query, cached)
+        return cached
+
+    def _solver(self, logic: Optional[str]) -> Solver:
+        # A solver for a logic (the default solver if logic is None).
+        solver = Solver() if logic is None else SolverFor(logic)
+        if self.timeout is not None:
+            solver.set("timeout", self.timeout)
+        return solver
+
+    def _check_query(self, formula: Expression) -> Tuple[CheckSatResult, Optional[Dict[str, Union[int, bool]]]]:
+        start = time.perf_counter()
+        fclass = classify(formula)
+        if self.bitvector_width is not None:
+            cex = bitvector_counterexample(formula, self.bitvector_width)
+            if cex is not None:
+                self.bitvector_rejections += 1
+                self.stats.record(fclass, time.perf_counter() - start)
+                return sat, cex
+        incremental = self.route and fclass != FormulaClass.NONLINEAR
+        if incremental:
+            # Creating a solver costs more than checking a small linear
+            # query: linear queries share one solver, in a fresh scope.
+            translator = Translator(
+                linearize=(fclass == FormulaClass.CONSTANT_FACTOR))
+            logic = LOGIC_OF_CLASS[fclass]
+            if logic not in self._solvers:
+                self._solvers[logic] = self._solver(logic)
+            solver = self._solvers[logic]
+            solver.push()
+        else:
+            translator = Translator()
+            solver = self._solver(LOGIC_OF_CLASS[fclass] if self.route else None)
+        try:
+            solver.add(Not(translator.translate(formula)))
+            solver.add(translator.side_conditions)
+            result = solver.check()
+            cex = None
+            if result == sat:
+                cex = model_values(solver.model(), translator.variables)
+        finally:
+            # The shared solver is left as it was, even if the formula
+            # cannot be translated.
+            if incremental:
+                solver.pop()
+        self.stats.record(fclass, time.perf_counter() - start)
+        return result, cex
+
+    def check_batch(self, formulas: List[Expression]) -> List[Verdict]:
+        """
+        Checks the validity of many formulas in a single incremental solver
+        session, and returns one verdict per formula.
+        Each formula f_i is asserted as `s_i => not f_i` for a fresh selector
+        literal s_i, and is then checked by assuming s_i only: what the solver
+        learns on the shared structure of the formulas is kept from one
+        candidate to the next. Formulas are not decomposed in a batch.
+        """
+        classes = [classify(formula) for formula in formulas]
+        worst = max(classes, key=lambda fclass: fclass.value,
+                    default=FormulaClass.LINEAR)
+        solver = self._solver(LOGIC_OF_CLASS[worst] if self.route else None)
+        linearize = self.route and worst == FormulaClass.CONSTANT_FACTOR
+        verdicts: List[Optional[Verdict]] = [None] * len(formulas)
+        selectors = {}
+        translators = {}
+        for i, formula in enumerate(formulas):
+            cached = self.cache.get(formula) if self.cache_formulas else None
+            if cached is not None:
+                verdicts[i] = Verdict(cached[0] == unsat, cached[1])
+                continue
+            if self.bitvector_width is not None:
+                start = time.perf_counter()
+                cex = bitvector_counterexample(formula, self.bitvector_width)
+                if cex is not None:
+                    self.bitvector_rejections += 1
+                    self.stats.record(classes[i], time.perf_counter() - start)
+                    verdicts[i] = Verdict(False, cex)
+                    continue
+            # The fresh variables of linearization can have the same names
+            # in two formulas: this is harmless since only one selector is
+            # assumed at a time.
+            translator = Translator(linearize=linearize)
+            selectors[i] = Bool(f"__select{i}")
+            translators[i] = translator
+            negation = Not(translator.translate(formula))
+            solver.add(Implies(selectors[i],
+                               And(negation, *translator.side_conditions)))
+        for i, selector in selectors.items():
+            start = time.perf_counter()
+            result = solver.check(selector)
+            if result == sat:
+                cex = model_values(solver.model(), translators[i].variables)
+                verdicts[i] = Verdict(False, cex)
+            else:
+                verdicts[i] = Verdict(result == unsat)
+            self.stats.record(classes[i], time.perf_counter() - start)
+            if self.cache_formulas and result != unknown:
+                self.cache.put(formulas[i], (result, verdicts[i].counterexample))
+        return verdicts
+
+    def is_valid(self, formula: Expression) -> bool:
+        """Returns true if the formula is valid."""
+        result, _ = self.check(formula)
+        return result == unsat
+
+    def counterexample(self, formula: Expression) -> Optional[Dict[str, Union[int, bool]]]:
+        """
+        Returns values of the variables for which the formula is false, or
+        None if there is no such counterexample.
+        """
+        _, cex = self.check(formula)
+        return cex
+
+
+# The verifier used by `is_valid`. It caches its results, which the
+# verifiers that share its cache reuse: each synthesizer replaces the cache
+# with the cache of its own verifier (see `Synthesizer.__init__`).
+default_verifier = Verifier(cache=SubqueryCache())
+
+
+def verify_completions(prog: Program, completions: List[Mapping[str, Expression]],
+                       verifier: Verifier = default_verifier) -> List[Verdict]:
+    """
+    Verifies the program prog for each of the hole completions in one
+    solver session (see `Verifier.check_batch`), and returns one verdict
+    per completion.
+    """
+    formulas = [Evaluator(completion).evaluate(prog)
+                for completion in completions]
+    return verifier.check_batch(formulas)
 
 
 def is_valid(formula: Expression) -> bool:
@@ -15,7 +267,4 @@ def is_valid(formula: Expression) -> bool:
     Returns true if the formula is valid.
 
     """
-    # TODO: implement this function.
-    # It should return true if the formula is valid.
-    # To check that the formula is valid, you should use the Z3 api
-    raise Exception("verifier.is_valid is not implemented.")
+    return default_verifier.is_valid(formula)